@@ -1,23 +1,33 @@
 # app.py
 
-import sqlite3 # Ainda pode ser útil para alguma lógica local, mas não para o DB principal
-from flask import Flask, jsonify, render_template, g, request
+from flask import Flask, Response, jsonify, render_template, g, request
 import os
+import time
 import json
-import importlib.util
-from collections import defaultdict, Counter
+import hmac
+from collections import defaultdict
 from datetime import datetime, timedelta
-import psycopg2 # Importar para PostgreSQL
-from psycopg2 import extras # Para usar RowFactory similar ao SQLite
+from functools import wraps
 
 from signal_logic import process_and_filter_signals
+import strategy_registry
+import rollups
+import single_flight
+import response_cache
+import wire_format
+import storage
+import export_stream
+import metricas
+import request_profiler
+from giro import segundos_do_relogio
 
 app = Flask(__name__)
 
 # --- Configuração de Caminhos ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-STRATEGIES_DIR = os.path.join(BASE_DIR, 'strategies')
+# Mesma pasta usada pelo coletor, signal_logic e telegram_notifier
+STRATEGIES_DIR = os.path.join(BASE_DIR, '..', 'strategies')
 
 # Arquivos de configuração JSON (ainda serão usados para status/mapping/etc.
 # mas as alterações feitas via frontend não serão persistentes entre deploys/reinícios
@@ -30,89 +40,102 @@ STRATEGY_MAPPING_FILE = os.path.join(STRATEGIES_DIR, 'strategyColumnMapping.json
 CONFLUENCE_CONFIG_FILE = os.path.join(STRATEGIES_DIR, 'confluenceModeSettings.json')
 ACTIVATOR_CONFIG_FILE = os.path.join(STRATEGIES_DIR, 'activatorModeSettings.json')
 ACTIVATOR_STATE_FILE = os.path.join(STRATEGIES_DIR, 'activator_state.json')
+CONFLUENCE_STATE_FILE = os.path.join(STRATEGIES_DIR, 'confluence_state.json') # Publicado pelo coletor
+SEQUENCE_ALERTS_STATE_FILE = os.path.join(STRATEGIES_DIR, 'sequence_alerts_state.json') # Publicado pelo coletor
+LATENCY_STATE_FILE = os.path.join(STRATEGIES_DIR, 'latency_state.json') # Publicado pelo coletor
 
 
-# --- Configuração do PostgreSQL ---
-# As credenciais virão das variáveis de ambiente do Render
-DATABASE_URL = os.environ.get('DATABASE_URL') # Render fornece isso automaticamente para o DB gerenciado
+# --- Métricas (ver metricas.py; expostas em /metrics) ---
+metricas.identificar('web')
+TEMPO_ROTA = metricas.histograma('http_requisicao_segundos', 'Latência das requisições do app web, por rota.', ('rota', 'metodo', 'status'))
+# Não há pool: cada requisição abre (no máximo) uma conexão, fechada no teardown
+CONEXOES_ABERTAS = metricas.medidor('banco_conexoes_abertas', 'Conexões do app web com o banco abertas agora.')
+CONEXOES_TOTAL = metricas.contador('banco_conexoes_total', 'Conexões com o banco abertas pelo app web.')
+TEMPO_CONEXAO = metricas.histograma('banco_conexao_segundos', 'Tempo para abrir uma conexão com o banco no app web.')
 
+# --- Banco de Dados ---
+# Postgres (DATABASE_URL, padrão) ou SQLite embutido, conforme STORAGE_BACKEND (ver storage.py)
 def get_db_connection():
-    if not DATABASE_URL:
-        raise Exception("DATABASE_URL não configurada. Conexão com o banco de dados falhou.")
-    conn = psycopg2.connect(DATABASE_URL, sslmode='require') # 'sslmode=require' é importante para o Render
-    return conn
+    CONEXOES_TOTAL.incrementar()
+    with metricas.cronometrar(TEMPO_CONEXAO):
+        return storage.conectar()
 
 def get_db():
     # Usa g para armazenar a conexão e reutilizá-la na mesma requisição
     if 'db' not in g:
-        g.db = get_db_connection()
-        # Configura o cursor para retornar linhas como dicionários (similar ao RowFactory do SQLite)
-        g.db.cursor_factory = psycopg2.extras.RealDictCursor
+        CONEXOES_TOTAL.incrementar()
+        # Cursores retornam linhas como dicionários; com PERFIL_ATIVO=1 as consultas são medidas
+        with metricas.cronometrar(TEMPO_CONEXAO):
+            g.db = request_profiler.envolver(storage.conectar(dicionario=True))
+        CONEXOES_ABERTAS.somar(1)
     return g.db
 
+@app.before_request
+def iniciar_cronometro():
+    g.inicio_requisicao = time.perf_counter()
+
+def registrar_latencia(resposta):
+    # Registrado antes da compressão: os after_request rodam em ordem inversa, então a compressão entra na conta
+    inicio = g.get('inicio_requisicao')
+    if inicio is not None:
+        rota = request.url_rule.rule if request.url_rule else 'sem_rota'
+        TEMPO_ROTA.observar(time.perf_counter() - inicio, rota, request.method, resposta.status_code)
+    metricas.publicar()
+    return resposta
+
+app.after_request(registrar_latencia)
+
+# Profiling opcional: tempo de banco por requisição, consultas lentas e capturas (ver request_profiler.py)
+if request_profiler.PERFIL_ATIVO:
+    app.before_request(request_profiler.iniciar)
+    app.after_request(request_profiler.finalizar)
+    if not request_profiler.ADMIN_TOKEN:
+        print("[AVISO] PERFIL_ATIVO=1 sem ADMIN_TOKEN: as rotas /api/admin/perfil respondem 403 até o token ser definido.")
+
+# Compressão gzip/brotli das respostas JSON conforme o Accept-Encoding (ver wire_format.py)
+app.after_request(wire_format.comprimir_resposta)
+
 @app.teardown_appcontext
 def close_connection(exception):
     db = g.pop('db', None)
     if db is not None:
         db.close()
+        CONEXOES_ABERTAS.somar(-1)
 
 # Função para inicializar o esquema do banco de dados (tabelas)
-def inicializar_banco_de_dados_pg():
+def inicializar_banco_de_dados():
     conn = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Criação das tabelas para PostgreSQL
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS resultados (
-                id VARCHAR(255) PRIMARY KEY,
-                created_at VARCHAR(255),
-                roll INTEGER,
-                color VARCHAR(50),
-                timestamp_iso TIMESTAMP
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sinais (
-                id SERIAL PRIMARY KEY,
-                trigger_id VARCHAR(255) NOT NULL,
-                strategy_id VARCHAR(255) NOT NULL,
-                strategy_name VARCHAR(255) NOT NULL,
-                message TEXT NOT NULL,
-                target_timestamp TIMESTAMP NOT NULL,
-                status VARCHAR(50) DEFAULT 'pending',
-                telegram_message_id BIGINT DEFAULT NULL
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS estrategia_stats (
-                strategy_id VARCHAR(255) PRIMARY KEY,
-                strategy_name VARCHAR(255) NOT NULL,
-                hits INTEGER DEFAULT 0,
-                misses INTEGER DEFAULT 0,
-                total_signals INTEGER DEFAULT 0
-            );
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS notificacoes_enviadas (
-                notification_key VARCHAR(255) PRIMARY KEY
-            );
-        """)
+        # No Postgres também converte bancos no formato antigo e cria as partições e os rollups
+        storage.inicializar_esquema(conn)
         conn.commit()
-        print("Tabelas do PostgreSQL verificadas/criadas com sucesso.")
+        print(f"Tabelas do banco de dados ({storage.STORAGE_BACKEND}) verificadas/criadas com sucesso.")
     except Exception as e:
-        print(f"Erro ao inicializar o banco de dados PostgreSQL: {e}")
+        print(f"Erro ao inicializar o banco de dados ({storage.STORAGE_BACKEND}): {e}")
         if conn:
             conn.rollback()
     finally:
         if conn:
             conn.close()
 
+def requer_admin(rota):
+    """Rotas de diagnóstico: só existem com PERFIL_ATIVO=1 e sempre exigem ADMIN_TOKEN no cabeçalho X-Admin-Token."""
+    @wraps(rota)
+    def rota_de_admin(*args, **kwargs):
+        if not request_profiler.PERFIL_ATIVO:
+            return jsonify({"erro": "Profiling desativado. Defina PERFIL_ATIVO=1."}), 404
+        if not request_profiler.ADMIN_TOKEN:
+            return jsonify({"erro": "Rotas de administração bloqueadas: defina ADMIN_TOKEN."}), 403
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), request_profiler.ADMIN_TOKEN.encode()):
+            return jsonify({"erro": "Token de administração inválido."}), 403
+        return rota(*args, **kwargs)
+    return rota_de_admin
+
 # Chamar a inicialização do DB no startup da aplicação Flask
 # Isso garante que as tabelas existam quando a aplicação for iniciada no Render
 with app.app_context():
-    inicializar_banco_de_dados_pg()
+    inicializar_banco_de_dados()
 
 
 # --- Funções de Gerenciamento de Configuração (JSON files) ---
@@ -173,20 +196,7 @@ def load_activator_settings(): return load_generic_config(ACTIVATOR_CONFIG_FILE)
 def save_activator_settings(data): return save_generic_config(ACTIVATOR_CONFIG_FILE, data)
 
 def carregar_estrategias():
-    strategies = []
-    if not os.path.exists(STRATEGIES_DIR): return []
-    for filename in os.listdir(STRATEGIES_DIR):
-        if filename.endswith('.py') and filename != '__init__.py':
-            module_name = filename[:-3]
-            try:
-                spec = importlib.util.spec_from_file_location(module_name, os.path.join(STRATEGIES_DIR, filename))
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                if all(hasattr(module, attr) for attr in ['ID', 'NOME', 'DESCRICAO']):
-                    strategies.append({'id': module.ID, 'nome': module.NOME, 'descricao': module.DESCRICAO})
-            except Exception as e:
-                print(f"!!! ERRO ao carregar a estratégia '{filename}': {e}")
-    return sorted(strategies, key=lambda s: s['nome'])
+    return strategy_registry.listar_metadados()
 
 # --- ROTAS PRINCIPAIS ---
 @app.route('/')
@@ -199,28 +209,68 @@ def estatisticas_page(): return render_template('estatisticas.html')
 def configuracao_page(): return render_template('configuracao.html')
 
 # --- ROTAS DE API ---
+# --- Cache de Respostas ---
+def versoes_dos_dados():
+    conn = get_db()
+    versoes = storage.versoes_dos_dados(conn.cursor())
+    conn.rollback() # Não deixa transação aberta (o dashboard define o isolamento da sua própria)
+    return versoes
+
+cacheado = response_cache.cacheado(versoes_dos_dados)
+
+@app.route('/api/cache/metricas')
+def api_cache_metricas():
+    try:
+        return jsonify(response_cache.metricas())
+    except Exception as e:
+        print(f"[ERRO API /cache/metricas]: {e}")
+        return jsonify({"erro": str(e)}), 500
+
+@app.route('/metrics')
+def metrics():
+    # Formato de texto do Prometheus: coletor + todos os workers + cache de respostas
+    try:
+        cache = response_cache.metricas()
+        extras = {
+            'cache_respostas_acertos_total': ('counter', 'Respostas servidas do cache.', cache['acertos']),
+            'cache_respostas_falhas_total': ('counter', 'Respostas geradas por falta no cache.', cache['falhas']),
+            'cache_respostas_taxa_acerto': ('gauge', 'Fração de acertos do cache de respostas.',
+                                            cache['acertos'] / (cache['acertos'] + cache['falhas']) if cache['acertos'] + cache['falhas'] else 0),
+            'cache_respostas_entradas': ('gauge', 'Entradas no cache de respostas.', cache['entradas']),
+            'cache_respostas_bytes': ('gauge', 'Bytes ocupados pelo cache de respostas.', cache['bytes_em_cache']),
+        }
+        return Response(metricas.exposicao(extras), content_type=metricas.TIPO_CONTEUDO)
+    except Exception as e:
+        print(f"[ERRO /metrics]: {e}")
+        return jsonify({"erro": str(e)}), 500
+
+def montar_sinais(cursor):
+    strategy_statuses = get_strategy_status()
+    mapping = load_strategy_mapping()
+    confluence_modes = load_confluence_settings()
+    activator_modes = load_activator_settings()
+    
+    signals, is_active, window_end = process_and_filter_signals(
+        cursor, strategy_statuses, mapping, confluence_modes, activator_modes
+    )
+    
+    return {
+        "signals": signals,
+        "activator_window_active": is_active,
+        "activator_window_end": window_end.isoformat() if window_end else None,
+        "activator_modes_enabled": activator_modes
+    }
+
 @app.route('/api/sinais')
+@cacheado
 def api_sinais():
     try:
         # Usar get_db() para obter a conexão PostgreSQL
         conn = get_db()
         cursor = conn.cursor()
-        
-        strategy_statuses = get_strategy_status()
-        mapping = load_strategy_mapping()
-        confluence_modes = load_confluence_settings()
-        activator_modes = load_activator_settings()
-        
-        signals, is_active, window_end = process_and_filter_signals(
-            cursor, strategy_statuses, mapping, confluence_modes, activator_modes
-        )
-        
-        return jsonify({
-            "signals": signals,
-            "activator_window_active": is_active,
-            "activator_window_end": window_end.isoformat() if window_end else None,
-            "activator_modes_enabled": activator_modes
-        })
+        if wire_format.formato_compacto_pedido():
+            return wire_format.jsonify_rapido(wire_format.compactar_sinais(montar_sinais(cursor)))
+        return jsonify(montar_sinais(cursor))
     except Exception as e:
         print(f"[ERRO API /sinais]: {e}")
         return jsonify({"erro": str(e)}), 500
@@ -233,77 +283,111 @@ def _find_block_end_time(reference_time):
          block_end += timedelta(minutes=10)
     return block_end
 
-@app.route('/api/resultados')
-def api_resultados():
-    try:
-        limite = request.args.get('limite', default=120, type=int)
-        conn = get_db()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT timestamp_iso FROM resultados ORDER BY timestamp_iso DESC LIMIT 1")
-        last_result_row = cursor.fetchone()
-        latest_result_time = last_result_row['timestamp_iso'] if last_result_row else datetime.now()
+def montar_grade_resultados(cursor, limite, compacto=False):
+    last_result_row = storage.ultimo_resultado(cursor)
+    latest_result_time = last_result_row.timestamp_iso if last_result_row else datetime.now()
 
-        cursor.execute("SELECT MAX(target_timestamp) as max_target FROM sinais WHERE status = 'pending'")
-        max_target_row = cursor.fetchone()
-        latest_signal_time = max_target_row['max_target'] if max_target_row and max_target_row['max_target'] else datetime.min
+    latest_signal_time = storage.maior_alvo_pendente(cursor) or datetime.min
 
-        grid_end_reference_time = max(latest_result_time, latest_signal_time, datetime.now())
-        grid_end_time = _find_block_end_time(grid_end_reference_time)
-        
-        num_minutes_needed = (limite + 1) // 2 
-        grid_start_time = grid_end_time - timedelta(minutes=num_minutes_needed)
-        
-        cursor.execute(
-            "SELECT id, roll, color, timestamp_iso FROM resultados WHERE timestamp_iso BETWEEN %s AND %s ORDER BY timestamp_iso ASC",
-            (grid_start_time, grid_end_time)
-        )
-        resultados_brutos = cursor.fetchall()
-        
-        results_by_minute = defaultdict(list)
-        for row in resultados_brutos:
-            # PostgreSQL retorna datetime objects, não strings
-            result_time = row['timestamp_iso']
-            minute_key = result_time.strftime("%Y-%m-%d %H:%M")
-            results_by_minute[minute_key].append(dict(row))
+    grid_end_reference_time = max(latest_result_time, latest_signal_time, datetime.now())
+    grid_end_time = _find_block_end_time(grid_end_reference_time)
+    
+    num_minutes_needed = (limite + 1) // 2 
+    grid_start_time = grid_end_time - timedelta(minutes=num_minutes_needed)
+    
+    resultados_brutos = storage.resultados_no_intervalo(cursor, grid_start_time, grid_end_time)
+    
+    # Giros já vêm em ordem, com os textos de horário calculados; o minuto é a chave numérica
+    results_by_minute = defaultdict(list)
+    for giro in resultados_brutos:
+        results_by_minute[giro.segundos_relogio // 60].append(giro)
+    
+    all_slots = []
+    slot_times = [] # horário de cada slot (segundos do relógio), usado apenas pelo formato compacto
+    first_minute = segundos_do_relogio(grid_start_time) // 60
+    last_minute = segundos_do_relogio(grid_end_time) // 60
+    
+    for minute in range(first_minute, last_minute + 1):
+        existing_results_in_minute = results_by_minute.get(minute, ())
         
-        all_slots = []
-        current_minute_time = grid_start_time.replace(second=0, microsecond=0)
+        for giro in existing_results_in_minute:
+            all_slots.append({
+                'type': 'result', 'id': giro.id, 'roll': giro.roll, 'color': giro.color,
+                'time_short': giro.hora_curta, 'time_full': giro.hora_completa
+            })
+            slot_times.append(giro.segundos_relogio)
         
-        while current_minute_time <= grid_end_time:
-            minute_key = current_minute_time.strftime("%Y-%m-%d %H:%M")
-            time_short = current_minute_time.strftime("%H:%M")
-            
-            existing_results_in_minute = sorted(results_by_minute.get(minute_key, []), key=lambda x: x['timestamp_iso'])
-            
-            for result in existing_results_in_minute:
-                result_time = result['timestamp_iso'] # Já é datetime
-                all_slots.append({
-                    'type': 'result', 'id': result['id'], 'roll': result['roll'], 'color': result['color'],
-                    'time_short': result_time.strftime("%H:%M"), 'time_full': result_time.strftime("%H:%M:%S")
-                })
-            
-            num_placeholders = 2 - len(existing_results_in_minute)
+        num_placeholders = 2 - len(existing_results_in_minute)
+        if num_placeholders > 0:
+            time_short = f"{minute // 60 % 24:02d}:{minute % 60:02d}"
             for _ in range(num_placeholders):
                 all_slots.append({'type': 'placeholder', 'time_short': time_short})
-
-            current_minute_time += timedelta(minutes=1)
-        
-        final_slots = all_slots[-limite:]
+                slot_times.append(minute * 60)
+    
+    final_slots = all_slots[-limite:]
+    final_times = slot_times[-limite:]
+    
+    final_rows = []
+    final_row_times = []
+    for i in range(0, len(final_slots), 20):
+        final_rows.append(final_slots[i:i+20])
+        final_row_times.append(final_times[i:i+20])
         
-        final_rows = []
-        for i in range(0, len(final_slots), 20):
-            final_rows.append(final_slots[i:i+20])
-            
-        final_rows.reverse()
-
-        return jsonify(final_rows)
+    final_rows.reverse()
+    final_row_times.reverse()
+    if compacto:
+        return wire_format.compactar_grade(final_rows, final_row_times)
+    return final_rows
 
+@app.route('/api/resultados')
+@cacheado
+def api_resultados():
+    try:
+        limite = request.args.get('limite', default=120, type=int)
+        conn = get_db()
+        cursor = conn.cursor()
+        if wire_format.formato_compacto_pedido():
+            return wire_format.jsonify_rapido(montar_grade_resultados(cursor, limite, compacto=True))
+        return jsonify(montar_grade_resultados(cursor, limite))
     except Exception as e:
         print(f"[ERRO API /resultados]: {e}")
         return jsonify({"erro": str(e)}), 500
 
 
+# --- Snapshot do Dashboard ---
+# Tudo que a página principal precisa a cada atualização, em uma requisição e uma transação.
+def montar_dashboard(limite, compacto=False):
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        # Todas as consultas enxergam o mesmo instante do banco
+        storage.iniciar_snapshot(cursor)
+        mapping = load_strategy_mapping()
+        sinais = montar_sinais(cursor)
+        return {
+            "resultados": montar_grade_resultados(cursor, limite, compacto),
+            "sinais": wire_format.compactar_sinais(sinais) if compacto else sinais,
+            "sequence_alerts": load_generic_config(SEQUENCE_ALERTS_STATE_FILE, default_value=[]),
+            "interval_averages": storage.medias_intervalo(cursor, datetime.now() - timedelta(hours=6)),
+            "panel_accuracy": calcular_acerto_paineis(cursor, mapping) if mapping else {},
+        }
+    finally:
+        conn.rollback()
+
+@app.route('/api/dashboard')
+@cacheado
+def api_dashboard():
+    try:
+        limite = request.args.get('limite', default=120, type=int)
+        compacto = wire_format.formato_compacto_pedido()
+        # Abas consultando ao mesmo tempo dentro deste worker compartilham um único cálculo
+        snapshot = single_flight.executar(('dashboard', limite, compacto), lambda: montar_dashboard(limite, compacto))
+        return wire_format.jsonify_rapido(snapshot) if compacto else jsonify(snapshot)
+    except Exception as e:
+        print(f"[ERRO API /dashboard]: {e}")
+        return jsonify({"erro": str(e)}), 500
+
+
 @app.route('/api/config/telegram', methods=['GET'])
 def api_get_telegram_config(): return jsonify(load_telegram_config())
 @app.route('/api/config/telegram', methods=['POST'])
@@ -324,6 +408,8 @@ def api_toggle_estrategia():
 
 @app.route('/api/estrategias')
 def api_listar_estrategias(): return jsonify(carregar_estrategias())
+@app.route('/api/estrategias/carga')
+def api_relatorio_carga_estrategias(): return jsonify(strategy_registry.relatorio_carga())
 @app.route('/api/estrategias/mapping', methods=['GET'])
 def api_get_strategy_mapping(): return jsonify(load_strategy_mapping())
 @app.route('/api/estrategias/mapping', methods=['POST'])
@@ -351,101 +437,114 @@ def api_save_activator_settings():
     if save_activator_settings(data): return jsonify({'status': 'sucesso'})
     else: return jsonify({'status': 'erro', 'message': 'Falha ao salvar o arquivo do ativador'}), 500
 
+@app.route('/api/confluencias')
+@cacheado
+def api_confluencias():
+    # Confluências mantidas incrementalmente pelo coletor; aqui é apenas uma leitura
+    confluencias = load_generic_config(CONFLUENCE_STATE_FILE)
+    panel_id = request.args.get('painel')
+    if panel_id:
+        return jsonify(confluencias.get(panel_id, []))
+    return jsonify(confluencias)
+
 @app.route('/api/sequence_alerts')
+@cacheado
 def api_sequence_alerts():
-    armed_sequences = load_armed_sequences()
-    if not armed_sequences: return jsonify([])
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT color FROM resultados ORDER BY timestamp_iso DESC LIMIT 7")
-    latest_results = [row['color'] for row in cursor.fetchall()]
-    latest_results.reverse()
-    active_alerts = []
-    for armed_sequence in armed_sequences:
-        n = len(armed_sequence)
-        if len(latest_results) >= n and latest_results[-n:] == armed_sequence:
-            active_alerts.append({"id": f"visual-{'-'.join(map(str, armed_sequence))}", "status": "visual", "sequence": armed_sequence, "prediction": "Branco"})
-        if n > 1 and len(latest_results) >= n - 1 and latest_results[-(n-1):] == armed_sequence[:n-1]:
-            active_alerts.append({"id": f"sound-{'-'.join(map(str, armed_sequence[:n-1]))}", "status": "sound", "sequence": armed_sequence[:n-1]})
-    return jsonify(active_alerts)
+    # Alertas calculados pelo coletor a cada giro (sequence_matcher.py); aqui é apenas uma leitura
+    return jsonify(load_generic_config(SEQUENCE_ALERTS_STATE_FILE, default_value=[]))
+
+@app.route('/api/latencia')
+@cacheado
+def api_latencia():
+    # Percentis (segundos desde o created_at do giro) calculados pelo coletor (latency_tracker.py)
+    latencias = load_generic_config(LATENCY_STATE_FILE)
+    panel_id = request.args.get('painel')
+    if panel_id:
+        fluxos = {fluxo: paineis[panel_id] for fluxo, paineis in latencias.get('fluxos', {}).items() if panel_id in paineis}
+        latencias = {**latencias, "fluxos": fluxos}
+    return jsonify(latencias)
 
 @app.route('/api/stats/interval_averages')
+@cacheado
 def api_stats_interval_averages():
     try:
+        horas = request.args.get('horas', 6, type=int)
+        if not horas or horas < 1: return jsonify({"erro": "O parâmetro 'horas' deve ser maior que zero."}), 400
         conn = get_db()
         cursor = conn.cursor()
-        six_hours_ago = datetime.now() - timedelta(hours=6)
-        query = "SELECT timestamp_iso FROM resultados WHERE color = 'Branco' AND timestamp_iso >= %s ORDER BY timestamp_iso ASC"
-        cursor.execute(query, (six_hours_ago,))
-        white_timestamps = [row['timestamp_iso'] for row in cursor.fetchall()] # Já são datetime objects
-        default_response = {"media_curta": 0, "media_longa": 0, "total_intervalos": 0}
-        if len(white_timestamps) < 2: return jsonify(default_response)
-        all_intervals = [round((white_timestamps[i] - white_timestamps[i-1]).total_seconds() / 60) for i in range(1, len(white_timestamps))]
-        if not all_intervals or len(all_intervals) < 4:
-            default_response["total_intervalos"] = len(all_intervals)
-            return jsonify(default_response)
-        sorted_intervals = sorted(all_intervals)
-        midpoint = len(sorted_intervals) // 2
-        lower_half = sorted_intervals[:midpoint]
-        upper_half = sorted_intervals[midpoint:]
-        if not lower_half:
-            return jsonify(default_response)
-        media_curta = sum(lower_half) / len(lower_half)
-        media_longa = sum(upper_half) / len(upper_half)
-        return jsonify({
-            "media_curta": round(media_curta, 1),
-            "media_longa": round(media_longa, 1),
-            "total_intervalos": len(all_intervals)
-        })
+        return jsonify(storage.medias_intervalo(cursor, datetime.now() - timedelta(hours=horas)))
     except Exception as e:
         print(f"[ERRO AO CALCULAR MÉDIAS DE INTERVALO]: {e}"); return jsonify({"erro": str(e)}), 500
 
+def calcular_acerto_paineis(cursor, mapping):
+    panel_stats = {"1": {"hits": 0, "misses": 0},"2": {"hits": 0, "misses": 0},"3": {"hits": 0, "misses": 0}}
+    for stat in storage.estatisticas_das_estrategias(cursor):
+        panel_id = mapping.get(stat['strategy_id'])
+        if panel_id in panel_stats:
+            panel_stats[panel_id]['hits'] += stat['hits']
+            panel_stats[panel_id]['misses'] += stat['misses']
+    return panel_stats
+
 @app.route('/api/stats/panel_accuracy')
+@cacheado
 def api_get_panel_accuracy():
     try:
         mapping = load_strategy_mapping() 
         if not mapping:
             return jsonify({})
-        panel_stats = {"1": {"hits": 0, "misses": 0},"2": {"hits": 0, "misses": 0},"3": {"hits": 0, "misses": 0}}
-        panel_to_strategies = defaultdict(list)
-        for strategy_id, panel_id in mapping.items():
-            if panel_id in panel_stats:
-                panel_to_strategies[panel_id].append(strategy_id)
         conn = get_db()
         cursor = conn.cursor()
-        cursor.execute("SELECT strategy_id, hits, misses FROM estrategia_stats")
-        all_strategy_stats = cursor.fetchall()
-        for stat in all_strategy_stats:
-            strategy_id = stat['strategy_id']
-            for panel_id, strategies in panel_to_strategies.items():
-                if strategy_id in strategies:
-                    panel_stats[panel_id]['hits'] += stat['hits']
-                    panel_stats[panel_id]['misses'] += stat['misses']
-                    break
-        return jsonify(panel_stats)
+        return jsonify(calcular_acerto_paineis(cursor, mapping))
     except Exception as e:
         print(f"[ERRO AO BUSCAR STATS DOS PAINÉIS]: {e}")
         return jsonify({"erro": str(e)}), 500
 
+# Acertos/erros das últimas 1h/6h/24h por estratégia e painel (blocos de 5 min em rollup_desfechos)
+@app.route('/api/stats/accuracy')
+@cacheado
+def api_stats_accuracy():
+    janela = request.args.get('janela')
+    if janela and janela not in rollups.JANELAS_ACERTO:
+        return jsonify({"erro": f"Janela inválida. Use uma de: {', '.join(rollups.JANELAS_ACERTO)}."}), 400
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        acertos = storage.acertos_por_janela(cursor, load_strategy_mapping())
+        return jsonify(acertos[janela] if janela else acertos)
+    except Exception as e:
+        print(f"[ERRO API /api/stats/accuracy]: {e}")
+        return jsonify({"erro": str(e)}), 500
+
+@app.route('/api/stats/streaks')
+@cacheado
+def api_stats_streaks():
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        return jsonify(rollups.sequencias_de_acertos(cursor, load_strategy_mapping()))
+    except Exception as e:
+        print(f"[ERRO API /api/stats/streaks]: {e}")
+        return jsonify({"erro": str(e)}), 500
+
+# ?length=1..8, janela por ?horas=N ou ?inicio=&fim= (padrão: hoje), ?limite=10, ?transicoes=1
 @app.route('/api/stats/sequences')
+@cacheado
 def api_stats_sequences():
+    length = request.args.get('length', 4, type=int)
+    limite = request.args.get('limite', 10, type=int)
+    transicoes = request.args.get('transicoes', '0').lower() in ('1', 'true', 'sim')
+    if not length or not 1 <= length <= rollups.TAMANHO_MAXIMO_SEQUENCIA:
+        return jsonify({"erro": f"O parâmetro 'length' deve estar entre 1 e {rollups.TAMANHO_MAXIMO_SEQUENCIA}."}), 400
+    if not limite or not 1 <= limite <= 100:
+        return jsonify({"erro": "O parâmetro 'limite' deve estar entre 1 e 100."}), 400
+    try:
+        inicio, fim = rollups.janela_de_consulta(request.args)
+    except ValueError as e:
+        return jsonify({"erro": f"Janela inválida: {e}"}), 400
     try:
-        length = request.args.get('length', 4, type=int)
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         conn = get_db()
         cursor = conn.cursor()
-        query = "SELECT color FROM resultados WHERE timestamp_iso >= %s ORDER BY timestamp_iso ASC"
-        cursor.execute(query, (today_start,))
-        all_colors_today = [row['color'] for row in cursor.fetchall()]
-        sequences_before_white = []
-        for i, color in enumerate(all_colors_today):
-            if color == 'Branco' and i >= length:
-                sequence = tuple(all_colors_today[i-length:i])
-                sequences_before_white.append(sequence)
-        sequence_counts = Counter(sequences_before_white)
-        most_common = sequence_counts.most_common(10)
-        formatted_sequences = [{'sequence': list(seq), 'count': count} for seq, count in most_common]
-        return jsonify(formatted_sequences)
+        return jsonify(storage.sequencias_antes_do_branco(cursor, length, inicio, fim, limite, transicoes))
     except Exception as e:
         print(f"[ERRO API /api/stats/sequences]: {e}")
         return jsonify({"erro": str(e)}), 500
@@ -463,43 +562,98 @@ def api_arm_sequence():
     else:
         return jsonify({'status': 'erro', 'message': 'Falha ao salvar o arquivo de sequências.'}), 500
 
+# Aceitam ?inicio=YYYY-MM-DD&fim=YYYY-MM-DD (padrão: hoje); leem apenas os rollups
 @app.route('/api/stats/hourly_colors')
+@cacheado
 def api_stats_hourly_colors():
     try:
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        inicio, fim = rollups.intervalo_de_datas(request.args.get('inicio'), request.args.get('fim'))
+    except ValueError as e:
+        return jsonify({"erro": f"Intervalo de datas inválido: {e}"}), 400
+    try:
         conn = get_db()
         cursor = conn.cursor()
-        query = "SELECT color, timestamp_iso FROM resultados WHERE timestamp_iso >= %s"
-        cursor.execute(query, (today_start,))
-        results = cursor.fetchall()
-        hourly_counts = {f"{h:02d}": {"Preto": 0, "Vermelho": 0, "Branco": 0} for h in range(24)}
-        for row in results:
-            hour_key = row['timestamp_iso'].strftime('%H') # Já é datetime
-            color = row['color']
-            if color in hourly_counts[hour_key]:
-                hourly_counts[hour_key][color] += 1
-        return jsonify(hourly_counts)
+        return jsonify(storage.cores_por_hora(cursor, inicio, fim))
     except Exception as e:
         print(f"[ERRO API /api/stats/hourly_colors]: {e}")
         return jsonify({"erro": str(e)}), 500
 
 @app.route('/api/stats/white_minutes')
+@cacheado
 def api_stats_white_minutes():
     try:
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        inicio, fim = rollups.intervalo_de_datas(request.args.get('inicio'), request.args.get('fim'))
+    except ValueError as e:
+        return jsonify({"erro": f"Intervalo de datas inválido: {e}"}), 400
+    try:
         conn = get_db()
         cursor = conn.cursor()
-        query = "SELECT timestamp_iso FROM resultados WHERE color = 'Branco' AND timestamp_iso >= %s"
-        cursor.execute(query, (today_start,))
-        minutes = [row['timestamp_iso'].minute for row in cursor.fetchall()] # Já são datetime
-        minute_counts = Counter(minutes)
-        labels = [f"{m:02d}" for m in range(60)]
-        data = [minute_counts.get(m, 0) for m in range(60)]
-        return jsonify({"labels": labels, "data": data})
+        return jsonify(storage.brancos_por_minuto(cursor, inicio, fim))
     except Exception as e:
         print(f"[ERRO API /api/stats/white_minutes]: {e}")
         return jsonify({"erro": str(e)}), 500
 
+# --- Profiling (PERFIL_ATIVO=1; ver request_profiler.py) ---
+@app.route('/api/admin/perfil')
+@requer_admin
+def api_admin_perfil():
+    # ?rota= filtra as consultas lentas; ?limite= (padrão 50) é o número de consultas lentas
+    try:
+        limite = request.args.get('limite', 50, type=int)
+        return jsonify({
+            "limite_consulta_lenta_ms": request_profiler.LIMITE_CONSULTA_LENTA * 1000,
+            "rotas": request_profiler.resumo_por_rota(),
+            "consultas_lentas": request_profiler.consultas_lentas(limite, request.args.get('rota')),
+            "captura_armada": request_profiler.captura_armada(),
+            "capturas": request_profiler.listar_capturas(),
+        })
+    except Exception as e:
+        print(f"[ERRO API /api/admin/perfil]: {e}")
+        return jsonify({"erro": str(e)}), 500
+
+@app.route('/api/admin/perfil/captura', methods=['POST'])
+@requer_admin
+def api_admin_armar_captura():
+    # {"rota": "/api/resultados", "requisicoes": 3}: as próximas requisições da rota rodam com o profiler por amostragem
+    data = request.get_json(silent=True) or {}
+    rota = data.get('rota')
+    if not rota or not any(regra.rule == rota for regra in app.url_map.iter_rules()):
+        return jsonify({"erro": "Informe em 'rota' uma rota existente, ex.: '/api/resultados'."}), 400
+    try:
+        return jsonify(request_profiler.armar_captura(rota, int(data.get('requisicoes', 1))))
+    except (TypeError, ValueError) as e:
+        return jsonify({"erro": str(e)}), 400
+
+@app.route('/api/admin/perfil/capturas/<captura_id>')
+@requer_admin
+def api_admin_captura(captura_id):
+    saida = request_profiler.ler_captura(captura_id)
+    if saida is None:
+        return jsonify({"erro": "Captura não encontrada."}), 404
+    return Response(saida, mimetype='text/plain')
+
+# --- Exportação (streaming) ---
+# ?inicio=&fim= em ISO e ?formato=ndjson|csv; as linhas vêm de storage.linhas_para_exportacao (ver export_stream.py)
+@app.route('/api/export/<tabela>')
+def api_export(tabela):
+    if tabela not in ('resultados', 'sinais'):
+        return jsonify({"erro": "Tabela inválida. Use 'resultados' ou 'sinais'."}), 404
+    formato = request.args.get('formato', 'ndjson')
+    if formato not in export_stream.TIPOS:
+        return jsonify({"erro": "O parâmetro 'formato' deve ser 'ndjson' ou 'csv'."}), 400
+    try:
+        inicio, fim = export_stream.intervalo_de_exportacao(request.args)
+    except ValueError as e:
+        return jsonify({"erro": f"Intervalo inválido: {e}"}), 400
+    try:
+        resposta = export_stream.resposta(tabela, formato, inicio, fim, get_db_connection)
+    except Exception as e:
+        print(f"[ERRO API /api/export/{tabela}]: {e}")
+        return jsonify({"erro": str(e)}), 500
+    if resposta is None:
+        return jsonify({"erro": "Limite de exportações simultâneas atingido. Tente novamente em instantes."}), 429, {'Retry-After': '30'}
+    return resposta
+
 # Não usar app.run() diretamente em produção com Gunicorn
 # if __name__ == '__main__':
 #     load_strategy_mapping()
@@ -0,0 +1,449 @@
+# benchmark.py
+
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+# Benchmark reproduzível do coletor, contra um banco descartável (SQLite temporário ou um Postgres
+# local vazio). Gera um histórico sintético de giros e mede, em níveis crescentes de alvos pendentes:
+#   ciclo                     um giro novo de ponta a ponta: coletor_blaze.processar_giro (salvar_no_banco,
+#                             estratégias, salvar_sinal_no_banco) + processar_e_enviar_notificacoes
+#                             (process_and_filter_signals e o agrupamento das notificações)
+#   verificar_acertos         um branco que acerta alguns alvos (marcação, commit e edição da mensagem)
+#   gerenciar_sinais_antigos  a varredura completa de expiração com alguns alvos vencidos
+# O Telegram é substituído por funções locais que só devolvem ids, para que a rede fique fora da
+# medida; configurações e estados (strategies/*.json) vão para uma pasta temporária.
+# O resultado é um JSON com os parâmetros, o ambiente e os tempos (ms) de cada cenário, que o
+# subcomando 'comparar' confronta com outra execução (ex.: antes e depois de uma mudança).
+#
+# Uso (a partir da pasta app/):
+#   python benchmark.py executar -o depois.json
+#   python benchmark.py executar --backend postgres --historico 10000 --niveis 1000,10000 -o pg.json
+#   python benchmark.py comparar antes.json depois.json --limite 15
+#
+# Com --backend postgres, DATABASE_URL deve apontar para um banco só do benchmark: a execução
+# recusa bancos que já têm giros ou sinais e esvazia as tabelas no final (exceto com --manter-dados).
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VERSAO_FORMATO = 1
+NIVEIS_PADRAO = (1000, 10000, 100000)
+TAXA_BRANCOS_PADRAO = 1 / 15 # probabilidade de cada número na roleta (0 a 14)
+CADENCIA = timedelta(seconds=30) # um giro a cada 30 segundos, como na Blaze
+PAINEIS = ('1', '2', '3')
+INICIO_PENDENTES = timedelta(hours=2) # alvos semeados ficam à frente dos giros medidos
+JANELA_PENDENTES_MINUTOS = 720 # alvos semeados distribuídos minuto a minuto em 12 horas
+ALVOS_POR_REPETICAO = 3 # alvos que acertam (ou vencem) a cada repetição
+TABELAS_POSTGRES = ('resultados', 'sinais_alvos', 'sinais_gatilhos', 'notificacoes_enviadas', 'estrategia_stats',
+                    'rollup_cores_hora', 'rollup_brancos_minuto', 'rollup_intervalos_brancos', 'rollup_sequencias',
+                    'rollup_desfechos')
+
+coletor = None # coletor_blaze, importado depois de STORAGE_BACKEND ser definido
+_ids_telegram = itertools.count(1)
+chamadas_telegram = 0
+
+# --- Giros Sintéticos ---
+def cor_do_numero(roll):
+    if roll == 0: return "Branco"
+    return "Vermelho" if roll <= 7 else "Preto"
+
+def gerar_giros(quantidade, taxa_brancos, aleatorio, inicio):
+    """Giros a cada CADENCIA a partir de 'inicio'; brancos com probabilidade 'taxa_brancos'."""
+    from giro import Giro
+    giros = []
+    for i in range(quantidade):
+        roll = 0 if aleatorio.random() < taxa_brancos else aleatorio.randint(1, 14)
+        giros.append(Giro(f"bench-{inicio:%Y%m%d%H%M%S}-{i}", roll, cor_do_numero(roll), inicio + i * CADENCIA))
+    return giros
+
+# --- Telegram Local ---
+def _enviar_local(*args, **kwargs):
+    global chamadas_telegram
+    chamadas_telegram += 1
+    return next(_ids_telegram)
+
+def _editar_local(*args, **kwargs):
+    global chamadas_telegram
+    chamadas_telegram += 1
+    return True
+
+def _desligar_telegram():
+    for nome in ('send_signal_notification', 'send_confluence_notification'):
+        setattr(coletor, nome, _enviar_local)
+    for nome in ('edit_message_to_hit', 'edit_message_to_miss', 'edit_confluence_to_hit', 'edit_confluence_to_miss'):
+        setattr(coletor, nome, _editar_local)
+
+# --- Preparação ---
+def _importar_coletor(backend, sqlite_path, pasta):
+    global coletor
+    os.environ['STORAGE_BACKEND'] = backend
+    if sqlite_path:
+        os.environ['SQLITE_PATH'] = sqlite_path
+    os.environ['METRICAS_DIR'] = os.path.join(pasta, 'metricas')
+    os.environ['ARQUIVO_DIR'] = os.path.join(pasta, 'archive')
+    sys.path.insert(0, BASE_DIR)
+    import coletor_blaze
+    coletor = coletor_blaze
+
+def _isolar_estado(pasta, estrategias, confluencia):
+    """Configurações sintéticas numa pasta temporária: estratégias ativas, painéis em rodízio, ativador desligado."""
+    import confluence_tracker
+    import latency_tracker
+    import sequence_matcher
+    import signal_logic
+    mapping = {sid: PAINEIS[i % len(PAINEIS)] for i, sid in enumerate(sorted(estrategias))}
+    arquivos = {
+        'strategy_status.json': {sid: True for sid in estrategias},
+        'strategyColumnMapping.json': mapping,
+        'confluenceModeSettings.json': {painel: confluencia for painel in PAINEIS},
+        'activatorModeSettings.json': {painel: False for painel in PAINEIS},
+        'activator_state.json': {"last_activation_timestamp": None},
+        'armed_sequences.json': [],
+    }
+    for nome, conteudo in arquivos.items():
+        with open(os.path.join(pasta, nome), 'w') as f: json.dump(conteudo, f)
+    coletor.status_file_path = os.path.join(pasta, 'strategy_status.json')
+    coletor.MAPPING_CONFIG_PATH = os.path.join(pasta, 'strategyColumnMapping.json')
+    coletor.CONFLUENCE_CONFIG_PATH = os.path.join(pasta, 'confluenceModeSettings.json')
+    coletor.ACTIVATOR_CONFIG_PATH = os.path.join(pasta, 'activatorModeSettings.json')
+    coletor.ACTIVATOR_STATE_FILE = signal_logic.ACTIVATOR_STATE_FILE = os.path.join(pasta, 'activator_state.json')
+    sequence_matcher.ARMED_SEQUENCES_FILE = os.path.join(pasta, 'armed_sequences.json')
+    sequence_matcher.SEQUENCE_ALERTS_STATE_FILE = os.path.join(pasta, 'sequence_alerts_state.json')
+    confluence_tracker.CONFLUENCE_STATE_FILE = os.path.join(pasta, 'confluence_state.json')
+    latency_tracker.LATENCY_STATE_FILE = os.path.join(pasta, 'latency_state.json')
+    return mapping
+
+def _banco_vazio(cursor):
+    return coletor.storage.ultimo_resultado(cursor) is None and not coletor.storage.alvos_pendentes(cursor)
+
+def preparar_particoes(cursor, inicio):
+    # No Postgres, 'resultados' é particionado por dia: o histórico sintético pode começar dias atrás
+    import partition_manager
+    dia = inicio.date()
+    while dia <= datetime.now().date():
+        for config in partition_manager.TABELAS.values():
+            partition_manager.criar_particao(cursor, config['particionada'], dia)
+        dia += timedelta(days=1)
+
+def _limpar_postgres(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"TRUNCATE {', '.join(TABELAS_POSTGRES)}")
+    conn.commit()
+
+def semear_historico(conn, giros):
+    import storage
+    cursor = conn.cursor()
+    if storage.STORAGE_BACKEND == 'postgres':
+        preparar_particoes(cursor, giros[0].timestamp_iso)
+    for i, giro in enumerate(giros, 1):
+        storage.inserir_resultado(cursor, giro)
+        if i % 1000 == 0: conn.commit()
+    conn.commit()
+
+def _semear_alvos(cursor, estrategias, alvos_por_estrategia, rotulo):
+    """Um gatilho por estratégia com os alvos dados, já com mensagem no Telegram. Retorna os alvos criados."""
+    criados = []
+    for strategy_id in estrategias:
+        novos = coletor.storage.registrar_sinal(cursor, strategy_id, estrategias[strategy_id].NOME,
+                                                f"bench-{rotulo}", "Benchmark", alvos_por_estrategia)
+        for alvo in novos:
+            coletor.storage.definir_mensagem_telegram(cursor, [alvo['id']], next(_ids_telegram))
+        criados.extend(novos)
+    return criados
+
+_sequencia_alvos = itertools.count()
+
+def _preparar_alvos(estrategias, alvos, rotulo, retorno):
+    """Semeia ALVOS_POR_REPETICAO alvos (gatilhos novos) fora da medida e devolve 'retorno'."""
+    conn = coletor.get_db_connection_collector()
+    cursor = conn.cursor()
+    selecionadas = dict(itertools.islice(estrategias.items(), ALVOS_POR_REPETICAO))
+    for sinal in _semear_alvos(cursor, selecionadas, alvos, f"{rotulo}-{next(_sequencia_alvos)}"):
+        coletor.expiry_scheduler.agendar(sinal['id'], sinal['target_timestamp'])
+    conn.commit()
+    conn.close()
+    return retorno
+
+def semear_alvos_pendentes(conn, estrategias, quantidade, lote, inicio):
+    """
+    Completa os alvos pendentes até 'quantidade', em gatilhos por estratégia (em rodízio) com um alvo
+    por minuto a partir de 'inicio'. Retorna o total de pendentes no banco.
+    """
+    import storage
+    cursor = conn.cursor()
+    faltam = quantidade - len(storage.alvos_pendentes(cursor))
+    inicio = inicio.replace(second=0, microsecond=0)
+    ids = sorted(estrategias)
+    for indice in itertools.count():
+        if faltam <= 0: break
+        strategy_id = ids[indice % len(ids)]
+        total = min(faltam, JANELA_PENDENTES_MINUTOS)
+        alvos = [inicio + timedelta(minutes=m) for m in range(total)]
+        faltam -= len(storage.registrar_sinal(cursor, strategy_id, estrategias[strategy_id].NOME,
+                                              f"bench-pendentes-{lote}-{indice}", "Benchmark", alvos))
+        conn.commit()
+    return len(storage.alvos_pendentes(cursor))
+
+def semear_pendentes(estrategias, quantidade, lote):
+    """Pendentes do nível, à frente dos giros medidos, já carregados nas estruturas em memória do coletor."""
+    conn = coletor.get_db_connection_collector()
+    total = semear_alvos_pendentes(conn, estrategias, quantidade, lote, datetime.now() + INICIO_PENDENTES)
+    # Como no startup do coletor; as notificações dos novos alvos saem aqui (fora da medida)
+    coletor.expiry_scheduler.reconstruir(conn.cursor())
+    coletor.confluence_tracker.reconstruir(conn.cursor())
+    conn.close()
+    coletor.processar_e_enviar_notificacoes()
+    return total
+
+# --- Medição ---
+def percentil(ordenados, fracao):
+    # Posição mais próxima (nearest-rank), como em latency_tracker
+    return ordenados[max(0, math.ceil(fracao * len(ordenados)) - 1)]
+
+def resumir(duracoes_ms):
+    ordenados = sorted(duracoes_ms)
+    return {"amostras": len(ordenados), "min_ms": round(ordenados[0], 3), "mediana_ms": round(statistics.median(ordenados), 3),
+            "p95_ms": round(percentil(ordenados, 0.95), 3), "max_ms": round(ordenados[-1], 3),
+            "media_ms": round(statistics.fmean(ordenados), 3)}
+
+def _tempos_de_banco():
+    # Soma e total por etapa do histograma do coletor (coletor_banco_segundos)
+    return {chave[0]: (serie[-2], serie[-1]) for chave, serie in coletor.TEMPO_BANCO.series.items()}
+
+def medir(repeticoes, preparar, executar, verboso):
+    """Executa 'preparar' (fora da medida) e 'executar' (medido) 'repeticoes' vezes."""
+    global chamadas_telegram
+    duracoes = []
+    banco_antes = _tempos_de_banco()
+    chamadas_telegram = 0
+    saida = None if verboso else open(os.devnull, 'w')
+    try:
+        for _ in range(repeticoes):
+            argumento = preparar()
+            with redirect_stdout(saida or sys.stdout):
+                inicio = time.perf_counter()
+                executar(argumento)
+                duracoes.append((time.perf_counter() - inicio) * 1000)
+    finally:
+        if saida: saida.close()
+    resultado = resumir(duracoes)
+    resultado["chamadas_telegram"] = chamadas_telegram
+    banco = {}
+    for etapa, (soma, total) in _tempos_de_banco().items():
+        soma_antes, total_antes = banco_antes.get(etapa, (0.0, 0))
+        if total > total_antes:
+            banco[etapa] = {"chamadas": total - total_antes, "total_ms": round((soma - soma_antes) * 1000, 3)}
+    resultado["banco_por_etapa"] = banco
+    return resultado
+
+def commit_atual():
+    try:
+        saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True, timeout=5)
+        return saida.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+# --- Execução ---
+def executar(args):
+    pasta = tempfile.mkdtemp(prefix='monitor_blaze_benchmark_')
+    sqlite_path = os.path.join(pasta, 'benchmark.db') if args.backend == 'sqlite' else None
+    _importar_coletor(args.backend, sqlite_path, pasta)
+    _desligar_telegram()
+
+    todas = coletor.strategy_registry.obter_estrategias()
+    if args.estrategias:
+        desconhecidas = set(args.estrategias) - set(todas)
+        if desconhecidas:
+            raise SystemExit(f"Estratégias desconhecidas: {', '.join(sorted(desconhecidas))}")
+        estrategias = {sid: todas[sid] for sid in args.estrategias}
+    else:
+        estrategias = dict(todas)
+    mapping = _isolar_estado(pasta, estrategias, args.confluencia)
+
+    conn = coletor.get_db_connection_collector()
+    if args.backend == 'postgres':
+        coletor.storage.inicializar_esquema(conn)
+        conn.commit()
+        if not _banco_vazio(conn.cursor()):
+            conn.close()
+            shutil.rmtree(pasta, ignore_errors=True)
+            raise SystemExit("O banco de DATABASE_URL já tem giros ou sinais. Use um banco só para o benchmark.")
+    conn.close()
+
+    aleatorio = random.Random(args.semente)
+    agora = datetime.now().replace(microsecond=0)
+    total_medidos = len(args.niveis) * args.repeticoes
+    historico = gerar_giros(args.historico, args.taxa_brancos, aleatorio, agora - args.historico * CADENCIA)
+    # Os giros medidos continuam o histórico; brancos entram no ciclo conforme a mesma taxa
+    giros_medidos = iter(gerar_giros(total_medidos, args.taxa_brancos, aleatorio, agora))
+
+    coletor.todas_estrategias = estrategias
+    coletor.confluence_tracker.iniciar()
+    coletor.expiry_scheduler.iniciar()
+    coletor.event_bus.inscrever(coletor.event_bus.CONFLUENCIA_ATINGIDA, coletor._ao_atingir_confluencia)
+
+    print(f"Backend: {args.backend} | estratégias: {len(estrategias)} | histórico: {args.historico} giros")
+    resultado = {
+        "versao_formato": VERSAO_FORMATO,
+        "gerado_em": datetime.now().isoformat(timespec='seconds'),
+        "ambiente": {"backend": args.backend, "python": platform.python_version(), "plataforma": platform.platform(),
+                     "commit": commit_atual()},
+        "parametros": {"historico": args.historico, "taxa_brancos": args.taxa_brancos, "semente": args.semente,
+                       "repeticoes": args.repeticoes, "niveis": args.niveis, "confluencia": args.confluencia,
+                       "estrategias": sorted(estrategias)},
+        "niveis": [],
+    }
+    try:
+        inicio = time.perf_counter()
+        conn = coletor.get_db_connection_collector()
+        semear_historico(conn, historico)
+        conn.close()
+        print(f"Histórico semeado em {time.perf_counter() - inicio:.1f}s.")
+
+        conn = coletor.get_db_connection_collector()
+        cursor = conn.cursor()
+        coletor.confluence_tracker.sincronizar(cursor, coletor.ler_status_ativo(), mapping, {p: args.confluencia for p in PAINEIS})
+        coletor.sequence_matcher.atualizar(cursor)
+        conn.close()
+
+        contador_lotes = itertools.count()
+        for nivel in args.niveis:
+            inicio = time.perf_counter()
+            pendentes = semear_pendentes(estrategias, nivel, next(contador_lotes))
+            print(f"\n{pendentes} alvo(s) pendente(s) (semeados em {time.perf_counter() - inicio:.1f}s).")
+            cenarios = {}
+
+            def ciclo(giro):
+                conn_collector = coletor.get_db_connection_collector()
+                try:
+                    coletor.processar_giro(conn_collector, giro)
+                finally:
+                    conn_collector.close()
+                coletor.processar_e_enviar_notificacoes()
+            cenarios["ciclo"] = medir(args.repeticoes, lambda: next(giros_medidos), ciclo, args.verboso)
+
+            # O branco fica entre os giros medidos e os alvos semeados; a cada repetição novos alvos no minuto dele
+            from giro import Giro
+            horario_branco = (datetime.now() + INICIO_PENDENTES / 2).replace(second=10, microsecond=0)
+            brancos = (Giro(f"bench-branco-{nivel}-{i}", 0, "Branco", horario_branco) for i in itertools.count())
+            def preparar_acertos():
+                return _preparar_alvos(estrategias, [horario_branco.replace(second=0)], f"acertos-{nivel}", next(brancos))
+            cenarios["verificar_acertos"] = medir(args.repeticoes, preparar_acertos, coletor.verificar_acertos, args.verboso)
+
+            def preparar_vencidos():
+                vencido = (datetime.now() - coletor.expiry_scheduler.TOLERANCIA_EXPIRACAO * 5).replace(second=0, microsecond=0)
+                return _preparar_alvos(estrategias, [vencido], f"vencidos-{nivel}", None)
+            cenarios["gerenciar_sinais_antigos"] = medir(args.repeticoes, preparar_vencidos,
+                                                         lambda _: coletor.gerenciar_sinais_antigos(), args.verboso)
+
+            resultado["niveis"].append({"pendentes_alvo": nivel, "pendentes": pendentes, "cenarios": cenarios})
+            for nome, medida in cenarios.items():
+                print(f"  {nome:<26} mediana {medida['mediana_ms']:>9.2f} ms | p95 {medida['p95_ms']:>9.2f} ms | máx {medida['max_ms']:>9.2f} ms")
+    finally:
+        if args.backend == 'postgres' and not args.manter_dados:
+            conn = coletor.get_db_connection_collector()
+            _limpar_postgres(conn)
+            conn.close()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f: json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\nResultado gravado em {args.saida}")
+    else:
+        json.dump(resultado, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+
+# --- Comparação ---
+def comparar(antes, depois, limite, destino=sys.stdout):
+    """Mediana e p95 de cada cenário nos dois resultados. Retorna as regressões acima de 'limite' (%)."""
+    if antes.get("versao_formato") != depois.get("versao_formato"):
+        raise SystemExit("Os arquivos têm versões de formato diferentes.")
+    for chave in ('backend',):
+        if antes["ambiente"][chave] != depois["ambiente"][chave]:
+            print(f"Aviso: {chave} diferente ({antes['ambiente'][chave]} x {depois['ambiente'][chave]}).", file=destino)
+    if antes["parametros"] != depois["parametros"]:
+        print("Aviso: parâmetros diferentes entre as execuções; os tempos podem não ser comparáveis.", file=destino)
+
+    regressoes = []
+    niveis_antes = {n["pendentes_alvo"]: n for n in antes["niveis"]}
+    print(f"{'pendentes':>9}  {'cenário':<26} {'mediana antes':>13} {'depois':>9} {'Δ%':>7}  {'p95 antes':>9} {'depois':>9} {'Δ%':>7}", file=destino)
+    for nivel in depois["niveis"]:
+        anterior = niveis_antes.get(nivel["pendentes_alvo"])
+        if not anterior: continue
+        for nome, medida in nivel["cenarios"].items():
+            base = anterior["cenarios"].get(nome)
+            if not base: continue
+            variacoes = []
+            for campo in ('mediana_ms', 'p95_ms'):
+                variacoes.append((medida[campo] - base[campo]) / base[campo] * 100 if base[campo] else 0.0)
+            print(f"{nivel['pendentes_alvo']:>9}  {nome:<26} {base['mediana_ms']:>13.2f} {medida['mediana_ms']:>9.2f} {variacoes[0]:>+7.1f}"
+                  f"  {base['p95_ms']:>9.2f} {medida['p95_ms']:>9.2f} {variacoes[1]:>+7.1f}", file=destino)
+            if variacoes[0] > limite:
+                regressoes.append((nivel["pendentes_alvo"], nome, round(variacoes[0], 1)))
+    return regressoes
+
+def _niveis(texto):
+    try:
+        niveis = sorted({int(parte) for parte in texto.split(',') if parte.strip()})
+    except ValueError:
+        raise argparse.ArgumentTypeError("Use números separados por vírgula, ex.: 1000,10000,100000")
+    if not niveis or niveis[0] < 0:
+        raise argparse.ArgumentTypeError("Informe ao menos um nível não negativo.")
+    return niveis
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do ciclo do coletor e do pipeline de sinais.")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p_executar = comandos.add_parser('executar', help="Semeia um banco descartável e mede os cenários.")
+    p_executar.add_argument('--backend', choices=('sqlite', 'postgres'), default='sqlite',
+                            help="sqlite: arquivo temporário; postgres: banco vazio de DATABASE_URL.")
+    p_executar.add_argument('--historico', type=int, default=5000, help="Giros semeados antes das medidas (padrão: 5000).")
+    p_executar.add_argument('--taxa-brancos', type=float, default=TAXA_BRANCOS_PADRAO, help="Probabilidade de branco (padrão: 1/15).")
+    p_executar.add_argument('--semente', type=int, default=42, help="Semente do gerador de giros (padrão: 42).")
+    p_executar.add_argument('--niveis', type=_niveis, default=list(NIVEIS_PADRAO), help="Alvos pendentes (padrão: 1000,10000,100000).")
+    p_executar.add_argument('--repeticoes', type=int, default=20, help="Medidas por cenário e nível (padrão: 20).")
+    p_executar.add_argument('--estrategias', type=lambda t: [s.strip() for s in t.split(',') if s.strip()],
+                            help="IDs separados por vírgula (padrão: todas as registradas).")
+    p_executar.add_argument('--confluencia', action='store_true', help="Liga o modo confluência nos painéis.")
+    p_executar.add_argument('--manter-dados', action='store_true', help="Postgres: não esvazia as tabelas no final.")
+    p_executar.add_argument('--verboso', action='store_true', help="Mostra as mensagens do coletor durante as medidas.")
+    p_executar.add_argument('-o', '--saida', help="Arquivo JSON de saída (padrão: stdout)")
+
+    p_comparar = comandos.add_parser('comparar', help="Compara dois resultados de 'executar'.")
+    p_comparar.add_argument('antes')
+    p_comparar.add_argument('depois')
+    p_comparar.add_argument('--limite', type=float, default=10.0, help="Regressão máxima aceita na mediana, em %% (padrão: 10).")
+
+    args = parser.parse_args(argv)
+    if args.comando == 'executar':
+        if args.historico < 1 or args.repeticoes < 1:
+            parser.error("--historico e --repeticoes devem ser positivos.")
+        if not 0 <= args.taxa_brancos <= 1:
+            parser.error("--taxa-brancos deve estar entre 0 e 1.")
+        if args.backend == 'postgres' and not os.environ.get('DATABASE_URL'):
+            parser.error("--backend postgres requer DATABASE_URL.")
+        executar(args)
+        return
+
+    with open(args.antes, 'r', encoding='utf-8') as f: antes = json.load(f)
+    with open(args.depois, 'r', encoding='utf-8') as f: depois = json.load(f)
+    regressoes = comparar(antes, depois, args.limite)
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões) acima de {args.limite}%: " +
+              ", ".join(f"{nome} com {nivel} pendentes ({variacao:+}%)" for nivel, nome, variacao in regressoes))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+# bulk_io.py
+
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from psycopg2 import extras
+
+import compact_schema
+import partition_manager
+import rollups
+
+# Importação/exportação em massa do histórico de giros, fora do coletor.
+# Importação: CSV, NDJSON ou o SQLite antigo (database/blaze_data.db), enviados com COPY para uma
+# tabela temporária e só então inseridos em 'resultados' (criando as partições dos dias necessários).
+# Exportação: 'resultados' ou 'sinais' num intervalo de dias, com os dias já arquivados lidos do
+# arquivo e o restante com cursor nomeado (do lado do servidor), em memória constante.
+#
+# Uso (a partir da pasta app/, com DATABASE_URL configurada):
+#   python bulk_io.py importar historico.csv
+#   python bulk_io.py importar ../database/blaze_data.db --formato sqlite
+#   python bulk_io.py exportar --tabela resultados --inicio 2024-05-01 --fim 2024-05-07 --formato ndjson -o maio.ndjson
+#
+# Observação: dias importados que já estão fora da retenção (49h) são arquivados e removidos do
+# banco na próxima limpeza do coletor, e continuam legíveis por partition_manager.consultar().
+# Num dia que já tem arquivo, as linhas já arquivadas são ignoradas e as novas são juntadas ao
+# arquivo existente no próximo arquivamento (partition_manager.arquivar_dia).
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+MAPA_CORES = {1: "Vermelho", 2: "Preto", 0: "Branco"} # códigos da API da Blaze
+TAMANHO_LOTE = 5000 # linhas por ida ao servidor no cursor nomeado
+FORMATOS = ('csv', 'ndjson', 'sqlite')
+
+def get_db_connection():
+    if not DATABASE_URL:
+        raise Exception("DATABASE_URL não configurada. Conexão com o banco de dados falhou.")
+    return compact_schema.conectar(DATABASE_URL, sslmode='require')
+
+# --- Leitura das Fontes ---
+def _ler_csv(caminho):
+    with open(caminho, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+def _ler_ndjson(caminho):
+    with open(caminho, encoding='utf-8') as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+def _ler_sqlite(caminho):
+    conexao = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+    conexao.row_factory = sqlite3.Row
+    try:
+        yield from conexao.execute("SELECT id, created_at, roll, color, timestamp_iso FROM resultados ORDER BY timestamp_iso")
+    finally:
+        conexao.close()
+
+LEITORES = {'csv': _ler_csv, 'ndjson': _ler_ndjson, 'sqlite': _ler_sqlite}
+
+def _cor(valor):
+    if valor in compact_schema.CORES: return valor
+    try:
+        return MAPA_CORES.get(int(valor))
+    except (TypeError, ValueError):
+        return None
+
+def _horario(registro):
+    """Horário local do giro: 'timestamp_iso' (já local) ou 'created_at' (UTC da API ou o texto de exibição)."""
+    if registro.get('timestamp_iso'):
+        return str(registro['timestamp_iso'])
+    criado = registro.get('created_at')
+    if not criado: return None
+    if criado.endswith('Z'):
+        return datetime.fromisoformat(criado.replace('Z', '+00:00')).astimezone().isoformat()
+    return datetime.strptime(criado, "%d/%m/%Y %H:%M:%S").isoformat()
+
+def normalizar(registro):
+    """(id, roll, cor, horário) de um registro em qualquer formato aceito; None se não for aproveitável."""
+    try:
+        registro = dict(registro)
+        horario, cor = _horario(registro), _cor(registro.get('color'))
+        if not registro.get('id') or horario is None or cor is None: return None
+        return str(registro['id']), int(registro['roll']), cor, horario
+    except (KeyError, TypeError, ValueError):
+        return None
+
+class _FluxoCopy:
+    """Arquivo somente-leitura sobre um gerador de linhas CSV, para o copy_expert ler sob demanda."""
+    def __init__(self, linhas):
+        self._linhas = linhas
+        self._buffer = ''
+
+    def read(self, tamanho=-1):
+        while tamanho < 0 or len(self._buffer) < tamanho:
+            try:
+                self._buffer += next(self._linhas)
+            except StopIteration:
+                break
+        if tamanho < 0:
+            tamanho = len(self._buffer)
+        trecho, self._buffer = self._buffer[:tamanho], self._buffer[tamanho:]
+        return trecho
+
+# --- Importação ---
+def importar(caminho, formato, atualizar_rollups=True):
+    contagem = {'lidas': 0, 'rejeitadas': 0}
+    def linhas_csv():
+        saida = io.StringIO()
+        escritor = csv.writer(saida)
+        for registro in LEITORES[formato](caminho):
+            contagem['lidas'] += 1
+            valores = normalizar(registro)
+            if valores is None:
+                contagem['rejeitadas'] += 1
+                continue
+            saida.seek(0)
+            saida.truncate()
+            escritor.writerow(valores)
+            yield saida.getvalue()
+
+    inicio = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TEMP TABLE importacao_resultados (
+                id TEXT, roll SMALLINT, color cor_roleta, timestamp_iso TIMESTAMPTZ
+            ) ON COMMIT DROP;
+        """)
+        cursor.copy_expert("COPY importacao_resultados FROM STDIN WITH (FORMAT csv)", _FluxoCopy(linhas_csv()))
+        tempo_copy = time.perf_counter() - inicio
+
+        # Dias já arquivados: as linhas que estão no arquivo não voltam ao banco (nem aos rollups)
+        arquivadas = 0
+        cursor.execute("SELECT DISTINCT timestamp_iso::date FROM importacao_resultados")
+        dias_importados = {linha[0] for linha in cursor.fetchall()}
+        for dia in dias_importados.intersection(partition_manager.listar_arquivos('resultados')):
+            cursor.execute("DELETE FROM importacao_resultados WHERE id = ANY(%s)",
+                           (list(partition_manager.ids_arquivados('resultados', dia)),))
+            arquivadas += cursor.rowcount
+
+        cursor.execute("SELECT MIN(timestamp_iso)::date, MAX(timestamp_iso)::date FROM importacao_resultados")
+        dia, fim = cursor.fetchone()
+        while dia and dia <= fim:
+            partition_manager.criar_particao(cursor, 'resultados', dia)
+            dia += partition_manager.UM_DIA
+        # Só as linhas realmente novas (sem as duplicadas) são somadas aos rollups
+        cursor.execute("CREATE TEMP TABLE importacao_novas (LIKE resultados) ON COMMIT DROP;")
+        cursor.execute("""
+            WITH novas AS (
+                INSERT INTO resultados (id, roll, color, timestamp_iso)
+                SELECT id, roll, color, timestamp_iso FROM importacao_resultados
+                ON CONFLICT DO NOTHING
+                RETURNING id, roll, color, timestamp_iso
+            )
+            INSERT INTO importacao_novas (id, roll, color, timestamp_iso) SELECT * FROM novas;
+        """)
+        inseridas = cursor.rowcount
+        if atualizar_rollups and inseridas:
+            rollups.acumular_rollups(cursor, origem='importacao_novas')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    total = time.perf_counter() - inicio
+    validas = contagem['lidas'] - contagem['rejeitadas']
+    print(f"✅ {contagem['lidas']} linhas lidas, {contagem['rejeitadas']} rejeitadas, {arquivadas} já arquivadas, {inseridas} novas em 'resultados'.", file=sys.stderr)
+    print(f"⏱️  COPY: {tempo_copy:.2f}s ({validas / tempo_copy if tempo_copy else 0:.0f} linhas/s) | total: {total:.2f}s "
+          f"({contagem['lidas'] / total if total else 0:.0f} linhas/s)", file=sys.stderr)
+    return {'lidas': contagem['lidas'], 'rejeitadas': contagem['rejeitadas'], 'arquivadas': arquivadas,
+            'inseridas': inseridas, 'segundos': total}
+
+# --- Exportação ---
+def ler_intervalo(conn, tabela, inicio, fim, tamanho_lote=TAMANHO_LOTE):
+    """
+    Gera as linhas (dicionários) de 'resultados' ou 'sinais' com horário em [inicio, fim), em ordem,
+    incluindo os dias já arquivados (partition_manager.consultar). As linhas do banco vêm
+    tamanho_lote por vez de um cursor nomeado: a memória não cresce com o intervalo.
+    """
+    cursor = conn.cursor(name=f"exportacao_{tabela}", cursor_factory=extras.RealDictCursor)
+    cursor.itersize = tamanho_lote
+    try:
+        yield from partition_manager.consultar(cursor, tabela, inicio, fim)
+    finally:
+        cursor.close()
+
+def _valor_texto(valor):
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+def formatar(linhas, formato, colunas):
+    """Gera o texto de exportação (CSV com cabeçalho ou NDJSON), uma linha por vez."""
+    if formato == 'ndjson':
+        for linha in linhas:
+            yield json.dumps({coluna: _valor_texto(linha[coluna]) for coluna in colunas}, ensure_ascii=False) + '\n'
+        return
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    escritor.writerow(colunas)
+    yield saida.getvalue()
+    for linha in linhas:
+        saida.seek(0)
+        saida.truncate()
+        escritor.writerow([_valor_texto(linha[coluna]) for coluna in colunas])
+        yield saida.getvalue()
+
+def exportar(tabela, formato, inicio, fim, destino):
+    inicio_execucao = time.perf_counter()
+    total = 0
+    conn = get_db_connection()
+    try:
+        for trecho in formatar(ler_intervalo(conn, tabela, inicio, fim), formato, partition_manager.TABELAS[tabela]['colunas']):
+            destino.write(trecho)
+            total += 1
+        conn.rollback()
+    finally:
+        conn.close()
+    linhas = total - 1 if formato == 'csv' else total # sem o cabeçalho
+    segundos = time.perf_counter() - inicio_execucao
+    print(f"✅ {linhas} linhas de '{tabela}' exportadas em {segundos:.2f}s ({linhas / segundos if segundos else 0:.0f} linhas/s).", file=sys.stderr)
+    return {'linhas': linhas, 'segundos': segundos}
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importação/exportação em massa do histórico de giros.")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p_importar = comandos.add_parser('importar', help="Carrega giros em 'resultados' (CSV, NDJSON ou SQLite antigo).")
+    p_importar.add_argument('arquivo')
+    p_importar.add_argument('--formato', choices=FORMATOS, help="Padrão: deduzido pela extensão do arquivo.")
+    p_importar.add_argument('--sem-rollups', action='store_true', help="Não soma as linhas novas nos rollups.")
+
+    p_exportar = comandos.add_parser('exportar', help="Exporta um intervalo de dias de 'resultados' ou 'sinais'.")
+    p_exportar.add_argument('--tabela', choices=tuple(partition_manager.TABELAS), default='resultados')
+    p_exportar.add_argument('--formato', choices=('csv', 'ndjson'), default='csv')
+    p_exportar.add_argument('--inicio', help="YYYY-MM-DD (padrão: hoje)")
+    p_exportar.add_argument('--fim', help="YYYY-MM-DD (padrão: igual ao início)")
+    p_exportar.add_argument('-o', '--saida', help="Arquivo de saída (padrão: stdout)")
+
+    args = parser.parse_args(argv)
+    if args.comando == 'importar':
+        formato = args.formato or {'.db': 'sqlite', '.sqlite': 'sqlite', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}.get(
+            os.path.splitext(args.arquivo)[1].lower(), 'csv')
+        importar(args.arquivo, formato, atualizar_rollups=not args.sem_rollups)
+        return
+
+    try:
+        inicio, fim = rollups.intervalo_de_datas(args.inicio, args.fim)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.saida:
+        with open(args.saida, 'w', newline='', encoding='utf-8') as destino:
+            exportar(args.tabela, args.formato, inicio, fim, destino)
+    else:
+        exportar(args.tabela, args.formato, inicio, fim, sys.stdout)
+
+if __name__ == "__main__":
+    main()
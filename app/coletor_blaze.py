@@ -3,13 +3,9 @@
 import requests
 import json
 import time
-import sqlite3 # Ainda pode ser útil para alguma lógica local, mas não para o DB principal
 import os
-import importlib.util
-from collections import defaultdict, Counter
-from datetime import datetime, timezone, timedelta
-import psycopg2 # Importar para PostgreSQL
-from psycopg2 import extras # Para usar RowFactory similar ao SQLite
+from collections import defaultdict
+from datetime import datetime, timedelta
 
 # Importa as funções de notificação do telegram_notifier
 from telegram_notifier import send_signal_notification, send_confluence_notification, edit_message_to_hit, edit_message_to_miss, edit_confluence_to_hit, edit_confluence_to_miss
@@ -17,6 +13,36 @@ from telegram_notifier import send_signal_notification, send_confluence_notifica
 # Importa a lógica de sinais do arquivo centralizado
 from signal_logic import process_and_filter_signals
 
+# Barramento de eventos do ciclo de vida dos sinais (criado/acerto/expirado)
+import event_bus
+
+# Registro de estratégias compartilhado com o app web (cache + recarga por mtime)
+import strategy_registry
+
+# Execução opcional de estratégias pesadas/não confiáveis em processos separados
+import strategy_sandbox
+
+# Estrutura incremental de confluências (painel -> minuto -> estratégias)
+import confluence_tracker
+
+# Prazos dos alvos pendentes em memória (expiração sem varrer a tabela 'sinais')
+import expiry_scheduler
+
+# Autômato das sequências armadas (alertas visual/sonoro), avançado uma vez por giro
+import sequence_matcher
+
+# Repositório de dados (Postgres ou SQLite embutido, ver storage.py)
+import storage
+
+# Registro do giro com os campos de horário já calculados
+from giro import Giro
+
+# Métricas publicadas para a rota /metrics do app web
+import metricas
+
+# Latência ponta a ponta (created_at do giro -> Telegram), publicada para /api/latencia
+import latency_tracker
+
 # --- Configuração de Caminhos ---
 script_dir = os.path.dirname(os.path.abspath(__file__)) 
 base_dir = os.path.dirname(script_dir)
@@ -31,21 +57,33 @@ ACTIVATOR_CONFIG_PATH = os.path.join(strategies_folder, 'activatorModeSettings.j
 ACTIVATOR_STATE_FILE = os.path.join(strategies_folder, 'activator_state.json')
 
 # --- Constantes ---
-url = "https://blaze.bet.br/api/singleplayer-originals/originals/roulette_games/recent/1"
-MAPA_CORES = {1: "Vermelho", 2: "Preto", 0: "Branco"}
+# BLAZE_API_URL troca a API real por outra base (ex.: o servidor falso de fake_apis.py)
+BLAZE_API_URL = os.environ.get('BLAZE_API_URL', 'https://blaze.bet.br').rstrip('/')
+url = f"{BLAZE_API_URL}/api/singleplayer-originals/originals/roulette_games/recent/1"
+INTERVALO_COLETA = float(os.environ.get('INTERVALO_COLETA', 2)) # segundos entre consultas à API da Blaze
+INTERVALO_LIMPEZA = 60 # segundos entre as rotinas de retenção do banco
+RETENCAO_NOTIFICACOES = timedelta(hours=2) # chaves de notificação guardadas após o horário alvo
+TAMANHO_HISTORICO = 50 # giros passados para as estratégias
 last_notifier_warning_time = None
 
+# --- Métricas (ver metricas.py) ---
+TEMPO_COLETA = metricas.histograma('coleta_api_segundos', 'Latência da consulta à API da Blaze.')
+FALHAS_COLETA = metricas.contador('coleta_api_falhas_total', 'Consultas à API da Blaze sem resposta válida.')
+TEMPO_CICLO = metricas.histograma('coletor_ciclo_segundos', 'Duração de um ciclo do coletor, sem a espera entre coletas.')
+TEMPO_BANCO = metricas.histograma('coletor_banco_segundos', 'Tempo no banco por etapa do coletor.', ('etapa',))
+DURACAO_VERIFICAR = strategy_sandbox.DURACAO_VERIFICAR # mesma série das estratégias isoladas
+SINAIS_EMITIDOS = metricas.contador('sinais_emitidos_total', 'Alvos de sinal gravados, por estratégia.', ('estrategia',))
+GIROS_PROCESSADOS = metricas.contador('giros_processados_total', 'Giros novos recebidos da API da Blaze.')
+
 # Variável global para armazenar as estratégias carregadas
 todas_estrategias = {}
 
-# --- Configuração do PostgreSQL para o Coletor ---
-DATABASE_URL = os.environ.get('DATABASE_URL') # Render fornece isso automaticamente para o DB gerenciado
-
+# --- Conexão do Coletor ---
+# O backend (Postgres via DATABASE_URL ou SQLite embutido) é escolhido por STORAGE_BACKEND
 def get_db_connection_collector():
-    if not DATABASE_URL:
-        raise Exception("DATABASE_URL não configurada. Conexão com o banco de dados falhou.")
-    conn = psycopg2.connect(DATABASE_URL, sslmode='require')
-    return conn
+    # Linhas como dicionários em todos os cursores da conexão
+    with metricas.cronometrar(TEMPO_BANCO, 'conexao'):
+        return storage.conectar(dicionario=True)
 
 # --- FUNÇÕES DO COLETOR ---
 
@@ -73,62 +111,46 @@ def ensure_config_files_exist():
 #     conn.commit()
 #     conn.close()
 
-def salvar_no_banco(conn, game_id, data_formatada, data_iso_db, roll, cor):
+def salvar_no_banco(conn, giro):
     try:
-        cursor = conn.cursor()
-        # Usar INSERT INTO ... ON CONFLICT DO NOTHING para PostgreSQL
-        cursor.execute("""
-            INSERT INTO resultados (id, created_at, roll, color, timestamp_iso)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (id) DO NOTHING;
-        """, (game_id, data_formatada, roll, cor, data_iso_db))
-        conn.commit()
-    except psycopg2.Error as e: print(f"\n[ERRO DE BANCO DE DADOS]: {e}")
+        with metricas.cronometrar(TEMPO_BANCO, 'resultado'):
+            storage.inserir_resultado(conn.cursor(), giro)
+            conn.commit()
+    except storage.ERROS_DE_BANCO as e:
+        print(f"\n[ERRO DE BANCO DE DADOS]: {e}")
+        conn.rollback()
 
 def salvar_sinal_no_banco(conn, strategy_id, strategy_name, signal_data):
-    cursor = conn.cursor()
-    trigger_id = signal_data['trigger_id']
-    num_targets = len(signal_data.get('targets', []))
-    if num_targets == 0: return
-    
-    # Verificar se o sinal já existe para evitar duplicatas
-    # Usar EXISTS para PostgreSQL
-    query_check = """
-        SELECT EXISTS (
-            SELECT 1 FROM sinais 
-            WHERE trigger_id = %s AND strategy_id = %s AND target_timestamp = %s
-        );
-    """
-    
-    signals_added_count = 0
-    context_message = signal_data['message']
+    if not signal_data.get('targets'): return
 
-    for target_datetime in signal_data['targets']:
-        target_iso = target_datetime # Já é um datetime object
-        
-        cursor.execute(query_check, (trigger_id, strategy_id, target_iso))
-        if cursor.fetchone()[0]: # Se já existe, pula
-            continue
-
-        cursor.execute("""
-            INSERT INTO sinais (trigger_id, strategy_id, strategy_name, message, target_timestamp)
-            VALUES (%s, %s, %s, %s, %s);
-        """, (trigger_id, strategy_id, strategy_name, context_message, target_iso))
-        signals_added_count += 1
-    
-    if signals_added_count > 0:
-        # Usar INSERT INTO ... ON CONFLICT (PRIMARY KEY) DO UPDATE para PostgreSQL
-        cursor.execute("""
-            INSERT INTO estrategia_stats (strategy_id, strategy_name, total_signals)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (strategy_id) DO UPDATE SET
-            total_signals = estrategia_stats.total_signals + EXCLUDED.total_signals,
-            strategy_name = EXCLUDED.strategy_name;
-        """, (strategy_id, strategy_name, signals_added_count))
-        print(f"\n✅ SINAL GERADO! Estratégia '{strategy_name}' acionada. {signals_added_count} alvo(s) salvo(s).")
-    conn.commit()
+    avaliado_em = time.time() # verificar() acabou de retornar este sinal
+    # Alvos já gravados para o mesmo gatilho são ignorados pelo repositório
+    with metricas.cronometrar(TEMPO_BANCO, 'sinal'):
+        sinais_criados = storage.registrar_sinal(
+            conn.cursor(), strategy_id, strategy_name, signal_data['trigger_id'], signal_data['message'], signal_data['targets'])
+        conn.commit()
+    latency_tracker.sinais_gravados(sinais_criados, avaliado_em, time.time())
+    if sinais_criados:
+        print(f"\n✅ SINAL GERADO! Estratégia '{strategy_name}' acionada. {len(sinais_criados)} alvo(s) salvo(s).")
+        SINAIS_EMITIDOS.incrementar(strategy_id, valor=len(sinais_criados))
+
+    for sinal in sinais_criados:
+        event_bus.emitir(event_bus.SINAL_CRIADO, sinal)
 
 
+def salvar_resultado_estrategia(conn, strategy_id, strategy_module, resultado_sinal):
+    # verificar() pode retornar None, um único sinal (dict) ou uma lista de sinais
+    sinais_a_salvar = []
+    if resultado_sinal:
+        if isinstance(resultado_sinal, list):
+            sinais_a_salvar.extend(resultado_sinal)
+        elif isinstance(resultado_sinal, dict):
+            sinais_a_salvar.append(resultado_sinal)
+
+    for sinal_data in sinais_a_salvar:
+        if sinal_data and sinal_data.get('targets'):
+            salvar_sinal_no_banco(conn, strategy_id, strategy_module.NOME, sinal_data)
+
 def load_frontend_config():
     # No coletor, também precisamos carregar as configurações de arquivo
     # mas cientes de que elas podem ser efêmeras no Render.
@@ -156,17 +178,16 @@ def processar_e_enviar_notificacoes():
     conn = None
     try:
         conn = get_db_connection_collector()
-        # Configura o cursor para retornar linhas como dicionários
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor = conn.cursor()
         
-        signals, _, _ = process_and_filter_signals(
-            cursor, status_ativo, mapping, confluence_modes, activator_modes
-        )
+        with metricas.cronometrar(TEMPO_BANCO, 'notificacoes'):
+            signals, _, _ = process_and_filter_signals(
+                cursor, status_ativo, mapping, confluence_modes, activator_modes
+            )
 
-        if not signals: return
+            if not signals: return
 
-        cursor.execute("SELECT notification_key FROM notificacoes_enviadas")
-        sent_notifications_db = {row['notification_key'] for row in cursor.fetchall()}
+            sent_notifications_db = storage.notificacoes_enviadas(cursor)
 
         # Agrupa os sinais pela notificação que eles gerariam para evitar duplicatas.
         grouped_notifications = defaultdict(list)
@@ -189,9 +210,14 @@ def processar_e_enviar_notificacoes():
             if notification_key in sent_notifications_db:
                 continue
 
+            all_db_ids = []
+            for s in signal_group:
+                all_db_ids.extend(s.get('db_ids', []))
+
             # Envia UMA notificação para este grupo.
-            horario_dt = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+            horario_dt = datetime.fromisoformat(timestamp)
             message_id = None
+            marcas_latencia = latency_tracker.notificacao_enfileirada(all_db_ids)
 
             if signal_type == 'confluence':
                 first_signal = signal_group[0] 
@@ -204,51 +230,50 @@ def processar_e_enviar_notificacoes():
             elif signal_type == 'individual':
                 message_id = send_signal_notification(panel_id, horario_dt)
 
+            latency_tracker.notificacao_concluida('sinal', panel_id, marcas_latencia, confirmada=bool(message_id))
+
             # Se a mensagem foi enviada, atualiza o banco de dados para TODOS os sinais no grupo.
             if message_id:
-                cursor.execute("INSERT INTO notificacoes_enviadas (notification_key) VALUES (%s) ON CONFLICT (notification_key) DO NOTHING;", (notification_key,))
-                
-                all_db_ids = []
-                for s in signal_group:
-                    all_db_ids.extend(s.get('db_ids', []))
-                
-                if all_db_ids:
-                    # Usar UNNEST para atualizar múltiplos IDs em PostgreSQL
-                    cursor.execute("""
-                        UPDATE sinais SET telegram_message_id = %s
-                        WHERE id IN (SELECT unnest(%s::int[]));
-                    """, (message_id, all_db_ids))
-                
-                conn.commit()
+                with metricas.cronometrar(TEMPO_BANCO, 'notificacoes'):
+                    storage.registrar_notificacao(cursor, notification_key)
+                    
+                    if all_db_ids:
+                        storage.definir_mensagem_telegram(cursor, all_db_ids, message_id)
+                    
+                    conn.commit()
 
     except Exception as e:
         print(f"[ERRO NO PROCESSADOR DE NOTIFICAÇÕES]: {e}")
     finally:
         if conn: conn.close()
         
-def gerenciar_sinais_antigos():
+def gerenciar_sinais_antigos(ids_vencidos=None):
+    """
+    Marca alvos pendentes como 'expired' (erro), edita as mensagens do Telegram e conta os erros.
+    Com ids_vencidos (vindos do agendador de expiração) só esses alvos são lidos do banco;
+    sem eles, faz a varredura completa por target_timestamp.
+    """
     global todas_estrategias
     try:
         conn = get_db_connection_collector()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        agora = datetime.now()
-        limite_expiracao = agora - timedelta(minutes=2)
+        cursor = conn.cursor()
         
-        cursor.execute("SELECT id, strategy_id, telegram_message_id, target_timestamp FROM sinais WHERE status = 'pending' AND target_timestamp < %s", (limite_expiracao,))
-        sinais_expirados = cursor.fetchall()
+        with metricas.cronometrar(TEMPO_BANCO, 'expiracao'):
+            if ids_vencidos is not None:
+                sinais_expirados = storage.alvos_pendentes(cursor, ids=ids_vencidos)
+            else:
+                limite_expiracao = datetime.now() - expiry_scheduler.TOLERANCIA_EXPIRACAO
+                sinais_expirados = storage.alvos_pendentes(cursor, vencidos_antes_de=limite_expiracao)
         
         if sinais_expirados:
             mapping, confluence_modes, _ = load_frontend_config()
-            expired_strategy_ids = []
             for signal in sinais_expirados:
-                expired_strategy_ids.append(signal['strategy_id'])
                 if signal['telegram_message_id']:
                     panel_id = mapping.get(signal['strategy_id'])
                     if panel_id and panel_id != 'none':
                         target_time = signal['target_timestamp'] # Já é datetime
                         if confluence_modes.get(str(panel_id)):
-                            cursor.execute("SELECT DISTINCT strategy_id FROM sinais WHERE telegram_message_id = %s", (signal['telegram_message_id'],))
-                            confluence_strategy_ids = [row['strategy_id'] for row in cursor.fetchall()]
+                            confluence_strategy_ids = storage.estrategias_da_mensagem(cursor, signal['telegram_message_id'])
                             emojis = []
                             if todas_estrategias:
                                 emojis = [todas_estrategias.get(sid).EMOJI for sid in confluence_strategy_ids if todas_estrategias.get(sid) and hasattr(todas_estrategias.get(sid), 'EMOJI')]
@@ -256,34 +281,79 @@ def gerenciar_sinais_antigos():
                         else:
                             edit_message_to_miss(panel_id=panel_id, target_time=target_time, message_id=signal['telegram_message_id'], channel_key=f"channel_{panel_id}")
 
-            # Atualizar contadores de erros
-            for strategy_id, miss_count in Counter(expired_strategy_ids).items():
-                cursor.execute("""
-                    UPDATE estrategia_stats SET misses = misses + %s
-                    WHERE strategy_id = %s;
-                """, (miss_count, strategy_id))
-            
-            cursor.execute("UPDATE sinais SET status = 'expired' WHERE status = 'pending' AND target_timestamp < %s", (limite_expiracao,))
+            # Expira exatamente os alvos lidos acima (e conta os erros), para que os eventos emitidos correspondam ao banco
+            with metricas.cronometrar(TEMPO_BANCO, 'expiracao'):
+                storage.marcar_expirados(cursor, sinais_expirados)
             print(f"🕰️  {len(sinais_expirados)} alvo(s) pendente(s) foram marcados como 'expirado' (erro).")
         
-        limite_delecao = agora - timedelta(hours=2)
-        cursor.execute("DELETE FROM sinais WHERE status IN ('hit', 'expired') AND target_timestamp < %s", (limite_delecao,))
-        cursor.execute("DELETE FROM notificacoes_enviadas WHERE notification_key IN (SELECT notification_key FROM sinais WHERE status IN ('hit', 'expired') AND target_timestamp < %s)", (limite_delecao,))
-        
-        limite_delecao_resultados = agora - timedelta(hours=49)
-        cursor.execute("DELETE FROM resultados WHERE timestamp_iso < %s", (limite_delecao_resultados,))
-        conn.commit()
+        with metricas.cronometrar(TEMPO_BANCO, 'expiracao'):
+            conn.commit()
+        conn.close()
+
+        for signal in sinais_expirados:
+            event_bus.emitir(event_bus.SINAL_EXPIRADO, dict(signal))
+    except storage.ERROS_DE_BANCO as e: print(f"\n[ERRO AO GERENCIAR DADOS ANTIGOS]: {e}")
+
+def limpar_dados_antigos():
+    # Retenção: roda a cada INTERVALO_LIMPEZA segundos, não a cada ciclo do coletor
+    try:
+        conn = get_db_connection_collector()
+        cursor = conn.cursor()
+        agora = datetime.now()
+
+        # Se o agendador não pôde ser carregado no startup, tenta de novo aqui
+        if not expiry_scheduler.carregado:
+            expiry_scheduler.reconstruir(cursor)
+
+        # No Postgres remove (e arquiva) partições de dias inteiros; no SQLite apaga as linhas antigas
+        with metricas.cronometrar(TEMPO_BANCO, 'retencao'):
+            removidos = storage.aplicar_retencao(cursor, agora, RETENCAO_NOTIFICACOES)
+            conn.commit()
+        for removido in removidos:
+            print(f"\n🧹 Retenção: {removido} removida(s).")
         conn.close()
-    except psycopg2.Error as e: print(f"\n[ERRO AO GERENCIAR DADOS ANTIGOS]: {e}")
+    except storage.ERROS_DE_BANCO as e: print(f"\n[ERRO AO GERENCIAR DADOS ANTIGOS]: {e}")
+
+def expirar_sinais_vencidos():
+    ids_vencidos = expiry_scheduler.vencidos()
+    if ids_vencidos:
+        gerenciar_sinais_antigos(ids_vencidos)
 
-def verificar_acertos(horario_do_branco):
+def aguardar_proxima_coleta(segundos):
+    # Dorme até a próxima coleta, mas acorda no prazo exato de cada alvo pendente para expirá-lo
+    fim = time.monotonic() + segundos
+    while True:
+        restante = fim - time.monotonic()
+        if restante <= 0: return
+        proximo_prazo = expiry_scheduler.segundos_ate_proximo_prazo()
+        time.sleep(restante if proximo_prazo is None else min(restante, max(proximo_prazo, 0)))
+        expirar_sinais_vencidos()
+
+_confluencia_pendente = False
+
+def _ao_atingir_confluencia(confluencia):
+    # Só marca: a notificação sai logo depois do laço das estratégias (processar_giro), sem esperar
+    # o próximo ciclo e sem rodar o envio no meio do laço. O processador aplica os mesmos filtros
+    # (ativador) e a deduplicação por notification_key.
+    global _confluencia_pendente
+    print(f"\n🔗 CONFLUÊNCIA no painel {confluencia['panel_id']} para {confluencia['target_timestamp']} ({confluencia['count']} estratégias).")
+    _confluencia_pendente = True
+
+def _notificar_confluencias():
+    global _confluencia_pendente
+    if not _confluencia_pendente: return
+    _confluencia_pendente = False
+    processar_e_enviar_notificacoes() # Esta função já obtém sua própria conexão
+
+def verificar_acertos(giro_branco):
     global todas_estrategias
     try:
         conn = get_db_connection_collector()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cursor.execute("SELECT id, target_timestamp, strategy_id, telegram_message_id FROM sinais WHERE status = 'pending'")
-        alvos_pendentes = cursor.fetchall()
-        horario_do_branco_naive = horario_do_branco.replace(tzinfo=None)
+        cursor = conn.cursor()
+        with metricas.cronometrar(TEMPO_BANCO, 'acertos'):
+            alvos_pendentes = storage.alvos_pendentes(cursor)
+        horario_do_branco = giro_branco.timestamp_iso
+        marcas_do_branco = latency_tracker.marcas_do_giro(giro_branco)
         
         if not alvos_pendentes: 
             conn.close()
@@ -294,41 +364,30 @@ def verificar_acertos(horario_do_branco):
         for alvo in alvos_pendentes:
             alvo_dt = alvo['target_timestamp'] # Já é datetime
             # Verifica se o branco ocorreu dentro de 1 minuto antes ou depois do alvo
-            if (alvo_dt - timedelta(minutes=1)) <= horario_do_branco_naive <= (alvo_dt + timedelta(minutes=1)):
-                print(f"\n🎯 ACERTO! O branco das {horario_do_branco.strftime('%H:%M:%S')} atingiu o alvo da estratégia {alvo['strategy_id']}.")
-                cursor.execute("UPDATE sinais SET status = 'hit' WHERE id = %s", (alvo['id'],))
-                cursor.execute("UPDATE estrategia_stats SET hits = hits + 1 WHERE strategy_id = %s", (alvo['strategy_id'],))
-                conn.commit()
+            if (alvo_dt - timedelta(minutes=1)) <= horario_do_branco <= (alvo_dt + timedelta(minutes=1)):
+                print(f"\n🎯 ACERTO! O branco das {giro_branco.hora_completa} atingiu o alvo da estratégia {alvo['strategy_id']}.")
+                with metricas.cronometrar(TEMPO_BANCO, 'acertos'):
+                    storage.marcar_acerto(cursor, alvo)
+                    conn.commit()
+                marcas_latencia = dict(marcas_do_branco)
+                latency_tracker.marcar(marcas_latencia, 'commit')
+                event_bus.emitir(event_bus.SINAL_ACERTO, dict(alvo))
                 
                 if alvo['telegram_message_id']:
                     panel_id = mapping.get(alvo['strategy_id'])
                     if panel_id and panel_id != 'none':
+                        latency_tracker.marcar(marcas_latencia, 'enfileiramento')
                         if confluence_modes.get(str(panel_id)):
-                            cursor.execute("SELECT DISTINCT strategy_id FROM sinais WHERE telegram_message_id = %s", (alvo['telegram_message_id'],))
-                            confluence_strategy_ids = [row['strategy_id'] for row in cursor.fetchall()]
+                            confluence_strategy_ids = storage.estrategias_da_mensagem(cursor, alvo['telegram_message_id'])
                             emojis = []
                             if todas_estrategias:
                                 emojis = [todas_estrategias.get(sid).EMOJI for sid in confluence_strategy_ids if todas_estrategias.get(sid) and hasattr(todas_estrategias.get(sid), 'EMOJI')]
-                            edit_confluence_to_hit(panel_id=panel_id, target_time=alvo_dt, message_id=alvo['telegram_message_id'], channel_key=f"channel_{panel_id}", emojis=emojis)
+                            editada = edit_confluence_to_hit(panel_id=panel_id, target_time=alvo_dt, message_id=alvo['telegram_message_id'], channel_key=f"channel_{panel_id}", emojis=emojis)
                         else:
-                            edit_message_to_hit(panel_id=panel_id, target_time=alvo_dt, message_id=alvo['telegram_message_id'], channel_key=f"channel_{panel_id}")
+                            editada = edit_message_to_hit(panel_id=panel_id, target_time=alvo_dt, message_id=alvo['telegram_message_id'], channel_key=f"channel_{panel_id}")
+                        latency_tracker.notificacao_concluida('acerto', panel_id, marcas_latencia, confirmada=editada)
         conn.close()
-    except psycopg2.Error as e: print(f"\n[ERRO AO VERIFICAR ACERTOS]: {e}")
-
-def carregar_estrategias():
-    estrategias = {}
-    if not os.path.exists(strategies_folder): return {}
-    for filename in os.listdir(strategies_folder):
-        if filename.endswith('.py') and filename != '__init__.py':
-            module_name = filename[:-3]
-            module_path = os.path.join(strategies_folder, filename)
-            try:
-                spec = importlib.util.spec_from_file_location(module_name, module_path)
-                module = importlib.util.module_from_spec(spec); spec.loader.exec_module(module)
-                if hasattr(module, 'ID') and hasattr(module, 'verificar'):
-                    estrategias[module.ID] = module
-            except Exception as e: print(f"Erro ao carregar estratégia '{filename}': {e}")
-    return estrategias
+    except storage.ERROS_DE_BANCO as e: print(f"\n[ERRO AO VERIFICAR ACERTOS]: {e}")
 
 def ler_status_ativo():
     try:
@@ -339,33 +398,102 @@ def ler_status_ativo():
 
 def coletar_dados_roleta():
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        with metricas.cronometrar(TEMPO_COLETA):
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+            return response.json()
     except Exception as e:
         print(f"Erro ao coletar dados da roleta: {e}")
+        FALHAS_COLETA.incrementar()
         return None
 
+def processar_giro(conn_collector, giro):
+    """
+    Um giro novo: grava no banco, avança as sequências, confere os acertos (se for branco)
+    e roda as estratégias ativas, gravando os sinais. Usado pelo loop principal e pelo benchmark.py.
+    """
+    cursor = conn_collector.cursor()
+    latency_tracker.giro_recebido(giro)
+
+    salvar_no_banco(conn_collector, giro)
+    sequence_matcher.avancar(giro.color)
+
+    if giro.color == "Branco":
+        verificar_acertos(giro) # Esta função já obtém sua própria conexão
+
+    statuses = ler_status_ativo()
+    estrategias_ativas = {sid: s for sid, s in todas_estrategias.items() if statuses.get(sid, False)}
+
+    if estrategias_ativas:
+        with metricas.cronometrar(TEMPO_BANCO, 'historico'):
+            historico_completo = storage.ultimos_resultados(cursor, TAMANHO_HISTORICO)
+
+        if historico_completo:
+            # Estratégias isoladas recebem o snapshot primeiro e rodam em paralelo, em outros processos
+            estrategias_isoladas = {sid: s for sid, s in estrategias_ativas.items() if strategy_sandbox.deve_isolar(s)}
+            execucoes_isoladas = strategy_sandbox.enviar_lote(estrategias_isoladas, historico_completo)
+
+            for strategy_id, strategy_module in estrategias_ativas.items():
+                if strategy_id in estrategias_isoladas: continue
+                try:
+                    # Passar o cursor para a função verificar da estratégia
+                    with metricas.cronometrar(DURACAO_VERIFICAR, strategy_id, 'local'):
+                        resultado_sinal = strategy_module.verificar(historico_completo, cursor)
+                    salvar_resultado_estrategia(conn_collector, strategy_id, strategy_module, resultado_sinal)
+                except Exception as e:
+                    print(f"[ERRO na execução da ESTRATÉGIA {strategy_module.NOME}]: {e}")
+
+            for strategy_id, resultado_sinal in strategy_sandbox.coletar_lote(execucoes_isoladas).items():
+                strategy_module = estrategias_isoladas[strategy_id]
+                try:
+                    salvar_resultado_estrategia(conn_collector, strategy_id, strategy_module, resultado_sinal)
+                except Exception as e:
+                    print(f"[ERRO ao salvar sinais da ESTRATÉGIA {strategy_module.NOME}]: {e}")
+
+    _notificar_confluencias()
+    latency_tracker.avaliacao_concluida()
+
 if __name__ == "__main__":
     # O coletor não precisa inicializar o esquema do DB, o Web Service já faz isso.
     # Mas ele precisa garantir que os arquivos de configuração JSON existam.
     ensure_config_files_exist()
-    todas_estrategias = carregar_estrategias() # Popula a variável global
+    metricas.identificar('coletor')
+    todas_estrategias = strategy_registry.obter_estrategias() # Popula a variável global
+    confluence_tracker.iniciar()
+    expiry_scheduler.iniciar()
+    event_bus.inscrever(event_bus.CONFLUENCIA_ATINGIDA, _ao_atingir_confluencia)
+    try:
+        conn_inicial = get_db_connection_collector()
+        expiry_scheduler.reconstruir(conn_inicial.cursor())
+        conn_inicial.close()
+    except Exception as e:
+        print(f"[ERRO AO CARREGAR O AGENDADOR DE EXPIRAÇÃO]: {e}")
     print(f"Estratégias carregadas: {', '.join([s.NOME for s in todas_estrategias.values()])}")
     
     ultimo_id_processado = None
+    ultima_limpeza = 0
     print("--------------------------------------------------")
     print(">>>     COLETOR DE RESULTADOS INICIADO     <<<")
     print("--------------------------------------------------")
 
     while True:
         conn_collector = None # Definir conn_collector aqui
+        inicio_ciclo = time.perf_counter()
         try:
             conn_collector = get_db_connection_collector() # Obter conexão para o loop
-            cursor_collector = conn_collector.cursor(cursor_factory=psycopg2.extras.RealDictCursor) # Cursor para o coletor
+            # Recarrega estratégias novas ou editadas sem reiniciar o coletor
+            todas_estrategias = strategy_registry.obter_estrategias()
+            mapping_atual, confluence_modes_atual, _ = load_frontend_config()
+            cursor_collector = conn_collector.cursor() # Cursor para o coletor
+            confluence_tracker.sincronizar(cursor_collector, ler_status_ativo(), mapping_atual, confluence_modes_atual)
+            sequence_matcher.atualizar(cursor_collector)
             
-            # Passar o cursor para as funções que precisam dele
-            gerenciar_sinais_antigos() 
+            # Expiração guiada pelos prazos em memória; a retenção roda em intervalo próprio
+            expirar_sinais_vencidos()
+            if time.monotonic() - ultima_limpeza >= INTERVALO_LIMPEZA:
+                gerenciar_sinais_antigos() # Varredura completa de segurança (ex.: falha de banco numa expiração)
+                limpar_dados_antigos()
+                ultima_limpeza = time.monotonic()
             processar_e_enviar_notificacoes() # Esta função já obtém sua própria conexão
             
             dados_recentes = coletar_dados_roleta()
@@ -376,47 +504,19 @@ if __name__ == "__main__":
                     
                     jogo_recente = dados_recentes[0]
                     if all(k in jogo_recente for k in ['id', 'created_at', 'color', 'roll']):
+                        GIROS_PROCESSADOS.incrementar()
                         try:
-                            utc_time = datetime.strptime(jogo_recente['created_at'], "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
-                            local_time = utc_time.astimezone()
-                            cor_recente = MAPA_CORES.get(jogo_recente['color'])
-                            
-                            salvar_no_banco(conn_collector, jogo_recente['id'], local_time.strftime("%d/%m/%Y %H:%M:%S"), local_time, jogo_recente['roll'], cor_recente) # Passar local_time como datetime
-
-                            if cor_recente == "Branco":
-                                verificar_acertos(local_time) # Esta função já obtém sua própria conexão
-
-                            statuses = ler_status_ativo()
-                            estrategias_ativas = {sid: s for sid, s in todas_estrategias.items() if statuses.get(sid, False)}
-
-                            if estrategias_ativas:
-                                # Usar o cursor_collector para buscar histórico
-                                cursor_collector.execute("SELECT id, roll, color, timestamp_iso FROM resultados ORDER BY timestamp_iso DESC LIMIT 50")
-                                historico_completo = cursor_collector.fetchall()
-                                
-                                if historico_completo:
-                                    for strategy_id, strategy_module in estrategias_ativas.items():
-                                        try:
-                                            # Passar o cursor_collector para a função verificar da estratégia
-                                            resultado_sinal = strategy_module.verificar(historico_completo, cursor_collector)
-                                            sinais_a_salvar = []
-                                            if resultado_sinal:
-                                                if isinstance(resultado_sinal, list):
-                                                    sinais_a_salvar.extend(resultado_sinal)
-                                                elif isinstance(resultado_sinal, dict):
-                                                    sinais_a_salvar.append(resultado_sinal)
-
-                                            for sinal_data in sinais_a_salvar:
-                                                if sinal_data and sinal_data.get('targets'):
-                                                    salvar_sinal_no_banco(conn_collector, strategy_id, strategy_module.NOME, sinal_data)
-                                        except Exception as e:
-                                            print(f"[ERRO na execução da ESTRATÉGIA {strategy_module.NOME}]: {e}")
+                            # O horário é convertido uma única vez; o mesmo registro segue para o banco e os acertos
+                            giro = Giro.da_api(jogo_recente)
+                            processar_giro(conn_collector, giro)
                         
                         except Exception as e:
                             print(f"Erro ao processar resultado: {e}")
                 
         finally:
             if conn_collector: conn_collector.close() # Fechar a conexão no final do loop
+            TEMPO_CICLO.observar(time.perf_counter() - inicio_ciclo)
+            metricas.publicar()
         
-        time.sleep(2)
+        aguardar_proxima_coleta(INTERVALO_COLETA)
 
@@ -0,0 +1,180 @@
+# compact_schema.py
+
+import os
+
+import psycopg2
+from psycopg2 import extensions
+
+import partition_manager
+
+# Esquema compacto de 'resultados' e 'sinais':
+# - resultados: roll SMALLINT, cor em ENUM (4 bytes em vez do nome por extenso) e horário TIMESTAMPTZ;
+#   a string de exibição ('created_at') não é mais gravada, é derivada do horário na leitura.
+# - sinais: o gatilho (estratégia, nome, mensagem) fica uma única vez em 'sinais_gatilhos' e cada
+#   alvo em 'sinais_alvos' só guarda o horário, o status e a mensagem do Telegram. A view 'sinais'
+#   junta as duas com as colunas antigas, então as consultas existentes continuam iguais.
+# O lado Python não muda: toda conexão usa o fuso local como TimeZone da sessão e converte
+# TIMESTAMPTZ para datetime sem fuso (horário local), exatamente como antes.
+
+def _fuso_local():
+    if os.environ.get('FUSO_HORARIO'):
+        return os.environ['FUSO_HORARIO']
+    if os.environ.get('TZ'):
+        return os.environ['TZ'].lstrip(':')
+    caminho = os.path.realpath('/etc/localtime')
+    if 'zoneinfo/' in caminho:
+        return caminho.split('zoneinfo/', 1)[1]
+    return 'UTC'
+
+FUSO_HORARIO = _fuso_local()
+
+CORES = ('Branco', 'Vermelho', 'Preto')
+STATUS_SINAL = ('pending', 'hit', 'expired')
+
+# --- Conexão ---
+def _timestamptz_local(valor, cursor):
+    # O Postgres já devolve o horário no fuso da sessão (o local); basta tirar o fuso
+    momento = extensions.PYDATETIMETZ(valor, cursor)
+    return momento.replace(tzinfo=None) if momento is not None else None
+
+TIMESTAMPTZ_LOCAL = extensions.new_type((1184,), 'TIMESTAMPTZ_LOCAL', _timestamptz_local)
+
+def conectar(database_url, **kwargs):
+    """psycopg2.connect com o fuso local na sessão e TIMESTAMPTZ lido como horário local sem fuso."""
+    conn = psycopg2.connect(database_url, options=f"-c TimeZone={FUSO_HORARIO}", **kwargs)
+    extensions.register_type(TIMESTAMPTZ_LOCAL, conn)
+    return conn
+
+# --- Esquema ---
+def _criar_enum(cursor, nome, valores):
+    cursor.execute("SELECT 1 FROM pg_type WHERE typname = %s", (nome,))
+    if cursor.fetchone(): return
+    cursor.execute(f"CREATE TYPE {nome} AS ENUM ({', '.join(['%s'] * len(valores))})", valores)
+
+def criar_tabelas(cursor):
+    _criar_enum(cursor, 'cor_roleta', CORES)
+    _criar_enum(cursor, 'status_sinal', STATUS_SINAL)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resultados (
+            id TEXT NOT NULL,
+            roll SMALLINT,
+            color cor_roleta,
+            timestamp_iso TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (id, timestamp_iso)
+        ) PARTITION BY RANGE (timestamp_iso);
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resultados_timestamp ON resultados (timestamp_iso)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sinais_gatilhos (
+            id SERIAL PRIMARY KEY,
+            strategy_id VARCHAR(255) NOT NULL,
+            trigger_id VARCHAR(255) NOT NULL,
+            strategy_name VARCHAR(255) NOT NULL,
+            message TEXT NOT NULL,
+            UNIQUE (strategy_id, trigger_id, message)
+        );
+    """)
+    cursor.execute("CREATE SEQUENCE IF NOT EXISTS sinais_id_seq")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sinais_alvos (
+            id INTEGER NOT NULL DEFAULT nextval('sinais_id_seq'),
+            gatilho_id INTEGER NOT NULL,
+            target_timestamp TIMESTAMPTZ NOT NULL,
+            status status_sinal NOT NULL DEFAULT 'pending',
+            telegram_message_id BIGINT DEFAULT NULL,
+            PRIMARY KEY (id, target_timestamp)
+        ) PARTITION BY RANGE (target_timestamp);
+    """)
+    cursor.execute("ALTER SEQUENCE sinais_id_seq OWNED BY sinais_alvos.id")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sinais_alvos_gatilho ON sinais_alvos (gatilho_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sinais_alvos_pendentes ON sinais_alvos (target_timestamp) WHERE status = 'pending'")
+    cursor.execute("""
+        CREATE OR REPLACE VIEW sinais AS
+        SELECT a.id, g.trigger_id, g.strategy_id, g.strategy_name, g.message,
+               a.target_timestamp, a.status, a.telegram_message_id, a.gatilho_id
+        FROM sinais_alvos a JOIN sinais_gatilhos g ON g.id = a.gatilho_id;
+    """)
+
+def _tipo_da_tabela(cursor, tabela):
+    cursor.execute("""
+        SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = %s AND n.nspname = current_schema();
+    """, (tabela,))
+    linha = cursor.fetchone()
+    return linha[0] if linha else None
+
+def _resultados_legado(cursor):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'resultados' AND column_name = 'created_at';
+    """)
+    return cursor.fetchone() is not None
+
+def _criar_particoes_do_intervalo(cursor, tabela, inicio, fim):
+    dia = inicio
+    while dia and dia <= fim:
+        partition_manager.criar_particao(cursor, tabela, dia)
+        dia += partition_manager.UM_DIA
+
+def migrar(cursor):
+    """
+    Converte 'resultados' e 'sinais' do formato antigo (tabelas simples ou particionadas, com
+    as colunas por extenso) para o esquema compacto, preservando os dados e os ids dos sinais.
+    Os dados passam por tabelas temporárias: no máximo alguns dias de histórico.
+    Depois desta função as tabelas compactas sempre existem.
+    """
+    migrar_resultados = _tipo_da_tabela(cursor, 'resultados') is not None and _resultados_legado(cursor)
+    migrar_sinais = _tipo_da_tabela(cursor, 'sinais') in ('r', 'p')
+
+    if migrar_resultados:
+        cursor.execute("""
+            CREATE TEMP TABLE resultados_migracao ON COMMIT DROP AS
+            SELECT id, roll, color, timestamp_iso FROM resultados;
+        """)
+        cursor.execute("DROP TABLE resultados CASCADE")
+    if migrar_sinais:
+        cursor.execute("CREATE TEMP TABLE sinais_migracao ON COMMIT DROP AS SELECT * FROM sinais")
+        cursor.execute("DROP TABLE sinais CASCADE")
+
+    criar_tabelas(cursor)
+
+    if migrar_resultados:
+        cursor.execute("SELECT MIN(timestamp_iso)::date, MAX(timestamp_iso)::date FROM resultados_migracao")
+        _criar_particoes_do_intervalo(cursor, 'resultados', *cursor.fetchone())
+        cursor.execute("""
+            INSERT INTO resultados (id, roll, color, timestamp_iso)
+            SELECT id, roll, color::cor_roleta, timestamp_iso FROM resultados_migracao
+            ON CONFLICT DO NOTHING;
+        """)
+        print(f"📦 'resultados' migrada para o esquema compacto ({cursor.rowcount} linhas).")
+    if migrar_sinais:
+        cursor.execute("SELECT MIN(target_timestamp)::date, MAX(target_timestamp)::date, MAX(id) FROM sinais_migracao")
+        inicio, fim, maior_id = cursor.fetchone()
+        _criar_particoes_do_intervalo(cursor, 'sinais_alvos', inicio, fim)
+        if maior_id is not None:
+            cursor.execute("SELECT setval('sinais_id_seq', %s)", (maior_id,))
+        cursor.execute("""
+            INSERT INTO sinais_gatilhos (strategy_id, trigger_id, strategy_name, message)
+            SELECT DISTINCT ON (strategy_id, trigger_id, message) strategy_id, trigger_id, strategy_name, message
+            FROM sinais_migracao ORDER BY strategy_id, trigger_id, message, id DESC
+            ON CONFLICT DO NOTHING;
+        """)
+        cursor.execute("""
+            INSERT INTO sinais_alvos (id, gatilho_id, target_timestamp, status, telegram_message_id)
+            SELECT m.id, g.id, m.target_timestamp, m.status::status_sinal, m.telegram_message_id
+            FROM sinais_migracao m
+            JOIN sinais_gatilhos g USING (strategy_id, trigger_id, message);
+        """)
+        print(f"📦 'sinais' migrada para gatilhos + alvos ({cursor.rowcount} alvos).")
+
+# --- Escrita ---
+def registrar_gatilho(cursor, strategy_id, trigger_id, strategy_name, message):
+    """Id do gatilho em 'sinais_gatilhos', criando-o se ainda não existir."""
+    cursor.execute("""
+        INSERT INTO sinais_gatilhos (strategy_id, trigger_id, strategy_name, message)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (strategy_id, trigger_id, message) DO UPDATE SET strategy_name = EXCLUDED.strategy_name
+        RETURNING id;
+    """, (strategy_id, trigger_id, strategy_name, message))
+    linha = cursor.fetchone()
+    return linha['id'] if isinstance(linha, dict) else linha[0]
@@ -0,0 +1,150 @@
+# confluence_tracker.py
+
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import event_bus
+import storage
+from signal_logic import contar_estrategias_por_painel, confluencia_atingida
+
+# --- Configuração de Caminhos ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STRATEGIES_DIR = os.path.join(BASE_DIR, '..', 'strategies')
+# Snapshot das confluências atingidas, publicado pelo coletor e lido pelo app web
+CONFLUENCE_STATE_FILE = os.path.join(STRATEGIES_DIR, 'confluence_state.json')
+
+# Sinais com acerto continuam visíveis por 2 minutos após o alvo (mesma regra de signal_logic)
+JANELA_ACERTOS = timedelta(minutes=2)
+
+# --- Estado Incremental (mantido no processo do coletor) ---
+# painel -> horário alvo -> strategy_id -> {db_id: status}
+_paineis = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+_atingidas = set() # (painel, horário alvo) cuja confluência já foi anunciada
+_config = None # (statuses, mapping, confluence_modes) usados na última reconstrução
+_estrategias_por_painel = {}
+
+def _painel_da_estrategia(strategy_id):
+    """Painel em modo confluência onde a estratégia está ativa, ou None."""
+    if _config is None: return None
+    statuses, mapping, confluence_modes = _config
+    panel_id = mapping.get(strategy_id)
+    if not statuses.get(strategy_id) or not panel_id or panel_id == 'none' or not confluence_modes.get(str(panel_id)):
+        return None
+    return panel_id
+
+def _descrever(panel_id, target_timestamp):
+    grupo = _paineis[panel_id][target_timestamp]
+    statuses = [status for sinais in grupo.values() for status in sinais.values()]
+    return {
+        'panel_id': panel_id,
+        'target_timestamp': target_timestamp.isoformat(),
+        'strategy_ids': sorted(grupo),
+        'db_ids': sorted(db_id for sinais in grupo.values() for db_id in sinais),
+        'count': len(grupo),
+        'status': 'hit' if 'hit' in statuses else 'pending',
+    }
+
+def _avaliar(panel_id, target_timestamp, anunciar=True):
+    grupo = _paineis[panel_id].get(target_timestamp)
+    if not grupo or (panel_id, target_timestamp) in _atingidas:
+        return
+    if confluencia_atingida(_estrategias_por_painel.get(panel_id, 0), len(grupo)):
+        _atingidas.add((panel_id, target_timestamp))
+        if anunciar:
+            event_bus.emitir(event_bus.CONFLUENCIA_ATINGIDA, _descrever(panel_id, target_timestamp))
+
+def _remover(panel_id, target_timestamp, strategy_id, db_id):
+    grupo = _paineis[panel_id].get(target_timestamp)
+    if not grupo or db_id not in grupo.get(strategy_id, {}): return
+    del grupo[strategy_id][db_id]
+    if not grupo[strategy_id]:
+        del grupo[strategy_id]
+    if not grupo:
+        del _paineis[panel_id][target_timestamp]
+    if not grupo or not confluencia_atingida(_estrategias_por_painel.get(panel_id, 0), len(grupo)):
+        _atingidas.discard((panel_id, target_timestamp))
+
+def _publicar():
+    snapshot = {panel_id: [_descrever(panel_id, ts) for ts in sorted(horarios) if (panel_id, ts) in _atingidas]
+                for panel_id, horarios in _paineis.items()}
+    # Escrita atômica: o app web nunca lê um arquivo pela metade
+    caminho_temporario = f"{CONFLUENCE_STATE_FILE}.tmp"
+    try:
+        with open(caminho_temporario, 'w') as f: json.dump(snapshot, f)
+        os.replace(caminho_temporario, CONFLUENCE_STATE_FILE)
+    except IOError as e:
+        print(f"[ERRO AO PUBLICAR CONFLUÊNCIAS]: {e}")
+
+# --- Handlers do Barramento de Eventos ---
+def _ao_criar_sinal(sinal):
+    panel_id = _painel_da_estrategia(sinal['strategy_id'])
+    if not panel_id: return
+    target_timestamp = sinal['target_timestamp']
+    _paineis[panel_id][target_timestamp][sinal['strategy_id']][sinal['id']] = 'pending'
+    _avaliar(panel_id, target_timestamp)
+    _publicar()
+
+def _ao_acertar_sinal(sinal):
+    panel_id = _painel_da_estrategia(sinal['strategy_id'])
+    grupo = _paineis[panel_id].get(sinal['target_timestamp']) if panel_id else None
+    if grupo and sinal['id'] in grupo.get(sinal['strategy_id'], {}):
+        grupo[sinal['strategy_id']][sinal['id']] = 'hit'
+        _publicar()
+
+def _ao_expirar_sinal(sinal):
+    panel_id = _painel_da_estrategia(sinal['strategy_id'])
+    if not panel_id: return
+    _remover(panel_id, sinal['target_timestamp'], sinal['strategy_id'], sinal['id'])
+    _publicar()
+
+def iniciar():
+    event_bus.inscrever(event_bus.SINAL_CRIADO, _ao_criar_sinal)
+    event_bus.inscrever(event_bus.SINAL_ACERTO, _ao_acertar_sinal)
+    event_bus.inscrever(event_bus.SINAL_EXPIRADO, _ao_expirar_sinal)
+
+# --- Sincronização com o Banco ---
+def reconstruir(cursor):
+    """Recarrega a estrutura a partir da tabela 'sinais' (startup ou mudança de configuração)."""
+    _paineis.clear()
+    _atingidas.clear()
+    for row in storage.sinais_ativos(cursor, datetime.now() - JANELA_ACERTOS):
+        panel_id = _painel_da_estrategia(row['strategy_id'])
+        if panel_id:
+            _paineis[panel_id][row['target_timestamp']][row['strategy_id']][row['id']] = row['status']
+    # Confluências já existentes não são anunciadas de novo: o processador de notificações já cuida delas
+    for panel_id, horarios in list(_paineis.items()):
+        for target_timestamp in list(horarios):
+            _avaliar(panel_id, target_timestamp, anunciar=False)
+    _publicar()
+
+def sincronizar(cursor, statuses, mapping, confluence_modes):
+    """
+    Chamado a cada ciclo do coletor. Reconstrói apenas se a configuração mudou;
+    caso contrário só descarta os acertos que já saíram da janela de exibição.
+    """
+    global _config, _estrategias_por_painel
+    config = (dict(statuses), dict(mapping), dict(confluence_modes))
+    if config != _config:
+        _config = config
+        _estrategias_por_painel = dict(contar_estrategias_por_painel(statuses, mapping))
+        reconstruir(cursor)
+        return
+
+    limite = datetime.now() - JANELA_ACERTOS
+    houve_remocao = False
+    for panel_id, horarios in list(_paineis.items()):
+        for target_timestamp, grupo in list(horarios.items()):
+            if target_timestamp >= limite: continue
+            for strategy_id, sinais in list(grupo.items()):
+                for db_id, status in list(sinais.items()):
+                    if status == 'hit':
+                        _remover(panel_id, target_timestamp, strategy_id, db_id)
+                        houve_remocao = True
+    if houve_remocao:
+        _publicar()
+
+def confluencias(panel_id):
+    """Confluências atingidas de um painel, ordenadas pelo horário alvo."""
+    return [_descrever(panel_id, ts) for ts in sorted(_paineis.get(panel_id, {})) if (panel_id, ts) in _atingidas]
@@ -0,0 +1,49 @@
+# event_bus.py
+
+from collections import defaultdict
+
+# --- Eventos do Ciclo de Vida dos Sinais ---
+# Cada handler recebe um dicionário com os dados do alvo (id, trigger_id, strategy_id,
+# target_timestamp, telegram_message_id), já com o commit feito no banco.
+SINAL_CRIADO = 'sinal_criado'
+SINAL_ACERTO = 'sinal_acerto'
+SINAL_EXPIRADO = 'sinal_expirado'
+
+# --- Eventos de Confluência ---
+# O handler recebe {panel_id, target_timestamp, strategy_ids, db_ids, count}.
+CONFLUENCIA_ATINGIDA = 'confluencia_atingida'
+
+# Evento -> lista de handlers inscritos (na ordem de inscrição)
+_inscricoes = defaultdict(list)
+
+def inscrever(evento, handler):
+    if handler not in _inscricoes[evento]:
+        _inscricoes[evento].append(handler)
+
+def cancelar_inscricao(evento, handler):
+    if handler in _inscricoes.get(evento, []):
+        _inscricoes[evento].remove(handler)
+
+def cancelar_inscricoes_do_modulo(nome_modulo):
+    """Remove todos os handlers definidos em um módulo (usado ao recarregar uma estratégia)."""
+    for evento, handlers in _inscricoes.items():
+        _inscricoes[evento] = [h for h in handlers if getattr(h, '__module__', None) != nome_modulo]
+
+def copiar_inscricoes():
+    """Cópia das inscrições atuais, para desfazer uma troca de módulo que falhou (restaurar_inscricoes)."""
+    return {evento: list(handlers) for evento, handlers in _inscricoes.items()}
+
+def restaurar_inscricoes(copia):
+    _inscricoes.clear()
+    _inscricoes.update({evento: list(handlers) for evento, handlers in copia.items()})
+
+def emitir(evento, sinal):
+    """
+    Entrega o evento para todos os handlers inscritos, no próprio processo.
+    Um handler com erro não impede que os outros recebam o evento.
+    """
+    for handler in list(_inscricoes.get(evento, [])):
+        try:
+            handler(sinal)
+        except Exception as e:
+            print(f"[ERRO NO HANDLER DO EVENTO {evento}]: {e}")
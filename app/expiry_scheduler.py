@@ -0,0 +1,64 @@
+# expiry_scheduler.py
+
+import heapq
+from datetime import datetime, timedelta
+
+import event_bus
+import storage
+
+# Um alvo pendente vira erro quando passa 2 minutos do horário alvo sem Branco
+TOLERANCIA_EXPIRACAO = timedelta(minutes=2)
+
+# --- Estado do Agendador (mantido no processo do coletor) ---
+_prazos = [] # heap de (prazo, db_id)
+_pendentes = {} # db_id -> prazo; entradas canceladas saem daqui e são ignoradas no heap
+carregado = False
+
+def agendar(db_id, target_timestamp):
+    prazo = target_timestamp + TOLERANCIA_EXPIRACAO
+    _pendentes[db_id] = prazo
+    heapq.heappush(_prazos, (prazo, db_id))
+
+def cancelar(db_id):
+    _pendentes.pop(db_id, None)
+
+def _descartar_cancelados():
+    while _prazos and _pendentes.get(_prazos[0][1]) != _prazos[0][0]:
+        heapq.heappop(_prazos)
+
+def vencidos(agora=None):
+    """Remove e retorna os IDs cujo prazo já passou, sem nenhuma consulta ao banco."""
+    agora = agora or datetime.now()
+    ids = []
+    _descartar_cancelados()
+    while _prazos and _prazos[0][0] <= agora:
+        _, db_id = heapq.heappop(_prazos)
+        if _pendentes.pop(db_id, None) is not None:
+            ids.append(db_id)
+        _descartar_cancelados()
+    return ids
+
+def segundos_ate_proximo_prazo(agora=None):
+    _descartar_cancelados()
+    if not _prazos: return None
+    return (_prazos[0][0] - (agora or datetime.now())).total_seconds()
+
+def reconstruir(cursor):
+    """Recarrega os prazos de todos os alvos pendentes (usado no startup do coletor)."""
+    global carregado
+    alvos = storage.alvos_pendentes(cursor)
+    _prazos.clear()
+    _pendentes.clear()
+    for row in alvos:
+        agendar(row['id'], row['target_timestamp'])
+    carregado = True
+    print(f"⏱️  Agendador de expiração carregado com {len(_pendentes)} alvo(s) pendente(s).")
+
+# --- Handlers do Barramento de Eventos ---
+def _ao_criar_sinal(sinal): agendar(sinal['id'], sinal['target_timestamp'])
+def _ao_finalizar_sinal(sinal): cancelar(sinal['id'])
+
+def iniciar():
+    event_bus.inscrever(event_bus.SINAL_CRIADO, _ao_criar_sinal)
+    event_bus.inscrever(event_bus.SINAL_ACERTO, _ao_finalizar_sinal)
+    event_bus.inscrever(event_bus.SINAL_EXPIRADO, _ao_finalizar_sinal)
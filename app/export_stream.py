@@ -0,0 +1,118 @@
+# export_stream.py
+
+import fcntl
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Response
+
+import bulk_io
+import partition_manager
+import storage
+
+# Exportação em streaming de 'resultados' e 'sinais' (/api/export/<tabela>).
+# As linhas saem de storage.linhas_para_exportacao (no Postgres, dias arquivados + cursor nomeado)
+# direto para a resposta, em blocos, então exportar um mês não carrega o mês na memória do worker.
+# Para não competir com o dashboard: intervalo máximo, poucas exportações simultâneas na máquina
+# (vagas por flock, valem para todos os workers do gunicorn), conexão própria somente-leitura
+# (com statement_timeout no Postgres) e um teto de linhas por segundo.
+EXPORT_MAX_DIAS = int(os.environ.get('EXPORT_MAX_DIAS', 31))
+EXPORT_MAX_SIMULTANEAS = int(os.environ.get('EXPORT_MAX_SIMULTANEAS', 1))
+EXPORT_LINHAS_POR_SEGUNDO = int(os.environ.get('EXPORT_LINHAS_POR_SEGUNDO', 20000)) # 0 = sem limite
+EXPORT_TIMEOUT_SQL_MS = 30000 # por busca de lote no cursor
+TAMANHO_BLOCO = 64 * 1024 # bytes acumulados antes de enviar ao cliente
+
+TIPOS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+PASTA_VAGAS = tempfile.gettempdir()
+
+def _horario_local(texto):
+    # Com fuso ('...T14:00-03:00' ou 'Z'), converte para o horário local sem fuso, como no banco
+    momento = datetime.fromisoformat(texto.replace('Z', '+00:00'))
+    return momento.astimezone().replace(tzinfo=None) if momento.tzinfo is not None else momento
+
+def intervalo_de_exportacao(args):
+    """
+    ?inicio= (obrigatório) e ?fim= (padrão: agora), em ISO ('2024-05-01' ou '2024-05-01T14:00').
+    Horários com fuso são convertidos para o horário local. Um 'fim' só com a data inclui o dia
+    inteiro. Levanta ValueError se o intervalo for inválido.
+    """
+    if not args.get('inicio'):
+        raise ValueError("O parâmetro 'inicio' é obrigatório.")
+    inicio = _horario_local(args['inicio'])
+    texto_fim = args.get('fim')
+    if texto_fim:
+        fim = _horario_local(texto_fim)
+        if len(texto_fim) == 10:
+            fim += timedelta(days=1)
+    else:
+        fim = datetime.now()
+    if fim <= inicio:
+        raise ValueError("O fim deve ser posterior ao início.")
+    if fim - inicio > timedelta(days=EXPORT_MAX_DIAS):
+        raise ValueError(f"O intervalo máximo é de {EXPORT_MAX_DIAS} dias.")
+    return inicio, fim
+
+def _reservar_vaga():
+    for indice in range(EXPORT_MAX_SIMULTANEAS):
+        arquivo = open(os.path.join(PASTA_VAGAS, f"monitor_blaze_export_{indice}.lock"), 'w')
+        try:
+            fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return arquivo
+        except BlockingIOError:
+            arquivo.close()
+    return None
+
+def _gerar(linhas, tabela, formato):
+    config = partition_manager.TABELAS[tabela]
+    bloco, tamanho, enviadas = [], 0, 0
+    comeco = time.monotonic()
+    try:
+        for trecho in bulk_io.formatar(linhas, formato, config['colunas']):
+            bloco.append(trecho)
+            tamanho += len(trecho)
+            enviadas += 1
+            if tamanho < TAMANHO_BLOCO: continue
+            yield ''.join(bloco)
+            bloco, tamanho = [], 0
+            if EXPORT_LINHAS_POR_SEGUNDO:
+                atraso = enviadas / EXPORT_LINHAS_POR_SEGUNDO - (time.monotonic() - comeco)
+                if atraso > 0: time.sleep(atraso)
+        if bloco:
+            yield ''.join(bloco)
+    except Exception as e:
+        # O status 200 já foi enviado: a saída fica truncada e o erro vai para o log
+        print(f"[ERRO NA EXPORTAÇÃO DE {tabela.upper()}]: {e}")
+    finally:
+        linhas.close()
+
+def resposta(tabela, formato, inicio, fim, abrir_conexao):
+    """Response em streaming, ou None se todas as vagas de exportação estiverem ocupadas."""
+    vaga = _reservar_vaga()
+    if vaga is None:
+        return None
+    try:
+        conn = abrir_conexao()
+        linhas = storage.linhas_para_exportacao(conn, tabela, inicio, fim, EXPORT_TIMEOUT_SQL_MS)
+    except Exception:
+        vaga.close()
+        raise
+
+    encerrado = []
+    def encerrar():
+        # Chamado pelo servidor ao fim da resposta, inclusive se o cliente desconectar no meio
+        if encerrado: return
+        encerrado.append(True)
+        try:
+            conn.close()
+        finally:
+            vaga.close() # fechar o arquivo libera o flock
+
+    saida = Response(_gerar(linhas, tabela, formato), mimetype=TIPOS[formato])
+    saida.call_on_close(encerrar)
+    nome = f"{tabela}_{inicio:%Y%m%d%H%M}_{fim:%Y%m%d%H%M}.{formato}"
+    saida.headers['Content-Disposition'] = f'attachment; filename="{nome}"'
+    saida.headers['Cache-Control'] = 'no-store'
+    saida.headers['X-Accel-Buffering'] = 'no'
+    return saida
@@ -0,0 +1,291 @@
+# fake_apis.py
+
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from flask import Flask, jsonify, request
+
+import benchmark
+import bulk_io
+from giro import CODIGOS_POR_COR
+
+# Servidores locais no lugar da API da Blaze e da API do Telegram, para rodar o coletor inteiro
+# sem rede (testes de vazão e de resiliência num notebook).
+#   blaze     /api/singleplayer-originals/originals/roulette_games/recent/<n>: um giro novo a cada
+#             --cadencia segundos (30 como na Blaze, ou menos para testes), sintético ou reproduzido
+#             de uma gravação (CSV/NDJSON de 'bulk_io.py exportar' ou o SQLite antigo), em loop
+#   telegram  /bot<token>/sendMessage e /bot<token>/editMessageText, com as mensagens guardadas em
+#             memória (e em --registro, uma linha JSON por chamada) e as respostas da API real,
+#             inclusive 'message is not modified' e 'message to edit not found'
+# Nos dois: --latencia-ms/--variacao-ms atrasam as respostas, --taxa-429 devolve rate limit (com
+# retry_after) e --taxa-5xx devolve --status-5xx. As falhas podem ser trocadas durante o teste com
+# POST /_fake/falhas, e GET /_fake/resumo mostra as contagens (no telegram, GET /_fake/registro
+# devolve as chamadas gravadas).
+#
+# Uso (a partir da pasta app/, cada servidor num terminal):
+#   python fake_apis.py blaze --porta 8101 --cadencia 5
+#   python fake_apis.py blaze --porta 8101 --gravacao maio.ndjson
+#   python fake_apis.py telegram --porta 8102 --latencia-ms 300 --taxa-429 0.05 --taxa-5xx 0.02 --registro envios.jsonl
+#   BLAZE_API_URL=http://127.0.0.1:8101 TELEGRAM_API_URL=http://127.0.0.1:8102 INTERVALO_COLETA=1 \
+#     TELEGRAM_TOKEN_1=teste TELEGRAM_CHAT_ID_1=1 python coletor_blaze.py
+#
+# Com --cadencia menor que INTERVALO_COLETA o coletor, que lê só o giro mais recente, pula giros.
+
+PORTAS_PADRAO = {'blaze': 8101, 'telegram': 8102}
+CAMPOS_DE_FALHA = ('latencia_ms', 'variacao_ms', 'taxa_429', 'retry_after', 'taxa_5xx', 'status_5xx')
+
+# --- Injeção de Falhas ---
+class Falhas:
+    """Latência e erros sorteados por requisição; alteráveis em tempo de execução (POST /_fake/falhas)."""
+
+    def __init__(self, latencia_ms=0, variacao_ms=0, taxa_429=0.0, retry_after=1, taxa_5xx=0.0, status_5xx=502, semente=None):
+        self._lock = threading.Lock()
+        self._aleatorio = random.Random(semente)
+        self.config = {}
+        self.atualizar(dict(latencia_ms=latencia_ms, variacao_ms=variacao_ms, taxa_429=taxa_429,
+                            retry_after=retry_after, taxa_5xx=taxa_5xx, status_5xx=status_5xx))
+
+    def atualizar(self, novos):
+        desconhecidos = set(novos) - set(CAMPOS_DE_FALHA)
+        if desconhecidos:
+            raise ValueError(f"Campos desconhecidos: {', '.join(sorted(desconhecidos))}")
+        config = dict(self.config, **novos)
+        if not all(0 <= config[taxa] <= 1 for taxa in ('taxa_429', 'taxa_5xx')) or config['taxa_429'] + config['taxa_5xx'] > 1:
+            raise ValueError("As taxas devem estar entre 0 e 1 e somar no máximo 1.")
+        if not 500 <= int(config['status_5xx']) <= 599:
+            raise ValueError("status_5xx deve estar entre 500 e 599.")
+        with self._lock:
+            self.config = config
+        return config
+
+    def sortear(self):
+        """Dorme a latência sorteada e devolve None, 429 ou o status 5xx configurado."""
+        with self._lock:
+            config = dict(self.config)
+            atraso = config['latencia_ms'] + self._aleatorio.uniform(0, config['variacao_ms'])
+            sorteio = self._aleatorio.random()
+        if atraso > 0:
+            time.sleep(atraso / 1000)
+        if sorteio < config['taxa_429']: return 429
+        if sorteio < config['taxa_429'] + config['taxa_5xx']: return int(config['status_5xx'])
+        return None
+
+def _rotas_de_controle(app, falhas, resumo):
+    logging.getLogger('werkzeug').setLevel(logging.WARNING) # sem uma linha de log por requisição
+
+    @app.route('/_fake/falhas', methods=['GET', 'POST'])
+    def configurar_falhas():
+        if request.method == 'GET':
+            return jsonify(falhas.config)
+        try:
+            return jsonify(falhas.atualizar(request.get_json(force=True) or {}))
+        except (ValueError, TypeError) as e:
+            return jsonify({"erro": str(e)}), 400
+
+    @app.route('/_fake/resumo')
+    def ver_resumo():
+        return jsonify(resumo())
+
+# --- Blaze ---
+def _rolls_sinteticos(taxa_brancos, semente):
+    aleatorio = random.Random(semente)
+    while True:
+        roll = 0 if aleatorio.random() < taxa_brancos else aleatorio.randint(1, 14)
+        yield roll, benchmark.cor_do_numero(roll)
+
+def _rolls_gravados(caminho, formato):
+    registros = [r for r in map(bulk_io.normalizar, bulk_io.LEITORES[formato](caminho)) if r is not None]
+    if not registros:
+        raise SystemExit(f"Nenhum giro aproveitável em {caminho}.")
+    registros.sort(key=lambda r: r[3])
+    print(f"{len(registros)} giro(s) gravado(s) carregado(s) de {caminho}.")
+    return registros
+
+def criar_blaze(cadencia, falhas, gravacao=None, formato=None, taxa_brancos=benchmark.TAXA_BRANCOS_PADRAO, semente=42):
+    """
+    App Flask da Blaze falsa. O giro k sai em inicio + k * cadencia, com 'created_at' nesse instante
+    (UTC, como a API real); a gravação é reproduzida na ordem dos horários, recomeçando ao final.
+    """
+    app = Flask('fake_blaze')
+    inicio = time.time()
+    lock = threading.Lock()
+    giros = [] # giros já emitidos (o índice é o k)
+    gravados = _rolls_gravados(gravacao, formato) if gravacao else None
+    sinteticos = _rolls_sinteticos(taxa_brancos, semente)
+    contagem = Counter()
+
+    def _giro(k):
+        with lock:
+            while len(giros) <= k:
+                i = len(giros)
+                if gravados:
+                    id_gravado, roll, cor, _ = gravados[i % len(gravados)]
+                    volta = i // len(gravados)
+                    id_giro = id_gravado if volta == 0 else f"{id_gravado}-{volta}" # ids únicos a cada volta
+                else:
+                    roll, cor = next(sinteticos)
+                    id_giro = f"fake-{int(inicio)}-{i}"
+                criado = datetime.fromtimestamp(inicio + i * cadencia, tz=timezone.utc)
+                giros.append({"id": id_giro, "created_at": f"{criado:%Y-%m-%dT%H:%M:%S}.{criado.microsecond // 1000:03d}Z",
+                              "color": CODIGOS_POR_COR[cor], "roll": roll})
+            return giros[k]
+
+    @app.route('/api/singleplayer-originals/originals/roulette_games/recent/<int:quantidade>')
+    def recentes(quantidade):
+        status = falhas.sortear()
+        contagem[status or 200] += 1
+        if status:
+            return jsonify({"error": {"code": status, "message": "falha injetada"}}), status
+        atual = int((time.time() - inicio) // cadencia)
+        return jsonify([_giro(k) for k in range(atual, max(atual - quantidade, -1), -1)])
+
+    _rotas_de_controle(app, falhas, lambda: {"giros_emitidos": len(giros), "cadencia": cadencia,
+                                             "fonte": gravacao or "sintética", "respostas": dict(contagem)})
+    return app
+
+# --- Telegram ---
+def criar_telegram(falhas, registro=None):
+    """App Flask do Telegram falso: guarda as mensagens por chat e registra cada chamada."""
+    app = Flask('fake_telegram')
+    lock = threading.Lock()
+    mensagens = {} # (chat_id, message_id) -> texto
+    proximo_id = Counter() # chat_id -> último message_id
+    chamadas = []
+
+    def _registrar(metodo, dados, status, message_id=None):
+        evento = {"em": datetime.now().isoformat(timespec='milliseconds'), "metodo": metodo, "status": status,
+                  "chat_id": dados.get('chat_id'), "message_id": message_id, "texto": dados.get('text')}
+        with lock:
+            chamadas.append(evento)
+            if registro:
+                with open(registro, 'a', encoding='utf-8') as f: f.write(json.dumps(evento, ensure_ascii=False) + "\n")
+
+    def _erro(metodo, dados, status, descricao, message_id=None, **parametros):
+        _registrar(metodo, dados, status, message_id)
+        corpo = {"ok": False, "error_code": status, "description": descricao}
+        if parametros:
+            corpo["parameters"] = parametros
+        resposta = jsonify(corpo)
+        resposta.status_code = status
+        if 'retry_after' in parametros:
+            resposta.headers['Retry-After'] = str(parametros['retry_after'])
+        return resposta
+
+    @app.route('/bot<token>/<metodo>', methods=['GET', 'POST'])
+    def api(token, metodo):
+        dados = request.form.to_dict() or request.get_json(silent=True) or {}
+        status = falhas.sortear()
+        if status == 429:
+            retry_after = int(falhas.config['retry_after'])
+            return _erro(metodo, dados, 429, f"Too Many Requests: retry after {retry_after}", retry_after=retry_after)
+        if status:
+            return _erro(metodo, dados, status, "Internal Server Error (falha injetada)")
+        if not dados.get('chat_id') or not dados.get('text'):
+            return _erro(metodo, dados, 400, "Bad Request: chat_id and text are required")
+
+        chat_id = str(dados['chat_id'])
+        if metodo == 'sendMessage':
+            with lock:
+                proximo_id[chat_id] += 1
+                message_id = proximo_id[chat_id]
+                mensagens[(chat_id, message_id)] = dados['text']
+            _registrar(metodo, dados, 200, message_id)
+            return jsonify({"ok": True, "result": {"message_id": message_id, "chat": {"id": chat_id}, "date": int(time.time()),
+                                                   "text": dados['text']}})
+        if metodo == 'editMessageText':
+            try:
+                message_id = int(dados.get('message_id'))
+            except (TypeError, ValueError):
+                return _erro(metodo, dados, 400, "Bad Request: message_id is required")
+            with lock:
+                anterior = mensagens.get((chat_id, message_id))
+                if anterior is not None and anterior != dados['text']:
+                    mensagens[(chat_id, message_id)] = dados['text']
+            if anterior is None:
+                return _erro(metodo, dados, 400, "Bad Request: message to edit not found", message_id)
+            if anterior == dados['text']:
+                return _erro(metodo, dados, 400, "Bad Request: message is not modified", message_id)
+            _registrar(metodo, dados, 200, message_id)
+            return jsonify({"ok": True, "result": {"message_id": message_id, "chat": {"id": chat_id}, "date": int(time.time()),
+                                                   "text": dados['text']}})
+        return _erro(metodo, dados, 404, "Not Found")
+
+    @app.route('/_fake/registro')
+    def ver_registro():
+        # ?desde=N devolve só as chamadas a partir da posição N (para acompanhar durante o teste)
+        desde = request.args.get('desde', default=0, type=int)
+        with lock:
+            return jsonify({"total": len(chamadas), "chamadas": chamadas[desde:]})
+
+    @app.route('/_fake/limpar', methods=['POST'])
+    def limpar():
+        with lock:
+            chamadas.clear()
+            mensagens.clear()
+            proximo_id.clear()
+        return jsonify({"ok": True})
+
+    def resumo():
+        with lock:
+            por_metodo = Counter(f"{c['metodo']} {c['status']}" for c in chamadas)
+            return {"chamadas": len(chamadas), "mensagens": len(mensagens), "por_metodo_e_status": dict(sorted(por_metodo.items()))}
+
+    _rotas_de_controle(app, falhas, resumo)
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidores locais no lugar das APIs da Blaze e do Telegram.")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    def opcoes_comuns(subparser):
+        subparser.add_argument('--host', default='127.0.0.1')
+        subparser.add_argument('--porta', type=int, help=f"Padrão: {PORTAS_PADRAO}")
+        subparser.add_argument('--latencia-ms', type=float, default=0, help="Atraso fixo de cada resposta.")
+        subparser.add_argument('--variacao-ms', type=float, default=0, help="Atraso extra sorteado entre 0 e este valor.")
+        subparser.add_argument('--taxa-429', type=float, default=0.0, help="Fração de respostas 429 (rate limit).")
+        subparser.add_argument('--retry-after', type=int, default=1, help="retry_after das respostas 429, em segundos.")
+        subparser.add_argument('--taxa-5xx', type=float, default=0.0, help="Fração de respostas de erro do servidor.")
+        subparser.add_argument('--status-5xx', type=int, default=502, help="Status das respostas de erro (padrão: 502).")
+        subparser.add_argument('--semente', type=int, default=42)
+
+    p_blaze = comandos.add_parser('blaze', help="Feed de giros no formato da API da Blaze.")
+    opcoes_comuns(p_blaze)
+    p_blaze.add_argument('--cadencia', type=float, default=30, help="Segundos entre giros (padrão: 30).")
+    p_blaze.add_argument('--gravacao', help="Giros gravados (CSV, NDJSON ou SQLite antigo); sem ela, giros sintéticos.")
+    p_blaze.add_argument('--formato', choices=bulk_io.FORMATOS, help="Padrão: deduzido pela extensão do arquivo.")
+    p_blaze.add_argument('--taxa-brancos', type=float, default=benchmark.TAXA_BRANCOS_PADRAO)
+
+    p_telegram = comandos.add_parser('telegram', help="API do Telegram (sendMessage/editMessageText) que registra as chamadas.")
+    opcoes_comuns(p_telegram)
+    p_telegram.add_argument('--registro', help="Arquivo JSONL onde cada chamada é acrescentada.")
+
+    args = parser.parse_args(argv)
+    try:
+        falhas = Falhas(args.latencia_ms, args.variacao_ms, args.taxa_429, args.retry_after, args.taxa_5xx, args.status_5xx, args.semente)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.comando == 'blaze':
+        if args.cadencia <= 0:
+            parser.error("--cadencia deve ser positiva.")
+        formato = None
+        if args.gravacao:
+            formato = args.formato or {'.db': 'sqlite', '.sqlite': 'sqlite', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}.get(
+                os.path.splitext(args.gravacao)[1].lower(), 'csv')
+        app = criar_blaze(args.cadencia, falhas, args.gravacao, formato, args.taxa_brancos, args.semente)
+    else:
+        app = criar_telegram(falhas, args.registro)
+
+    porta = args.porta or PORTAS_PADRAO[args.comando]
+    print(f"{args.comando.capitalize()} falso em http://{args.host}:{porta} | falhas: {falhas.config}")
+    app.run(host=args.host, port=porta, threaded=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# giro.py
+
+from datetime import datetime, timezone
+
+# Registro de um giro da roleta, do coletor até a API: o horário é lido uma única vez (da API
+# da Blaze ou do banco) e os campos derivados (epoch, hora, minuto, textos de exibição) já saem
+# calculados, em vez de strptime/strftime repetidos em cada laço.
+# Continua acessível como dicionário (giro['timestamp_iso'], giro['color']), então as estratégias
+# escritas para as linhas do banco funcionam sem mudança.
+
+CORES_POR_CODIGO = {1: "Vermelho", 2: "Preto", 0: "Branco"} # códigos da API da Blaze
+CODIGOS_POR_COR = {cor: codigo for codigo, cor in CORES_POR_CODIGO.items()}
+FORMATO_CREATED_AT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+def segundos_do_relogio(momento):
+    """Horário local sem fuso em segundos, contando como se fosse UTC (base do formato compacto)."""
+    return int(momento.replace(tzinfo=timezone.utc).timestamp())
+
+class Giro:
+    __slots__ = ('id', 'roll', 'color', 'timestamp_iso', # colunas de 'resultados'
+                 'codigo_cor', 'epoch', 'segundos_relogio', 'hora', 'minuto', 'hora_curta', 'hora_completa')
+
+    CAMPOS_LINHA = ('id', 'roll', 'color', 'timestamp_iso')
+
+    def __init__(self, id, roll, color, timestamp_iso, epoch=None):
+        self.id = id
+        self.roll = roll
+        self.color = color
+        self.timestamp_iso = timestamp_iso # datetime local sem fuso, como vem do banco
+        self.codigo_cor = CODIGOS_POR_COR.get(color)
+        self.epoch = epoch if epoch is not None else int(timestamp_iso.timestamp())
+        self.segundos_relogio = segundos_do_relogio(timestamp_iso)
+        self.hora = timestamp_iso.hour
+        self.minuto = timestamp_iso.minute
+        self.hora_completa = f"{timestamp_iso.hour:02d}:{timestamp_iso.minute:02d}:{timestamp_iso.second:02d}"
+        self.hora_curta = self.hora_completa[:5]
+
+    @classmethod
+    def da_api(cls, jogo):
+        """Giro a partir de um item da API da Blaze ('created_at' em UTC, cor em código)."""
+        momento_utc = datetime.strptime(jogo['created_at'], FORMATO_CREATED_AT).replace(tzinfo=timezone.utc)
+        local = momento_utc.astimezone().replace(tzinfo=None)
+        return cls(jogo['id'], jogo['roll'], CORES_POR_CODIGO.get(jogo['color']), local, int(momento_utc.timestamp()))
+
+    # --- Acesso como Linha do Banco ---
+    def __getitem__(self, chave):
+        if chave not in self.__slots__:
+            raise KeyError(chave)
+        return getattr(self, chave)
+
+    def get(self, chave, padrao=None):
+        return getattr(self, chave) if chave in self.__slots__ else padrao
+
+    def keys(self):
+        return self.CAMPOS_LINHA
+
+    def __repr__(self):
+        return f"Giro({self.id!r}, {self.roll}, {self.color!r}, {self.timestamp_iso:%Y-%m-%d %H:%M:%S})"
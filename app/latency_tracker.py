@@ -0,0 +1,134 @@
+# latency_tracker.py
+
+import json
+import math
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+import metricas
+
+# Latência ponta a ponta, do 'created_at' do giro na Blaze até a notificação chegar ao Telegram.
+# O coletor marca cada giro e cada sinal com o horário (relógio de parede) de cada etapa:
+#   ingestao        giro recebido da API da Blaze
+#   avaliacao       verificar() da estratégia concluído (no fluxo 'giro': todas as estratégias)
+#   commit          sinal (ou acerto) gravado no banco
+#   enfileiramento  notificação decidida, logo antes da chamada ao Telegram
+#   telegram        resposta de sucesso do Telegram (envio do sinal ou edição do acerto)
+# Cada valor é o tempo acumulado desde o 'created_at' até a etapa. Fluxos:
+#   giro    todo giro (ingestao, avaliacao)
+#   sinal   giro que gerou o sinal -> mensagem enviada
+#   acerto  branco que acertou o alvo -> mensagem editada
+# As janelas recentes (por fluxo, painel e etapa) ficam em memória no coletor; os percentis são
+# publicados em LATENCY_STATE_FILE para o app web (/api/latencia) e também vão para /metrics.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STRATEGIES_DIR = os.path.join(BASE_DIR, '..', 'strategies')
+LATENCY_STATE_FILE = os.path.join(STRATEGIES_DIR, 'latency_state.json')
+
+ETAPAS = ('ingestao', 'avaliacao', 'commit', 'enfileiramento', 'telegram')
+PAINEL_GERAL = 'geral'
+TAMANHO_JANELA = 500 # amostras recentes por fluxo/painel/etapa
+TEMPO_MAXIMO_MARCAS = 3600 # segundos; marcas de sinais nunca notificados são descartadas depois disso
+
+LATENCIA = metricas.histograma('latencia_giro_segundos', 'Tempo desde o created_at do giro até cada etapa, por fluxo e painel.',
+                               ('fluxo', 'etapa', 'painel'), buckets=(0.25, 0.5, 1, 2, 3, 5, 10, 20, 30, 60, 120))
+
+_janelas = {} # (fluxo, painel, etapa) -> deque de segundos
+_giro_atual = None # marcas do giro em processamento
+_marcas_por_sinal = {} # db_id -> marcas do sinal até ser notificado
+
+# --- Marcas ---
+def _marcas_iniciais(giro):
+    return {'origem': giro.timestamp_iso.timestamp(), 'ingestao': time.time()}
+
+def giro_recebido(giro):
+    """Abre as marcas do giro recém-coletado; sinais gravados a seguir herdam a origem dele."""
+    global _giro_atual
+    _giro_atual = _marcas_iniciais(giro)
+    _giro_atual['id'] = giro.id
+
+def avaliacao_concluida():
+    if not _giro_atual: return
+    marcas = dict(_giro_atual, avaliacao=time.time())
+    _registrar('giro', None, marcas)
+    _publicar()
+
+def marcas_do_giro(giro):
+    """Cópia das marcas do giro (ex.: o branco que confere os acertos), para seguir um fluxo próprio."""
+    if _giro_atual and _giro_atual.get('id') == giro.id:
+        return {k: v for k, v in _giro_atual.items() if k != 'id'}
+    return _marcas_iniciais(giro)
+
+def marcar(marcas, etapa):
+    if marcas is not None:
+        marcas[etapa] = time.time()
+
+def sinais_gravados(sinais, avaliado_em, gravado_em):
+    if not _giro_atual: return
+    _descartar_antigas(gravado_em)
+    for sinal in sinais:
+        _marcas_por_sinal[sinal['id']] = {'origem': _giro_atual['origem'], 'ingestao': _giro_atual['ingestao'],
+                                          'avaliacao': avaliado_em, 'commit': gravado_em}
+
+def notificacao_enfileirada(db_ids):
+    """
+    Marcas do sinal mais recente do grupo (o que completou a confluência, se for o caso),
+    com o enfileiramento marcado agora. None se nenhum sinal do grupo foi marcado por este coletor.
+    """
+    candidatas = [_marcas_por_sinal.pop(db_id) for db_id in db_ids if db_id in _marcas_por_sinal]
+    if not candidatas: return None
+    marcas = max(candidatas, key=lambda m: m['commit'])
+    marcar(marcas, 'enfileiramento')
+    return marcas
+
+def notificacao_concluida(fluxo, panel_id, marcas, confirmada):
+    """Registra as etapas do fluxo; sem confirmação do Telegram, a etapa 'telegram' fica de fora."""
+    if marcas is None: return
+    if confirmada:
+        marcar(marcas, 'telegram')
+    _registrar(fluxo, panel_id, marcas)
+    _publicar()
+
+def _descartar_antigas(agora):
+    for db_id in [db_id for db_id, m in _marcas_por_sinal.items() if agora - m['commit'] > TEMPO_MAXIMO_MARCAS]:
+        del _marcas_por_sinal[db_id]
+
+# --- Janelas e Percentis ---
+def _registrar(fluxo, panel_id, marcas):
+    paineis = [PAINEL_GERAL] + ([str(panel_id)] if panel_id is not None else [])
+    for etapa in ETAPAS:
+        if etapa not in marcas: continue
+        segundos = marcas[etapa] - marcas['origem']
+        for painel in paineis:
+            janela = _janelas.get((fluxo, painel, etapa))
+            if janela is None:
+                janela = _janelas[(fluxo, painel, etapa)] = deque(maxlen=TAMANHO_JANELA)
+            janela.append(segundos)
+            LATENCIA.observar(segundos, fluxo, etapa, painel)
+
+def _percentil(ordenados, fracao):
+    # Posição mais próxima (nearest-rank)
+    indice = max(0, math.ceil(fracao * len(ordenados)) - 1)
+    return round(ordenados[indice], 3)
+
+def resumir(amostras):
+    ordenados = sorted(amostras)
+    return {"amostras": len(ordenados), "p50": _percentil(ordenados, 0.5), "p90": _percentil(ordenados, 0.9),
+            "p99": _percentil(ordenados, 0.99), "max": round(ordenados[-1], 3)}
+
+def snapshot():
+    fluxos = {}
+    for (fluxo, painel, etapa), janela in _janelas.items():
+        if janela:
+            fluxos.setdefault(fluxo, {}).setdefault(painel, {})[etapa] = resumir(janela)
+    return {"atualizado_em": datetime.now().isoformat(), "etapas": list(ETAPAS), "fluxos": fluxos}
+
+def _publicar():
+    # Escrita atômica: o app web nunca lê um arquivo pela metade
+    caminho_temporario = f"{LATENCY_STATE_FILE}.tmp"
+    try:
+        with open(caminho_temporario, 'w') as f: json.dump(snapshot(), f)
+        os.replace(caminho_temporario, LATENCY_STATE_FILE)
+    except IOError as e:
+        print(f"[ERRO AO PUBLICAR LATÊNCIAS]: {e}")
@@ -0,0 +1,325 @@
+# load_test.py
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+import benchmark
+
+# Teste de carga do painel: N abas abertas, cada uma repetindo exatamente as consultas de
+# static/script.js, na abertura da página e depois em intervalos fixos:
+#   dashboard      fetchAndUpdate() a cada 5 s: /api/dashboard?limite=<currentLimit>&formato=compacto
+#                  (o snapshot único que substituiu as cinco rotas que a página consultava)
+#   white_minutes  renderWhiteMinutesChart() a cada 30 s: /api/stats/white_minutes
+# Como o setInterval do navegador, cada consulta sai no horário marcado mesmo que a anterior ainda
+# não tenha voltado, e a latência é contada desse horário (atrasos do próprio gerador entram na
+# conta em vez de esconder a fila). Cada aba revalida com If-None-Match a ETag recebida (304) e
+# aceita gzip/brotli, como o fetch() do navegador.
+# O relatório traz vazão, p50/p95/p99 por consulta, o uso de conexões com o banco lido de /metrics
+# (conexões abertas, conexões por requisição, tempo de conexão, acertos do cache de respostas) e,
+# com --amostrar-postgres, as conexões vistas pelo próprio Postgres (pg_stat_activity).
+#
+# Uso (a partir da pasta app/, com um banco só para o teste):
+#   STORAGE_BACKEND=sqlite SQLITE_PATH=/tmp/carga.db python load_test.py semear --giros 5000 --pendentes 500
+#   STORAGE_BACKEND=sqlite SQLITE_PATH=/tmp/carga.db gunicorn app:app --worker-class gthread --threads 8   (em outro terminal, como no render.yaml)
+#   STORAGE_BACKEND=sqlite SQLITE_PATH=/tmp/carga.db python load_test.py executar --clientes 200 --duracao 120 --coletor-simulado -o carga.json
+#
+# --coletor-simulado grava um giro sintético a cada 30 s no mesmo banco (mesmas variáveis de ambiente
+# do app), invalidando o cache de respostas como o coletor real; sem ele, o banco fica parado e
+# quase todas as respostas saem do cache.
+
+URL_PADRAO = 'http://127.0.0.1:8000' # bind padrão do gunicorn
+LIMITE_PADRAO = 120 # currentLimit inicial em static/script.js
+CONSULTAS = {
+    'dashboard': ('/api/dashboard?limite={limite}&formato=compacto', 5),
+    'white_minutes': ('/api/stats/white_minutes', 30),
+}
+CABECALHOS = {'Accept': '*/*', 'Accept-Encoding': 'gzip, deflate, br'}
+TEMPO_LIMITE = 30 # segundos por requisição
+INTERVALO_AMOSTRAGEM = 1 # segundos entre leituras de /metrics e do Postgres
+METRICAS_DE_CONEXAO = {
+    'monitor_blaze_banco_conexoes_total': 'conexoes_total',
+    'monitor_blaze_banco_conexoes_abertas': 'conexoes_abertas',
+    'monitor_blaze_banco_conexao_segundos_sum': 'tempo_conexao_soma',
+    'monitor_blaze_banco_conexao_segundos_count': 'tempo_conexao_total',
+    'monitor_blaze_http_requisicao_segundos_count': 'requisicoes',
+    'monitor_blaze_cache_respostas_acertos_total': 'cache_acertos',
+    'monitor_blaze_cache_respostas_falhas_total': 'cache_falhas',
+}
+
+# --- Dados ---
+def _estrategias_do_painel(todas):
+    # As ativas no painel (strategy_status.json do app), para que os sinais apareçam no snapshot
+    caminho = os.path.join(benchmark.BASE_DIR, '..', 'strategies', 'strategy_status.json')
+    try:
+        with open(caminho, 'r') as f: status = json.load(f)
+    except (IOError, json.JSONDecodeError):
+        status = {}
+    ativas = {sid: s for sid, s in todas.items() if status.get(sid)}
+    return ativas or dict(todas)
+
+def semear(giros, pendentes, taxa_brancos, semente):
+    """Histórico sintético e alvos pendentes no banco das variáveis de ambiente (STORAGE_BACKEND etc.)."""
+    import storage
+    import strategy_registry
+    conn = storage.conectar(dicionario=True)
+    storage.inicializar_esquema(conn)
+    conn.commit()
+    if storage.ultimo_resultado(conn.cursor()) is not None:
+        conn.close()
+        raise SystemExit("O banco já tem giros. Use um banco só para o teste de carga.")
+    agora = datetime.now().replace(microsecond=0)
+    historico = benchmark.gerar_giros(giros, taxa_brancos, random.Random(semente), agora - giros * benchmark.CADENCIA)
+    benchmark.semear_historico(conn, historico)
+    estrategias = _estrategias_do_painel(strategy_registry.obter_estrategias())
+    total = benchmark.semear_alvos_pendentes(conn, estrategias, pendentes, 'carga', agora + timedelta(minutes=5)) if pendentes else 0
+    conn.close()
+    print(f"Banco ({storage.STORAGE_BACKEND}) semeado: {giros} giros, {total} alvo(s) pendente(s) de {len(estrategias)} estratégia(s).")
+
+def _simular_coletor(parar, taxa_brancos, semente, contagem):
+    # Um giro novo a cada 30 s, como o coletor: invalida o cache de respostas do app
+    import storage
+    aleatorio = random.Random(semente)
+    conn = storage.conectar(dicionario=True)
+    try:
+        ultimo = storage.ultimo_resultado(conn.cursor())
+        horario = ultimo.timestamp_iso if ultimo else datetime.now().replace(microsecond=0)
+        while not parar.wait(benchmark.CADENCIA.total_seconds()):
+            horario += benchmark.CADENCIA
+            storage.inserir_resultado(conn.cursor(), benchmark.gerar_giros(1, taxa_brancos, aleatorio, horario)[0])
+            conn.commit()
+            contagem['giros'] += 1
+    except storage.ERROS_DE_BANCO as e:
+        print(f"[ERRO NO COLETOR SIMULADO]: {e}")
+    finally:
+        conn.close()
+
+# --- Clientes ---
+class _Aba:
+    """Uma aba do painel: sessão HTTP própria e as ETags das últimas respostas."""
+
+    def __init__(self, url, limite):
+        self.url = url
+        self.limite = limite
+        self.sessao = requests.Session()
+        self.sessao.headers.update(CABECALHOS)
+        self.etags = {}
+
+    def consultar(self, consulta, marcado_para, resultados):
+        caminho = CONSULTAS[consulta][0].format(limite=self.limite)
+        cabecalhos = {'If-None-Match': self.etags[consulta]} if consulta in self.etags else None
+        atraso = time.monotonic() - marcado_para
+        try:
+            resposta = self.sessao.get(self.url + caminho, headers=cabecalhos, timeout=TEMPO_LIMITE, stream=True)
+            corpo = resposta.raw.read(decode_content=False) # bytes como trafegaram (comprimidos)
+            status = str(resposta.status_code)
+            if resposta.headers.get('ETag'):
+                self.etags[consulta] = resposta.headers['ETag']
+            resposta.close()
+        except requests.RequestException:
+            status, corpo = 'erro', b''
+        resultados.append((consulta, (time.monotonic() - marcado_para) * 1000, status, len(corpo), atraso * 1000))
+
+# --- Amostragem do Servidor ---
+def ler_metricas(sessao, url):
+    """Soma, por nome, as séries de /metrics que interessam ao teste (None se a rota falhar)."""
+    try:
+        resposta = sessao.get(url + '/metrics', timeout=TEMPO_LIMITE)
+        resposta.raise_for_status()
+    except requests.RequestException:
+        return None
+    valores = dict.fromkeys(METRICAS_DE_CONEXAO.values(), 0.0)
+    for linha in resposta.text.splitlines():
+        if not linha or linha.startswith('#'): continue
+        nome_e_rotulos, _, valor = linha.rpartition(' ')
+        chave = METRICAS_DE_CONEXAO.get(nome_e_rotulos.split('{', 1)[0])
+        if chave:
+            valores[chave] += float(valor)
+    return valores
+
+def _amostrar(url, parar, amostras, amostrar_postgres):
+    sessao = requests.Session()
+    conn_pg = None
+    if amostrar_postgres:
+        import psycopg2
+        conn_pg = psycopg2.connect(os.environ['DATABASE_URL'])
+        conn_pg.autocommit = True
+    try:
+        while not parar.wait(INTERVALO_AMOSTRAGEM):
+            metricas_agora = ler_metricas(sessao, url)
+            if metricas_agora:
+                amostras['conexoes_abertas'].append(metricas_agora['conexoes_abertas'])
+            if conn_pg:
+                cursor = conn_pg.cursor()
+                cursor.execute("SELECT COUNT(*) FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()")
+                amostras['postgres'].append(cursor.fetchone()[0])
+    finally:
+        if conn_pg: conn_pg.close()
+
+# --- Execução ---
+def executar_carga(url, clientes, duracao, rampa, limite):
+    """Dispara as consultas das abas nos horários do setInterval. Retorna [(consulta, ms, status, bytes, atraso_ms)]."""
+    resultados = []
+    abas = [_Aba(url, limite) for _ in range(clientes)]
+    inicio = time.monotonic()
+    fim = inicio + duracao
+    sequencia = itertools.count()
+    agenda = [] # (horário, desempate, aba, consulta)
+    for i, aba in enumerate(abas):
+        abertura = inicio + (rampa * i / clientes if rampa else 0)
+        for consulta in CONSULTAS:
+            heapq.heappush(agenda, (abertura, next(sequencia), aba, consulta))
+
+    # Threads de sobra: com respostas lentas as consultas de uma aba se sobrepõem, como no navegador
+    with ThreadPoolExecutor(max_workers=max(4, clientes * len(CONSULTAS))) as executor:
+        while agenda:
+            horario, _, aba, consulta = heapq.heappop(agenda)
+            if horario >= fim: break
+            espera = horario - time.monotonic()
+            if espera > 0: time.sleep(espera)
+            executor.submit(aba.consultar, consulta, horario, resultados)
+            heapq.heappush(agenda, (horario + CONSULTAS[consulta][1], next(sequencia), aba, consulta))
+    for aba in abas:
+        aba.sessao.close()
+    return resultados
+
+def _resumir_consulta(medidas, duracao):
+    duracoes = sorted(m[1] for m in medidas)
+    status = Counter(m[2] for m in medidas)
+    return {
+        "requisicoes": len(medidas),
+        "por_segundo": round(len(medidas) / duracao, 2),
+        "status": dict(sorted(status.items())),
+        "p50_ms": round(benchmark.percentil(duracoes, 0.5), 2),
+        "p95_ms": round(benchmark.percentil(duracoes, 0.95), 2),
+        "p99_ms": round(benchmark.percentil(duracoes, 0.99), 2),
+        "max_ms": round(duracoes[-1], 2),
+        "bytes_medio": round(statistics.fmean(m[3] for m in medidas)),
+        "atraso_max_ms": round(max(m[4] for m in medidas), 2), # saída atrasada pelo próprio gerador
+    }
+
+def _resumir_banco(antes, depois, amostras):
+    banco = {}
+    if amostras['conexoes_abertas']:
+        banco["conexoes_abertas_max"] = max(amostras['conexoes_abertas'])
+        banco["conexoes_abertas_media"] = round(statistics.fmean(amostras['conexoes_abertas']), 2)
+    if antes and depois:
+        delta = {chave: depois[chave] - antes[chave] for chave in antes}
+        # As duas séries vêm da mesma publicação de cada worker, então a razão não sofre com o atraso dela
+        if delta['requisicoes']:
+            banco["conexoes_por_requisicao"] = round(delta['conexoes_total'] / delta['requisicoes'], 3)
+        if delta['tempo_conexao_total']:
+            banco["conexao_media_ms"] = round(delta['tempo_conexao_soma'] / delta['tempo_conexao_total'] * 1000, 3)
+        consultas_cache = delta['cache_acertos'] + delta['cache_falhas']
+        banco["cache_acertos"] = int(delta['cache_acertos'])
+        banco["cache_falhas"] = int(delta['cache_falhas'])
+        banco["cache_taxa_acerto"] = round(delta['cache_acertos'] / consultas_cache * 100, 1) if consultas_cache else None
+    if amostras['postgres']:
+        banco["postgres_conexoes_max"] = max(amostras['postgres'])
+        banco["postgres_conexoes_media"] = round(statistics.fmean(amostras['postgres']), 2)
+    return banco
+
+def executar(args):
+    url = args.url.rstrip('/')
+    sessao = requests.Session()
+    antes = ler_metricas(sessao, url)
+    if antes is None:
+        raise SystemExit(f"Não foi possível ler {url}/metrics. O app está rodando?")
+
+    parar = threading.Event()
+    amostras = {'conexoes_abertas': [], 'postgres': []}
+    contagem = {'giros': 0}
+    auxiliares = [threading.Thread(target=_amostrar, args=(url, parar, amostras, args.amostrar_postgres), daemon=True)]
+    if args.coletor_simulado:
+        auxiliares.append(threading.Thread(target=_simular_coletor, args=(parar, args.taxa_brancos, args.semente, contagem), daemon=True))
+    for thread in auxiliares: thread.start()
+
+    print(f"{args.clientes} aba(s) contra {url} por {args.duracao}s (abertura em {args.rampa}s)...")
+    inicio = time.monotonic()
+    try:
+        resultados = executar_carga(url, args.clientes, args.duracao, args.rampa, args.limite)
+    finally:
+        parar.set()
+        for thread in auxiliares: thread.join()
+    decorrido = time.monotonic() - inicio
+    depois = ler_metricas(sessao, url)
+
+    relatorio = {
+        "versao_formato": 1,
+        "gerado_em": datetime.now().isoformat(timespec='seconds'),
+        "ambiente": {"url": url, "commit": benchmark.commit_atual()},
+        "parametros": {"clientes": args.clientes, "duracao": args.duracao, "rampa": args.rampa, "limite": args.limite,
+                       "coletor_simulado": args.coletor_simulado},
+        "total": {"requisicoes": len(resultados), "por_segundo": round(len(resultados) / decorrido, 2),
+                  "erros": sum(1 for r in resultados if r[2] == 'erro' or r[2].startswith('5')),
+                  "giros_simulados": contagem['giros']},
+        "consultas": {},
+        "banco": _resumir_banco(antes, depois, amostras),
+    }
+    for consulta in CONSULTAS:
+        medidas = [r for r in resultados if r[0] == consulta]
+        if medidas:
+            relatorio["consultas"][consulta] = _resumir_consulta(medidas, decorrido)
+
+    print(f"\n{'consulta':<14} {'req':>7} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx ms':>9}  status")
+    for consulta, resumo in relatorio["consultas"].items():
+        status = ' '.join(f"{codigo}:{n}" for codigo, n in resumo["status"].items())
+        print(f"{consulta:<14} {resumo['requisicoes']:>7} {resumo['por_segundo']:>7.2f} {resumo['p50_ms']:>9.2f} "
+              f"{resumo['p95_ms']:>9.2f} {resumo['p99_ms']:>9.2f} {resumo['max_ms']:>9.2f}  {status}")
+    total = relatorio["total"]
+    print(f"\nTotal: {total['requisicoes']} requisições, {total['por_segundo']} req/s, {total['erros']} erro(s).")
+    print("Banco: " + ", ".join(f"{chave}={valor}" for chave, valor in relatorio["banco"].items()))
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f: json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"\nRelatório gravado em {args.saida}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do painel (abas consultando como static/script.js).")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p_semear = comandos.add_parser('semear', help="Semeia um banco vazio com giros e sinais sintéticos.")
+    p_semear.add_argument('--giros', type=int, default=5000, help="Giros no histórico (padrão: 5000).")
+    p_semear.add_argument('--pendentes', type=int, default=500, help="Alvos pendentes (padrão: 500).")
+    p_semear.add_argument('--taxa-brancos', type=float, default=benchmark.TAXA_BRANCOS_PADRAO)
+    p_semear.add_argument('--semente', type=int, default=42)
+
+    p_executar = comandos.add_parser('executar', help="Abre N abas simuladas contra uma instância local.")
+    p_executar.add_argument('--url', default=URL_PADRAO, help=f"Padrão: {URL_PADRAO}")
+    p_executar.add_argument('--clientes', type=int, default=50, help="Abas simuladas (padrão: 50).")
+    p_executar.add_argument('--duracao', type=float, default=60, help="Segundos de carga (padrão: 60).")
+    p_executar.add_argument('--rampa', type=float, default=CONSULTAS['dashboard'][1],
+                            help="Segundos para abrir todas as abas (padrão: 5, um intervalo do painel).")
+    p_executar.add_argument('--limite', type=int, default=LIMITE_PADRAO, help="Giros por snapshot, o currentLimit da página (padrão: 120).")
+    p_executar.add_argument('--coletor-simulado', action='store_true', help="Grava um giro sintético a cada 30 s no banco do app.")
+    p_executar.add_argument('--taxa-brancos', type=float, default=benchmark.TAXA_BRANCOS_PADRAO)
+    p_executar.add_argument('--semente', type=int, default=42)
+    p_executar.add_argument('--amostrar-postgres', action='store_true', help="Conta as conexões em pg_stat_activity (DATABASE_URL).")
+    p_executar.add_argument('-o', '--saida', help="Arquivo JSON com o relatório.")
+
+    args = parser.parse_args(argv)
+    if args.comando == 'semear':
+        if args.giros < 1 or args.pendentes < 0:
+            parser.error("--giros deve ser positivo e --pendentes não negativo.")
+        semear(args.giros, args.pendentes, args.taxa_brancos, args.semente)
+        return
+
+    if args.clientes < 1 or args.duracao <= 0 or args.rampa < 0:
+        parser.error("--clientes e --duracao devem ser positivos e --rampa não negativa.")
+    if args.amostrar_postgres and not os.environ.get('DATABASE_URL'):
+        parser.error("--amostrar-postgres requer DATABASE_URL.")
+    executar(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# metricas.py
+
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Métricas do coletor e do app web no formato de texto do Prometheus (rota /metrics).
+# Cada processo (coletor, cada worker do gunicorn) mantém o próprio registro em memória e o
+# publica, com escrita atômica, em METRICAS_DIR/<processo>-<pid>.json. A rota /metrics lê todos
+# os arquivos de processos vivos e soma as séries de mesmo nome e rótulos, então o scrape vê o
+# coletor e todos os workers, qualquer que seja o worker que atender a requisição.
+# Contadores e histogramas são acumulados desde o início do processo; medidores também são
+# somados entre processos (ex.: conexões abertas em todos os workers). Quando um processo
+# termina, seus contadores e histogramas são incorporados a METRICAS_DIR/encerrados.json,
+# para que as somas não caiam a cada worker reciclado; só os medidores dele saem da soma.
+METRICAS_DIR = os.environ.get('METRICAS_DIR', os.path.join(tempfile.gettempdir(), 'monitor_blaze_metricas'))
+INTERVALO_PUBLICACAO = 5 # segundos mínimos entre publicações do mesmo processo
+PREFIXO = 'monitor_blaze_'
+TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_lock = threading.Lock()
+_metricas = {} # nome -> _Metrica, na ordem de declaração
+_processo = 'processo'
+_ultima_publicacao = 0
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.series = {} # valores dos rótulos (tupla) -> valor
+
+    def _chave(self, valores):
+        if len(valores) != len(self.rotulos):
+            raise ValueError(f"A métrica '{self.nome}' espera os rótulos {self.rotulos}.")
+        return tuple(str(v) for v in valores)
+
+    def descrever(self):
+        return {"tipo": self.tipo, "ajuda": self.ajuda, "rotulos": list(self.rotulos),
+                "series": [[list(chave), valor] for chave, valor in self.series.items()]}
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def incrementar(self, *rotulos, valor=1):
+        chave = self._chave(rotulos)
+        with _lock:
+            self.series[chave] = self.series.get(chave, 0) + valor
+
+class Medidor(_Metrica):
+    tipo = 'gauge'
+
+    def definir(self, valor, *rotulos):
+        chave = self._chave(rotulos)
+        with _lock:
+            self.series[chave] = valor
+
+    def somar(self, valor, *rotulos):
+        chave = self._chave(rotulos)
+        with _lock:
+            self.series[chave] = self.series.get(chave, 0) + valor
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos, buckets):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, *rotulos):
+        # Série: [contagem por bucket (não cumulativa, último = +Inf), soma, total]
+        chave = self._chave(rotulos)
+        with _lock:
+            serie = self.series.get(chave)
+            if serie is None:
+                serie = self.series[chave] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            indice = next((i for i, limite in enumerate(self.buckets) if valor <= limite), len(self.buckets))
+            serie[indice] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def descrever(self):
+        descricao = super().descrever()
+        descricao["buckets"] = list(self.buckets)
+        return descricao
+
+# --- Declaração ---
+def _registrar(classe, nome, *args):
+    nome = PREFIXO + nome
+    with _lock:
+        existente = _metricas.get(nome)
+        if existente is not None:
+            # A mesma métrica pode ser declarada por dois módulos (ex.: coletor e sandbox)
+            if type(existente) is not classe or existente.rotulos != tuple(args[1]):
+                raise ValueError(f"Métrica '{nome}' já declarada com outro tipo ou rótulos.")
+            return existente
+        metrica = _metricas[nome] = classe(nome, *args)
+        return metrica
+
+def contador(nome, ajuda, rotulos=()):
+    return _registrar(Contador, nome, ajuda, rotulos)
+
+def medidor(nome, ajuda, rotulos=()):
+    return _registrar(Medidor, nome, ajuda, rotulos)
+
+def histograma(nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA):
+    return _registrar(Histograma, nome, ajuda, rotulos, buckets)
+
+@contextmanager
+def cronometrar(histograma, *rotulos):
+    """Observa no histograma a duração (segundos) do bloco, mesmo se ele levantar exceção."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        histograma.observar(time.perf_counter() - inicio, *rotulos)
+
+# --- Publicação ---
+def identificar(processo):
+    """Nome do processo no arquivo publicado ('coletor', 'web')."""
+    global _processo
+    _processo = processo
+
+def _arquivo_do_processo():
+    return os.path.join(METRICAS_DIR, f"{_processo}-{os.getpid()}.json")
+
+def publicar(forcar=False):
+    global _ultima_publicacao
+    agora = time.monotonic()
+    if not forcar and agora - _ultima_publicacao < INTERVALO_PUBLICACAO: return
+    _ultima_publicacao = agora
+    with _lock:
+        snapshot = {nome: metrica.descrever() for nome, metrica in _metricas.items()}
+    caminho = _arquivo_do_processo()
+    # Escrita atômica: o leitor nunca vê um arquivo pela metade
+    caminho_temporario = f"{caminho}.tmp"
+    try:
+        os.makedirs(METRICAS_DIR, exist_ok=True)
+        with open(caminho_temporario, 'w') as f: json.dump(snapshot, f)
+        os.replace(caminho_temporario, caminho)
+    except IOError as e:
+        print(f"[ERRO AO PUBLICAR MÉTRICAS]: {e}")
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _ler_publicadas():
+    snapshots = []
+    try:
+        entradas = list(os.scandir(METRICAS_DIR))
+    except FileNotFoundError:
+        return snapshots
+    encerrados = []
+    for entrada in entradas:
+        if not entrada.name.endswith('.json'): continue
+        try:
+            pid = int(entrada.name[:-len('.json')].rsplit('-', 1)[1])
+        except (IndexError, ValueError):
+            continue
+        if not _processo_vivo(pid):
+            # Processo encerrado (worker reciclado, coletor reiniciado): vai para o acumulado
+            encerrados.append(entrada.path)
+            continue
+        try:
+            with open(entrada.path, 'r') as f: snapshots.append(json.load(f))
+        except (IOError, json.JSONDecodeError):
+            continue
+    acumulado = _incorporar_encerrados(encerrados) if encerrados else _ler_acumulado()
+    if acumulado: snapshots.append(acumulado)
+    return snapshots
+
+def _arquivo_acumulado():
+    return os.path.join(METRICAS_DIR, 'encerrados.json')
+
+def _ler_acumulado():
+    try:
+        with open(_arquivo_acumulado(), 'r') as f: return json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return {}
+
+def _incorporar_encerrados(caminhos):
+    """
+    Soma os contadores e histogramas dos processos encerrados ao acumulado e remove os arquivos
+    deles. O flock garante que dois workers não incorporem o mesmo arquivo duas vezes.
+    """
+    try:
+        with open(os.path.join(METRICAS_DIR, 'encerrados.lock'), 'a') as trava:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+            snapshots = [_ler_acumulado()]
+            incorporados = []
+            for caminho in caminhos:
+                try:
+                    with open(caminho, 'r') as f: snapshot = json.load(f)
+                except FileNotFoundError:
+                    continue # outro worker já incorporou
+                except (IOError, json.JSONDecodeError):
+                    snapshot = {}
+                snapshots.append({nome: metrica for nome, metrica in snapshot.items() if metrica["tipo"] != 'gauge'})
+                incorporados.append(caminho)
+            if not incorporados: return snapshots[0]
+            acumulado = {nome: {**metrica, "series": [[list(chave), valor] for chave, valor in metrica["series"].items()]}
+                         for nome, metrica in _somar(snapshots).items()}
+            caminho_temporario = f"{_arquivo_acumulado()}.tmp"
+            with open(caminho_temporario, 'w') as f: json.dump(acumulado, f)
+            os.replace(caminho_temporario, _arquivo_acumulado())
+            for caminho in incorporados:
+                try:
+                    os.remove(caminho)
+                except OSError: pass
+            return acumulado
+    except IOError as e:
+        print(f"[ERRO AO ACUMULAR MÉTRICAS]: {e}")
+        return _ler_acumulado()
+
+def _somar(snapshots):
+    combinadas = {}
+    for snapshot in snapshots:
+        for nome, metrica in snapshot.items():
+            destino = combinadas.setdefault(nome, {**metrica, "series": {}})
+            if destino["tipo"] != metrica["tipo"] or destino.get("buckets") != metrica.get("buckets"):
+                continue # declarações incompatíveis entre versões do código: fica a primeira
+            for chave, valor in metrica["series"]:
+                chave = tuple(chave)
+                atual = destino["series"].get(chave)
+                if atual is None:
+                    destino["series"][chave] = list(valor) if isinstance(valor, list) else valor
+                elif isinstance(valor, list):
+                    destino["series"][chave] = [a + b for a, b in zip(atual, valor)]
+                else:
+                    destino["series"][chave] = atual + valor
+    return combinadas
+
+# --- Exposição ---
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _rotulos(nomes, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+def _numero(valor):
+    if valor == float('inf'): return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+def _linhas(nome, metrica):
+    yield f"# HELP {nome} {_escapar(metrica['ajuda'])}"
+    yield f"# TYPE {nome} {metrica['tipo']}"
+    rotulos = metrica["rotulos"]
+    for chave, valor in sorted(metrica["series"].items()):
+        if metrica["tipo"] != 'histogram':
+            yield f"{nome}{_rotulos(rotulos, chave)} {_numero(valor)}"
+            continue
+        acumulado = 0
+        for limite, contagem in zip(list(metrica["buckets"]) + [float('inf')], valor[:-2]):
+            acumulado += contagem
+            yield f"{nome}_bucket{_rotulos(rotulos, chave, ('le', _numero(limite)))} {acumulado}"
+        yield f"{nome}_sum{_rotulos(rotulos, chave)} {_numero(valor[-2])}"
+        yield f"{nome}_count{_rotulos(rotulos, chave)} {valor[-1]}"
+
+def combinadas():
+    """Soma de todos os processos publicados (o atual é publicado antes): {nome: {tipo, rotulos, series}}."""
+    publicar(forcar=True)
+    return _somar(_ler_publicadas())
+
+def exposicao(extras=None):
+    """
+    Texto do Prometheus com a soma de todos os processos publicados.
+    extras: {nome: (tipo, ajuda, valor)} lidos no momento do scrape, já agregados na origem
+    (ex.: o cache de respostas, compartilhado entre os workers), que não entram na soma.
+    """
+    combinadas_agora = combinadas()
+    for nome, (tipo, ajuda, valor) in (extras or {}).items():
+        combinadas_agora[PREFIXO + nome] = {"tipo": tipo, "ajuda": ajuda, "rotulos": [], "series": {(): valor}}
+    linhas = []
+    for nome, metrica in combinadas_agora.items():
+        linhas.extend(_linhas(nome, metrica))
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,184 @@
+# partition_manager.py
+
+import glob
+import gzip
+import heapq
+import json
+import os
+from datetime import date, datetime, timedelta
+
+# 'resultados' e 'sinais' são particionadas por dia (RANGE na coluna de horário).
+# A retenção passa a ser remover a partição inteira do dia, em vez de DELETE linha a linha.
+# Antes de remover, a partição é exportada para um arquivo compacto (colunas em JSON + gzip),
+# que continua legível pela mesma interface de consulta (consultar()).
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_ATIVO = os.environ.get('ARQUIVO_PARTICOES', '1') != '0'
+ARQUIVO_DIR = os.environ.get('ARQUIVO_DIR', os.path.join(BASE_DIR, '..', 'archive'))
+
+# tabela lógica -> tabela particionada, coluna de particionamento, colunas arquivadas e retenção no banco.
+# 'sinais' é a view sobre 'sinais_alvos' + 'sinais_gatilhos' (ver compact_schema.py): as partições são
+# dos alvos, e o arquivo guarda as linhas já com os dados do gatilho.
+TABELAS = {
+    'resultados': {
+        'particionada': 'resultados',
+        'coluna_tempo': 'timestamp_iso',
+        'colunas': ['id', 'roll', 'color', 'timestamp_iso'],
+        'retencao': timedelta(hours=49),
+    },
+    'sinais': {
+        'particionada': 'sinais_alvos',
+        'coluna_tempo': 'target_timestamp',
+        'colunas': ['id', 'trigger_id', 'strategy_id', 'strategy_name', 'message', 'target_timestamp', 'status', 'telegram_message_id'],
+        'retencao': timedelta(hours=2),
+    },
+}
+DIAS_A_FRENTE = 3 # partições criadas com antecedência (alvos de sinais podem ser no dia seguinte)
+UM_DIA = timedelta(days=1)
+
+# --- Partições ---
+def _nome_particao(tabela, dia):
+    return f"{tabela}_p{dia:%Y%m%d}"
+
+def criar_particao(cursor, particionada, dia):
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {_nome_particao(particionada, dia)} PARTITION OF {particionada} FOR VALUES FROM (%s) TO (%s)",
+        (dia, dia + UM_DIA))
+
+def listar_particoes(cursor, particionada):
+    """Dias que têm partição no banco, em ordem."""
+    cursor.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = %s;
+    """, (particionada,))
+    prefixo = f"{particionada}_p"
+    dias = []
+    for linha in cursor.fetchall():
+        nome = linha['relname'] if isinstance(linha, dict) else linha[0]
+        if nome.startswith(prefixo):
+            dias.append(datetime.strptime(nome[len(prefixo):], "%Y%m%d").date())
+    return sorted(dias)
+
+def garantir_particoes(cursor, hoje=None):
+    """Cria as partições de hoje até DIAS_A_FRENTE dias à frente (idempotente)."""
+    hoje = hoje or date.today()
+    for config in TABELAS.values():
+        for deslocamento in range(DIAS_A_FRENTE + 1):
+            criar_particao(cursor, config['particionada'], hoje + timedelta(days=deslocamento))
+
+def aplicar_retencao(cursor, agora=None):
+    """
+    Remove as partições cujo dia inteiro já saiu da retenção da tabela, arquivando antes.
+    Retorna a lista de partições removidas.
+    """
+    agora = agora or datetime.now()
+    removidas = []
+    for tabela, config in TABELAS.items():
+        particionada = config['particionada']
+        limite = agora - config['retencao']
+        for dia in listar_particoes(cursor, particionada):
+            fim_do_dia = datetime.combine(dia + UM_DIA, datetime.min.time())
+            if fim_do_dia > limite: continue
+            particao = _nome_particao(particionada, dia)
+            if ARQUIVO_ATIVO:
+                arquivar_dia(cursor, tabela, dia)
+            cursor.execute(f"ALTER TABLE {particionada} DETACH PARTITION {particao}")
+            cursor.execute(f"DROP TABLE {particao}")
+            removidas.append(particao)
+    if any(particao.startswith('sinais_alvos_') for particao in removidas):
+        # Gatilhos cujos alvos saíram todos junto com as partições
+        cursor.execute("DELETE FROM sinais_gatilhos g WHERE NOT EXISTS (SELECT 1 FROM sinais_alvos a WHERE a.gatilho_id = g.id)")
+    return removidas
+
+# --- Arquivo ---
+def _caminho_arquivo(tabela, dia):
+    return os.path.join(ARQUIVO_DIR, tabela, f"{dia:%Y-%m-%d}.json.gz")
+
+def _serializar(valor):
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+def arquivar_dia(cursor, tabela, dia):
+    """Exporta as linhas do dia para <ARQUIVO_DIR>/<tabela>/<dia>.json.gz, em colunas."""
+    config = TABELAS[tabela]
+    colunas, coluna_tempo = config['colunas'], config['coluna_tempo']
+    cursor.execute(
+        f"SELECT {', '.join(colunas)} FROM {tabela} WHERE {coluna_tempo} >= %s AND {coluna_tempo} < %s ORDER BY {coluna_tempo}",
+        (dia, dia + UM_DIA))
+    linhas = [linha if isinstance(linha, dict) else dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+    caminho = _caminho_arquivo(tabela, dia)
+    if os.path.exists(caminho):
+        # Dia já arquivado que voltou ao banco (importação): junta com o arquivo, valendo a linha do banco para o mesmo id
+        no_banco = {linha['id'] for linha in linhas}
+        linhas = sorted([linha for linha in _ler_arquivo(tabela, dia) if linha['id'] not in no_banco] + linhas,
+                        key=lambda linha: linha[coluna_tempo])
+    dados = {
+        'tabela': tabela, 'dia': dia.isoformat(), 'total': len(linhas),
+        'colunas': {coluna: [_serializar(linha[coluna]) for linha in linhas] for coluna in colunas},
+    }
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    # Escrita atômica: um arquivo pela metade nunca substitui um arquivo completo
+    with gzip.open(f"{caminho}.tmp", 'wt', encoding='utf-8') as f:
+        json.dump(dados, f, separators=(',', ':'))
+    os.replace(f"{caminho}.tmp", caminho)
+    print(f"🗄️  {tabela} de {dia:%d/%m/%Y} arquivado ({len(linhas)} linhas).")
+
+def listar_arquivos(tabela):
+    dias = []
+    for caminho in glob.glob(os.path.join(ARQUIVO_DIR, tabela, '*.json.gz')):
+        try:
+            dias.append(datetime.strptime(os.path.basename(caminho)[:10], "%Y-%m-%d").date())
+        except ValueError:
+            continue
+    return sorted(dias)
+
+def _ler_arquivo(tabela, dia):
+    config = TABELAS[tabela]
+    with gzip.open(_caminho_arquivo(tabela, dia), 'rt', encoding='utf-8') as f:
+        dados = json.load(f)
+    colunas = dados['colunas']
+    nomes = list(colunas)
+    linhas = []
+    for valores in zip(*(colunas[nome] for nome in nomes)):
+        linha = dict(zip(nomes, valores))
+        linha[config['coluna_tempo']] = datetime.fromisoformat(linha[config['coluna_tempo']])
+        linhas.append(linha)
+    return linhas
+
+def ids_arquivados(tabela, dia):
+    """Ids das linhas do arquivo do dia (vazio se o dia não foi arquivado)."""
+    if not os.path.exists(_caminho_arquivo(tabela, dia)): return set()
+    return {linha['id'] for linha in _ler_arquivo(tabela, dia)}
+
+# --- Consulta Unificada ---
+def _linhas_arquivadas(tabela, dias, inicio, fim, ids_no_banco):
+    coluna_tempo = TABELAS[tabela]['coluna_tempo']
+    for dia in dias:
+        repetidos = ids_no_banco.get(dia, ())
+        for linha in _ler_arquivo(tabela, dia):
+            if inicio <= linha[coluna_tempo] < fim and linha['id'] not in repetidos: yield linha
+
+def consultar(cursor, tabela, inicio, fim):
+    """
+    Linhas de 'resultados' ou 'sinais' com horário em [inicio, fim), como dicionários e em ordem
+    cronológica, juntando os dias arquivados com o que ainda está no banco. Devolve um iterador:
+    os arquivos são lidos um dia por vez e, com um cursor nomeado, as linhas do banco vêm em lotes.
+    """
+    config = TABELAS[tabela]
+    coluna_tempo = config['coluna_tempo']
+    # Cursor à parte: um cursor nomeado só executa uma consulta
+    auxiliar = cursor.connection.cursor()
+    dias_no_banco = set(listar_particoes(auxiliar, config['particionada']))
+    dias = [dia for dia in listar_arquivos(tabela) if inicio.date() <= dia <= fim.date()]
+    # Dia com arquivo e partição (importado depois de arquivado): as linhas do banco valem para os ids repetidos
+    ids_no_banco = {}
+    for dia in dias:
+        if dia not in dias_no_banco: continue
+        auxiliar.execute(f"SELECT id FROM {tabela} WHERE {coluna_tempo} >= %s AND {coluna_tempo} < %s", (dia, dia + UM_DIA))
+        ids_no_banco[dia] = {linha['id'] if isinstance(linha, dict) else linha[0] for linha in auxiliar.fetchall()}
+    cursor.execute(
+        f"SELECT {', '.join(config['colunas'])} FROM {tabela} WHERE {coluna_tempo} >= %s AND {coluna_tempo} < %s ORDER BY {coluna_tempo}",
+        (inicio, fim))
+    no_banco = (dict(linha) for linha in cursor)
+    return heapq.merge(_linhas_arquivadas(tabela, dias, inicio, fim, ids_no_banco), no_banco, key=lambda linha: linha[coluna_tempo])
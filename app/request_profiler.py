@@ -0,0 +1,314 @@
+# request_profiler.py
+
+import fcntl
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, has_request_context, request
+
+import metricas
+
+# Profiling opcional das rotas do app web (PERFIL_ATIVO=1). Com ele ligado:
+#  - cada requisição mede o tempo total e o tempo gasto no banco (cursores da conexão de get_db),
+#    devolvidos no cabeçalho Server-Timing e somados por rota nas métricas (ver metricas.py);
+#  - consultas acima de PERFIL_CONSULTA_LENTA_MS vão para o log de consultas lentas, com o SQL,
+#    o formato dos parâmetros (tipos, nunca os valores) e a duração;
+#  - uma captura pode ser armada para uma rota: as próximas N requisições dela rodam com um
+#    profiler por amostragem (uma thread lê a pilha da requisição a cada PERFIL_INTERVALO_MS) e
+#    a saída fica em PERFIL_DIR/capturas, em texto e no formato 'folded' (flamegraph/speedscope).
+# O estado compartilhado (captura armada, log e capturas) fica em arquivos, então vale para todos
+# os workers do gunicorn. A leitura é pelas rotas /api/admin/perfil (ver app.py).
+PERFIL_ATIVO = os.environ.get('PERFIL_ATIVO', '0') == '1'
+LIMITE_CONSULTA_LENTA = float(os.environ.get('PERFIL_CONSULTA_LENTA_MS', 100)) / 1000
+INTERVALO_AMOSTRAGEM = float(os.environ.get('PERFIL_INTERVALO_MS', 5)) / 1000
+PERFIL_DIR = os.environ.get('PERFIL_DIR', os.path.join(tempfile.gettempdir(), 'monitor_blaze_perfil'))
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') # exigido no cabeçalho X-Admin-Token; sem ele, as rotas de admin respondem 403
+
+ARQUIVO_CAPTURA_ARMADA = os.path.join(PERFIL_DIR, 'captura.json')
+ARQUIVO_CONSULTAS_LENTAS = os.path.join(PERFIL_DIR, 'consultas_lentas.jsonl')
+PASTA_CAPTURAS = os.path.join(PERFIL_DIR, 'capturas')
+TAMANHO_MAXIMO_LOG = 5 * 1024 * 1024 # bytes; o log atual vira '.1' ao passar disso
+MAX_CAPTURAS = 20 # capturas guardadas; as mais antigas são apagadas
+MAX_REQUISICOES_POR_CAPTURA = 20
+TAMANHO_MAXIMO_SQL = 2000
+
+TEMPO_BANCO = metricas.histograma('http_requisicao_banco_segundos', 'Tempo em consultas ao banco por requisição (profiling).', ('rota',))
+CONSULTAS = metricas.histograma('http_consultas_por_requisicao', 'Consultas ao banco por requisição (profiling).', ('rota',),
+                                buckets=(1, 2, 5, 10, 20, 50, 100))
+
+_sequencia_capturas = itertools.count(1) # next() é atômico entre as threads do worker
+
+# --- Conexão e Cursor Medidos ---
+def _rota_atual():
+    return request.url_rule.rule if request.url_rule else request.path
+
+def _formato(parametros):
+    """Tipos dos parâmetros, sem os valores: ['int', 'datetime', 'list[3]']."""
+    def tipo(valor):
+        if isinstance(valor, (list, tuple)):
+            return f"{type(valor).__name__}[{len(valor)}]"
+        return type(valor).__name__
+    if parametros is None:
+        return None
+    if isinstance(parametros, dict):
+        return {chave: tipo(valor) for chave, valor in list(parametros.items())[:20]}
+    if isinstance(parametros, (list, tuple)):
+        return [tipo(valor) for valor in parametros[:20]]
+    return tipo(parametros)
+
+def _registrar_consulta(sql, parametros, duracao):
+    if not has_request_context(): return
+    perfil = g.get('perfil')
+    if perfil is not None:
+        perfil['banco'] += duracao
+        perfil['consultas'] += 1
+    if duracao < LIMITE_CONSULTA_LENTA: return
+    registro = {
+        "quando": datetime.now().isoformat(timespec='milliseconds'),
+        "rota": _rota_atual(),
+        "duracao_ms": round(duracao * 1000, 2),
+        "sql": " ".join(str(sql).split())[:TAMANHO_MAXIMO_SQL],
+        "parametros": _formato(parametros),
+        "pid": os.getpid(),
+    }
+    _anexar_consulta_lenta(registro)
+
+class _CursorMedido:
+    def __init__(self, cursor, conexao):
+        self._cursor = cursor
+        self.connection = conexao # cursores abertos a partir deste (ex.: _cursor_simples) também são medidos
+
+    def execute(self, sql, parametros=None):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, parametros) if parametros is not None else self._cursor.execute(sql)
+        finally:
+            _registrar_consulta(sql, parametros, time.perf_counter() - inicio)
+
+    def executemany(self, sql, lista_parametros):
+        lista_parametros = list(lista_parametros)
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, lista_parametros)
+        finally:
+            _registrar_consulta(sql, lista_parametros[0] if lista_parametros else None, time.perf_counter() - inicio)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return self._cursor.__exit__(*erro)
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+class _ConexaoMedida:
+    def __init__(self, conexao):
+        self._conexao = conexao
+
+    def cursor(self, *args, **kwargs):
+        return _CursorMedido(self._conexao.cursor(*args, **kwargs), self)
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao, nome)
+
+def envolver(conexao):
+    """Conexão cujos cursores somam o tempo de banco na requisição atual (sem profiling, a própria conexão)."""
+    return _ConexaoMedida(conexao) if PERFIL_ATIVO else conexao
+
+# --- Log de Consultas Lentas ---
+def _anexar_consulta_lenta(registro):
+    try:
+        os.makedirs(PERFIL_DIR, exist_ok=True)
+        if os.path.exists(ARQUIVO_CONSULTAS_LENTAS) and os.path.getsize(ARQUIVO_CONSULTAS_LENTAS) > TAMANHO_MAXIMO_LOG:
+            os.replace(ARQUIVO_CONSULTAS_LENTAS, f"{ARQUIVO_CONSULTAS_LENTAS}.1")
+        # Uma linha por write() em modo append: linhas de workers diferentes não se misturam
+        with open(ARQUIVO_CONSULTAS_LENTAS, 'a') as f:
+            f.write(json.dumps(registro, default=str) + "\n")
+    except OSError as e:
+        print(f"[ERRO NO LOG DE CONSULTAS LENTAS]: {e}")
+
+def consultas_lentas(limite=100, rota=None):
+    """As consultas lentas mais recentes primeiro, opcionalmente de uma rota."""
+    try:
+        with open(ARQUIVO_CONSULTAS_LENTAS, 'r') as f:
+            linhas = f.readlines()
+    except FileNotFoundError:
+        return []
+    registros = []
+    for linha in reversed(linhas):
+        try:
+            registro = json.loads(linha)
+        except json.JSONDecodeError:
+            continue
+        if rota and registro.get('rota') != rota: continue
+        registros.append(registro)
+        if len(registros) >= limite: break
+    return registros
+
+# --- Profiler por Amostragem ---
+class _Amostrador(threading.Thread):
+    def __init__(self, thread_alvo):
+        super().__init__(name='perfil-amostrador', daemon=True)
+        self.thread_alvo = thread_alvo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(INTERVALO_AMOSTRAGEM):
+            frame = sys._current_frames().get(self.thread_alvo)
+            pilha = []
+            while frame is not None:
+                codigo = frame.f_code
+                pilha.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if pilha:
+                self.pilhas[";".join(reversed(pilha))] += 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+def _reservar_captura(rota):
+    """Consome uma requisição da captura armada, se ela for para esta rota (com flock entre workers)."""
+    if not os.path.exists(ARQUIVO_CAPTURA_ARMADA): return False
+    try:
+        with open(ARQUIVO_CAPTURA_ARMADA, 'r+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                captura = json.load(f)
+            except json.JSONDecodeError:
+                return False
+            if captura.get('rota') != rota: return False
+            if captura['expira_em'] < time.time() or captura['restantes'] <= 0:
+                os.remove(ARQUIVO_CAPTURA_ARMADA)
+                return False
+            captura['restantes'] -= 1
+            # Regrava antes de remover: um worker esperando o flock no mesmo arquivo lê o saldo certo
+            f.seek(0); f.truncate(); json.dump(captura, f); f.flush()
+            if captura['restantes'] == 0:
+                os.remove(ARQUIVO_CAPTURA_ARMADA)
+            return True
+    except FileNotFoundError:
+        return False
+
+def armar_captura(rota, requisicoes=1, validade_segundos=600):
+    if requisicoes < 1 or requisicoes > MAX_REQUISICOES_POR_CAPTURA:
+        raise ValueError(f"'requisicoes' deve estar entre 1 e {MAX_REQUISICOES_POR_CAPTURA}.")
+    os.makedirs(PERFIL_DIR, exist_ok=True)
+    captura = {"rota": rota, "restantes": requisicoes, "expira_em": time.time() + validade_segundos,
+               "armada_em": datetime.now().isoformat(timespec='seconds')}
+    caminho_temporario = f"{ARQUIVO_CAPTURA_ARMADA}.tmp"
+    with open(caminho_temporario, 'w') as f: json.dump(captura, f)
+    os.replace(caminho_temporario, ARQUIVO_CAPTURA_ARMADA)
+    return captura
+
+def captura_armada():
+    try:
+        with open(ARQUIVO_CAPTURA_ARMADA, 'r') as f: captura = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return captura if captura.get('expira_em', 0) >= time.time() else None
+
+def _salvar_captura(amostrador, rota, duracao, perfil, status):
+    captura_id = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{next(_sequencia_capturas)}"
+    total = sum(amostrador.pilhas.values())
+    proprias, acumuladas = Counter(), Counter()
+    for pilha, contagem in amostrador.pilhas.items():
+        quadros = pilha.split(";")
+        proprias[quadros[-1]] += contagem
+        for quadro in set(quadros):
+            acumuladas[quadro] += contagem
+
+    linhas = [f"# Captura de {request.method} {rota} ({request.full_path.rstrip('?')}) -> {status}",
+              f"# {datetime.now().isoformat(timespec='seconds')}, pid {os.getpid()}",
+              f"# Tempo total: {duracao * 1000:.1f} ms; banco: {perfil['banco'] * 1000:.1f} ms em {perfil['consultas']} consulta(s)",
+              f"# {total} amostra(s) a cada {INTERVALO_AMOSTRAGEM * 1000:g} ms",
+              "#", "# Funções com mais amostras (próprias / acumuladas):"]
+    for quadro, contagem in proprias.most_common(25):
+        linhas.append(f"#   {contagem:5d} / {acumuladas[quadro]:5d}  {quadro}")
+    linhas += ["#", "# Pilhas no formato 'folded' (flamegraph.pl, speedscope):"]
+    linhas += [f"{pilha} {contagem}" for pilha, contagem in amostrador.pilhas.most_common()]
+    try:
+        os.makedirs(PASTA_CAPTURAS, exist_ok=True)
+        with open(os.path.join(PASTA_CAPTURAS, f"{captura_id}.txt"), 'w') as f:
+            f.write("\n".join(linhas) + "\n")
+        for antiga in listar_capturas()[MAX_CAPTURAS:]:
+            os.remove(os.path.join(PASTA_CAPTURAS, f"{antiga}.txt"))
+    except OSError as e:
+        print(f"[ERRO AO SALVAR CAPTURA DE PERFIL]: {e}")
+
+def listar_capturas():
+    """Ids das capturas salvas, da mais recente para a mais antiga."""
+    try:
+        nomes = [e.name[:-len('.txt')] for e in os.scandir(PASTA_CAPTURAS) if e.name.endswith('.txt')]
+    except FileNotFoundError:
+        return []
+    return sorted(nomes, key=lambda nome: os.path.getmtime(os.path.join(PASTA_CAPTURAS, f"{nome}.txt")), reverse=True)
+
+def ler_captura(captura_id):
+    if os.path.basename(captura_id) != captura_id: return None
+    try:
+        with open(os.path.join(PASTA_CAPTURAS, f"{captura_id}.txt"), 'r') as f: return f.read()
+    except FileNotFoundError:
+        return None
+
+# --- Ganchos do Flask ---
+def iniciar():
+    g.perfil = {'inicio': time.perf_counter(), 'banco': 0.0, 'consultas': 0, 'amostrador': None}
+    if request.url_rule and _reservar_captura(request.url_rule.rule):
+        amostrador = _Amostrador(threading.get_ident())
+        amostrador.start()
+        g.perfil['amostrador'] = amostrador
+
+def finalizar(resposta):
+    perfil = g.pop('perfil', None)
+    if perfil is None: return resposta
+    duracao = time.perf_counter() - perfil['inicio']
+    rota = _rota_atual()
+    if request.url_rule:
+        TEMPO_BANCO.observar(perfil['banco'], rota)
+        CONSULTAS.observar(perfil['consultas'], rota)
+    resposta.headers['Server-Timing'] = f"total;dur={duracao * 1000:.1f}, db;dur={perfil['banco'] * 1000:.1f}"
+    if perfil['amostrador']:
+        perfil['amostrador'].parar()
+        _salvar_captura(perfil['amostrador'], rota, duracao, perfil, resposta.status_code)
+    return resposta
+
+# --- Resumo ---
+def resumo_por_rota():
+    """Requisições, tempo total e parcela do banco por rota (todos os workers), da mais cara para a mais barata."""
+    combinadas = metricas.combinadas()
+    def somar_por_rota(nome):
+        por_rota = {}
+        for chave, serie in combinadas.get(metricas.PREFIXO + nome, {}).get("series", {}).items():
+            soma, total = por_rota.get(chave[0], (0.0, 0))
+            por_rota[chave[0]] = (soma + serie[-2], total + serie[-1])
+        return por_rota
+    requisicoes = somar_por_rota('http_requisicao_segundos')
+    banco = somar_por_rota('http_requisicao_banco_segundos')
+    consultas = somar_por_rota('http_consultas_por_requisicao')
+
+    rotas = []
+    for rota, (tempo_total, quantidade) in requisicoes.items():
+        tempo_banco, medidas = banco.get(rota, (0.0, 0))
+        total_consultas, _ = consultas.get(rota, (0, 0))
+        rotas.append({
+            "rota": rota,
+            "requisicoes": quantidade,
+            "tempo_total_s": round(tempo_total, 3),
+            "tempo_medio_ms": round(tempo_total / quantidade * 1000, 2) if quantidade else None,
+            "banco_medio_ms": round(tempo_banco / medidas * 1000, 2) if medidas else None,
+            "consultas_por_requisicao": round(total_consultas / medidas, 1) if medidas else None,
+        })
+    return sorted(rotas, key=lambda r: r["tempo_total_s"], reverse=True)
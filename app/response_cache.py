@@ -0,0 +1,169 @@
+# response_cache.py
+
+import atexit
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from flask import request, make_response
+
+# Cache das respostas das rotas somente-leitura, compartilhado entre os workers do gunicorn.
+# O armazenamento é um arquivo SQLite local (WAL), visível para todos os processos da máquina.
+# A chave inclui as versões de 'resultados' e 'sinais' (contadores mantidos por trigger no
+# Postgres), a versão dos arquivos de configuração (mtimes) e o minuto atual, pois a grade e
+# os sinais também dependem do relógio. Qualquer mudança gera uma chave nova; entradas antigas
+# simplesmente expiram. As versões são consultadas no máximo uma vez por VALIDADE_VERSOES em
+# cada processo, e os contadores de acertos/falhas são somados em memória e gravados no
+# SQLite a cada INTERVALO_METRICAS: um acerto não abre conexão com o banco nem escreve no disco.
+CACHE_ATIVO = os.environ.get('RESPONSE_CACHE', '1') != '0'
+CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH', os.path.join('/tmp', 'monitor_blaze_response_cache.db'))
+TEMPO_DE_VIDA = 120 # segundos; nenhuma chave continua válida depois da virada do minuto
+INTERVALO_LIMPEZA = 60
+VALIDADE_VERSOES = 1 # segundos que uma leitura das versões (banco e configuração) continua valendo
+INTERVALO_METRICAS = 5 # segundos entre gravações dos contadores de cada processo
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STRATEGIES_DIR = os.path.join(BASE_DIR, '..', 'strategies')
+
+_conexao = None
+_conexao_pid = None
+_ultima_limpeza = 0
+_lock = threading.Lock()
+_versoes = (None, 0) # (versões, momento da leitura)
+_metricas_pendentes = {}
+_ultima_gravacao_metricas = 0
+
+def _obter_conexao():
+    # Uma conexão por processo: o gunicorn faz fork depois de importar o app
+    global _conexao, _conexao_pid
+    if _conexao is None or _conexao_pid != os.getpid():
+        _conexao = sqlite3.connect(CACHE_PATH, timeout=1, isolation_level=None, check_same_thread=False)
+        _conexao.execute("PRAGMA journal_mode=WAL")
+        _conexao.execute("PRAGMA synchronous=OFF")
+        _conexao.execute("CREATE TABLE IF NOT EXISTS respostas (chave TEXT PRIMARY KEY, etag TEXT, corpo BLOB, criado_em REAL)")
+        _conexao.execute("CREATE TABLE IF NOT EXISTS metricas (nome TEXT PRIMARY KEY, valor INTEGER)")
+        _conexao_pid = os.getpid()
+    return _conexao
+
+def versao_da_configuracao():
+    """Assinatura dos arquivos JSON de configuração/estado publicados na pasta strategies."""
+    try:
+        arquivos = sorted((e.name, e.stat().st_mtime_ns) for e in os.scandir(STRATEGIES_DIR) if e.name.endswith('.json'))
+    except OSError:
+        return ''
+    return hashlib.sha1(repr(arquivos).encode()).hexdigest()
+
+def _versoes_atuais(obter_versoes_dos_dados):
+    global _versoes
+    versoes, lidas_em = _versoes
+    agora = time.monotonic()
+    if versoes is None or agora - lidas_em >= VALIDADE_VERSOES:
+        versoes = (obter_versoes_dos_dados(), versao_da_configuracao())
+        _versoes = (versoes, agora)
+    return versoes
+
+def _somar_metricas(**valores):
+    with _lock:
+        for nome, valor in valores.items():
+            _metricas_pendentes[nome] = _metricas_pendentes.get(nome, 0) + valor
+    if time.monotonic() - _ultima_gravacao_metricas >= INTERVALO_METRICAS:
+        _gravar_metricas()
+
+def _gravar_metricas():
+    global _ultima_gravacao_metricas
+    with _lock:
+        pendentes = list(_metricas_pendentes.items())
+        _metricas_pendentes.clear()
+        _ultima_gravacao_metricas = time.monotonic()
+    if not pendentes: return
+    try:
+        _obter_conexao().executemany(
+            "INSERT INTO metricas (nome, valor) VALUES (?, ?) ON CONFLICT (nome) DO UPDATE SET valor = valor + excluded.valor",
+            pendentes)
+    except sqlite3.Error as e:
+        print(f"[ERRO NAS MÉTRICAS DO CACHE]: {e}")
+
+atexit.register(_gravar_metricas)
+
+def _limpar_expiradas(conexao):
+    global _ultima_limpeza
+    agora = time.time()
+    if agora - _ultima_limpeza < INTERVALO_LIMPEZA: return
+    _ultima_limpeza = agora
+    conexao.execute("DELETE FROM respostas WHERE criado_em < ?", (agora - TEMPO_DE_VIDA,))
+
+def _resposta(corpo, etag):
+    # A ETag pode voltar com o sufixo da compressão (ex.: "abc-gzip", ver wire_format.py)
+    enviada = next((tag for tag in request.if_none_match.as_set() if tag.split('-', 1)[0] == etag), None)
+    if enviada:
+        resposta = make_response('', 304)
+        resposta.set_etag(enviada)
+        return resposta
+    resposta = make_response(corpo)
+    resposta.mimetype = 'application/json'
+    resposta.set_etag(etag)
+    return resposta
+
+def cacheado(obter_versoes_dos_dados):
+    """
+    Decorador para rotas GET que retornam JSON. obter_versoes_dos_dados() deve devolver
+    algo que mude sempre que os dados do banco mudarem (aqui, as versões de resultados/sinais).
+    """
+    def decorador(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not CACHE_ATIVO:
+                return view(*args, **kwargs)
+            try:
+                partes = (request.path, sorted(request.args.items(multi=True)), _versoes_atuais(obter_versoes_dos_dados),
+                          datetime.now().strftime('%Y%m%d%H%M'))
+                chave = hashlib.sha1(repr(partes).encode()).hexdigest()
+                conexao = _obter_conexao()
+                linha = conexao.execute("SELECT etag, corpo FROM respostas WHERE chave = ?", (chave,)).fetchone()
+            except Exception as e:
+                print(f"[ERRO NO CACHE DE RESPOSTAS]: {e}")
+                return view(*args, **kwargs)
+
+            if linha:
+                etag, corpo = linha
+                resposta = _resposta(corpo, etag)
+                _somar_metricas(acertos=1, bytes_servidos=len(corpo) if resposta.status_code == 200 else 0)
+                return resposta
+
+            resultado = make_response(view(*args, **kwargs))
+            if resultado.status_code != 200 or resultado.mimetype != 'application/json':
+                return resultado
+            corpo = resultado.get_data()
+            etag = hashlib.sha256(corpo).hexdigest()[:32]
+            try:
+                conexao.execute("INSERT OR REPLACE INTO respostas (chave, etag, corpo, criado_em) VALUES (?, ?, ?, ?)",
+                                (chave, etag, corpo, time.time()))
+                _somar_metricas(falhas=1, bytes_armazenados=len(corpo), bytes_servidos=len(corpo))
+                _limpar_expiradas(conexao)
+            except sqlite3.Error as e:
+                print(f"[ERRO NO CACHE DE RESPOSTAS]: {e}")
+            return _resposta(corpo, etag)
+        return wrapper
+    return decorador
+
+def metricas():
+    """Totais de todos os workers (os contadores ainda em memória nos outros processos entram na próxima gravação deles)."""
+    _gravar_metricas()
+    conexao = _obter_conexao()
+    valores = dict(conexao.execute("SELECT nome, valor FROM metricas").fetchall())
+    entradas, bytes_em_cache = conexao.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(corpo)), 0) FROM respostas").fetchone()
+    acertos, falhas = valores.get('acertos', 0), valores.get('falhas', 0)
+    return {
+        "ativo": CACHE_ATIVO,
+        "acertos": acertos,
+        "falhas": falhas,
+        "taxa_acerto": round(acertos / (acertos + falhas) * 100, 1) if acertos + falhas else None,
+        "bytes_servidos": valores.get('bytes_servidos', 0),
+        "bytes_armazenados": valores.get('bytes_armazenados', 0),
+        "entradas": entradas,
+        "bytes_em_cache": bytes_em_cache,
+    }
@@ -0,0 +1,395 @@
+# rollups.py
+
+from datetime import datetime, timedelta
+
+from psycopg2 import extras
+
+# Tabelas pré-agregadas para a página de estatísticas. São atualizadas pelo coletor a cada
+# resultado inserido e não passam pela retenção de 49h de 'resultados', então permitem
+# consultar semanas ou meses com o mesmo custo.
+#   rollup_cores_hora:         contagem de cada cor por hora
+#   rollup_brancos_minuto:     contagem de Brancos por dia e minuto (00-59)
+#   rollup_intervalos_brancos: histograma de intervalos (min) entre Brancos, pela hora do Branco
+#   rollup_sequencias:         n-gramas de 1 a 8 cores e a cor que veio logo depois, por hora
+#   rollup_desfechos:          acertos/erros de cada estratégia em blocos de 5 min do horário alvo
+
+CORES = ["Preto", "Vermelho", "Branco"]
+
+# As sequências são gravadas como texto compacto: ['Preto', 'Branco'] -> 'PB'
+CODIGOS_CORES = {"Preto": "P", "Vermelho": "V", "Branco": "B"}
+CORES_POR_CODIGO = {codigo: cor for cor, codigo in CODIGOS_CORES.items()}
+TAMANHO_MAXIMO_SEQUENCIA = 8
+
+# Desfechos dos sinais: blocos de 5 minutos e janelas expostas na API
+MINUTOS_POR_BLOCO = 5
+JANELAS_ACERTO = {"1h": timedelta(hours=1), "6h": timedelta(hours=6), "24h": timedelta(hours=24)}
+
+def bloco_de_desfecho(momento):
+    return momento.replace(minute=momento.minute - momento.minute % MINUTOS_POR_BLOCO, second=0, microsecond=0)
+
+def ngramas_da_sequencia(cores_anteriores, proxima):
+    """(tamanho, sequência, próxima cor) para cada sufixo das cores anteriores (em ordem cronológica)."""
+    codigos = [CODIGOS_CORES.get(cor) for cor in cores_anteriores[-TAMANHO_MAXIMO_SEQUENCIA:]]
+    ngramas = []
+    for tamanho in range(1, len(codigos) + 1):
+        sufixo = codigos[-tamanho:]
+        if None in sufixo: break
+        ngramas.append((tamanho, ''.join(sufixo), proxima))
+    return ngramas
+
+# --- Atualização Incremental (coletor) ---
+def registrar_resultado(cursor, game_id):
+    """
+    Soma o resultado recém-inserido nos rollups. Os valores são lidos da própria linha em
+    'resultados', então hora/minuto batem exatamente com o timestamp gravado.
+    Deve ser chamada na mesma transação do INSERT, apenas quando a linha for nova.
+    """
+    cursor.execute("""
+        INSERT INTO rollup_cores_hora (hora, color, total)
+        SELECT date_trunc('hour', timestamp_iso), color, 1 FROM resultados WHERE id = %s
+        ON CONFLICT (hora, color) DO UPDATE SET total = rollup_cores_hora.total + 1;
+    """, (game_id,))
+    cursor.execute("""
+        INSERT INTO rollup_brancos_minuto (dia, minuto, total)
+        SELECT timestamp_iso::date, EXTRACT(MINUTE FROM timestamp_iso), 1
+        FROM resultados WHERE id = %s AND color = 'Branco'
+        ON CONFLICT (dia, minuto) DO UPDATE SET total = rollup_brancos_minuto.total + 1;
+    """, (game_id,))
+    cursor.execute("""
+        INSERT INTO rollup_intervalos_brancos (hora, minutos, total)
+        SELECT date_trunc('hour', atual.timestamp_iso),
+               ROUND((EXTRACT(EPOCH FROM atual.timestamp_iso - anterior.timestamp_iso) / 60)::double precision), 1
+        FROM resultados atual
+        JOIN LATERAL (
+            SELECT timestamp_iso FROM resultados
+            WHERE color = 'Branco' AND timestamp_iso < atual.timestamp_iso
+            ORDER BY timestamp_iso DESC LIMIT 1
+        ) anterior ON TRUE
+        WHERE atual.id = %s AND atual.color = 'Branco'
+        ON CONFLICT (hora, minutos) DO UPDATE SET total = rollup_intervalos_brancos.total + 1;
+    """, (game_id,))
+    _registrar_sequencias(cursor, game_id)
+
+def _registrar_sequencias(cursor, game_id):
+    cursor.execute("""
+        SELECT anteriores.color, date_trunc('hour', atual.timestamp_iso) AS hora, atual.color AS proxima
+        FROM resultados atual
+        LEFT JOIN LATERAL (
+            SELECT color, timestamp_iso FROM resultados
+            WHERE timestamp_iso < atual.timestamp_iso
+            ORDER BY timestamp_iso DESC LIMIT %s
+        ) anteriores ON TRUE
+        WHERE atual.id = %s
+        ORDER BY anteriores.timestamp_iso ASC;
+    """, (TAMANHO_MAXIMO_SEQUENCIA, game_id))
+    linhas = cursor.fetchall()
+    if not linhas or linhas[0][2] not in CODIGOS_CORES: return
+    hora, proxima = linhas[0][1], linhas[0][2]
+    ngramas = ngramas_da_sequencia([linha[0] for linha in linhas if linha[0] is not None], proxima)
+    if not ngramas: return
+    extras.execute_values(cursor, """
+        INSERT INTO rollup_sequencias (hora, tamanho, sequencia, proxima, total) VALUES %s
+        ON CONFLICT (hora, tamanho, sequencia, proxima) DO UPDATE SET total = rollup_sequencias.total + 1;
+    """, [(hora, tamanho, sequencia, proxima_cor, 1) for tamanho, sequencia, proxima_cor in ngramas])
+
+def registrar_desfecho(cursor, strategy_id, target_timestamp, acerto):
+    """
+    Conta o acerto/erro de um alvo: contador geral e sequência atual em 'estrategia_stats'
+    (positiva = acertos seguidos, negativa = erros seguidos) e o bloco de 5 min em 'rollup_desfechos'.
+    Chamada na mesma transação que muda o status do alvo.
+    """
+    if acerto:
+        cursor.execute("""
+            UPDATE estrategia_stats SET
+                hits = hits + 1,
+                sequencia_atual = CASE WHEN sequencia_atual > 0 THEN sequencia_atual + 1 ELSE 1 END,
+                maior_sequencia_acertos = GREATEST(maior_sequencia_acertos, CASE WHEN sequencia_atual > 0 THEN sequencia_atual + 1 ELSE 1 END)
+            WHERE strategy_id = %s;
+        """, (strategy_id,))
+    else:
+        cursor.execute("""
+            UPDATE estrategia_stats SET
+                misses = misses + 1,
+                sequencia_atual = CASE WHEN sequencia_atual < 0 THEN sequencia_atual - 1 ELSE -1 END,
+                maior_sequencia_erros = GREATEST(maior_sequencia_erros, CASE WHEN sequencia_atual < 0 THEN 1 - sequencia_atual ELSE 1 END)
+            WHERE strategy_id = %s;
+        """, (strategy_id,))
+    cursor.execute("""
+        INSERT INTO rollup_desfechos (bloco, strategy_id, hits, misses) VALUES (%s, %s, %s, %s)
+        ON CONFLICT (bloco, strategy_id) DO UPDATE SET
+            hits = rollup_desfechos.hits + EXCLUDED.hits,
+            misses = rollup_desfechos.misses + EXCLUDED.misses;
+    """, (bloco_de_desfecho(target_timestamp), strategy_id, int(acerto), int(not acerto)))
+
+ROLLUPS_DE_GIROS = ('rollup_cores_hora', 'rollup_brancos_minuto', 'rollup_intervalos_brancos', 'rollup_sequencias')
+
+def reconstruir_rollups(cursor):
+    """Recalcula todos os rollups a partir de 'resultados' (correção manual)."""
+    for tabela in ROLLUPS_DE_GIROS:
+        cursor.execute(f"DELETE FROM {tabela}")
+    acumular_rollups(cursor)
+
+def acumular_rollups(cursor, origem='resultados', tabelas=ROLLUPS_DE_GIROS):
+    """
+    Soma nos rollups indicados os giros da tabela 'origem' (mesmas colunas de 'resultados'),
+    com ON CONFLICT ... total = total + EXCLUDED.total: o que já estava agregado é preservado.
+    Intervalos e sequências são calculados só entre as linhas de 'origem', em ordem cronológica.
+    """
+    if 'rollup_cores_hora' in tabelas:
+        cursor.execute(f"""
+            INSERT INTO rollup_cores_hora (hora, color, total)
+            SELECT date_trunc('hour', timestamp_iso), color, COUNT(*) FROM {origem} GROUP BY 1, 2
+            ON CONFLICT (hora, color) DO UPDATE SET total = rollup_cores_hora.total + EXCLUDED.total;
+        """)
+    if 'rollup_brancos_minuto' in tabelas:
+        cursor.execute(f"""
+            INSERT INTO rollup_brancos_minuto (dia, minuto, total)
+            SELECT timestamp_iso::date, EXTRACT(MINUTE FROM timestamp_iso), COUNT(*)
+            FROM {origem} WHERE color = 'Branco' GROUP BY 1, 2
+            ON CONFLICT (dia, minuto) DO UPDATE SET total = rollup_brancos_minuto.total + EXCLUDED.total;
+        """)
+    if 'rollup_intervalos_brancos' in tabelas:
+        cursor.execute(f"""
+            INSERT INTO rollup_intervalos_brancos (hora, minutos, total)
+            SELECT date_trunc('hour', ts), ROUND((EXTRACT(EPOCH FROM ts - anterior) / 60)::double precision), COUNT(*)
+            FROM (
+                SELECT timestamp_iso AS ts, LAG(timestamp_iso) OVER (ORDER BY timestamp_iso) AS anterior
+                FROM {origem} WHERE color = 'Branco'
+            ) brancos
+            WHERE anterior IS NOT NULL GROUP BY 1, 2
+            ON CONFLICT (hora, minutos) DO UPDATE SET total = rollup_intervalos_brancos.total + EXCLUDED.total;
+        """)
+    if 'rollup_sequencias' in tabelas:
+        _acumular_sequencias(cursor, origem)
+
+def _acumular_sequencias(cursor, origem):
+    # N-gramas: uma passada em ordem cronológica
+    cursor.execute(f"SELECT color, date_trunc('hour', timestamp_iso) AS hora FROM {origem} ORDER BY timestamp_iso ASC")
+    contagens = {}
+    anteriores = []
+    for color, hora in cursor.fetchall():
+        if color in CODIGOS_CORES:
+            for tamanho, sequencia, proxima in ngramas_da_sequencia(anteriores, color):
+                chave = (hora, tamanho, sequencia, proxima)
+                contagens[chave] = contagens.get(chave, 0) + 1
+        anteriores = (anteriores + [color])[-TAMANHO_MAXIMO_SEQUENCIA:]
+    if contagens:
+        extras.execute_values(cursor, """
+            INSERT INTO rollup_sequencias (hora, tamanho, sequencia, proxima, total) VALUES %s
+            ON CONFLICT (hora, tamanho, sequencia, proxima) DO UPDATE SET total = rollup_sequencias.total + EXCLUDED.total;
+        """, [chave + (total,) for chave, total in contagens.items()], page_size=1000)
+
+# --- Consultas (app web) ---
+def intervalo_de_datas(inicio_str, fim_str):
+    """
+    Converte 'YYYY-MM-DD' em [início, fim) com dias completos. Sem parâmetros, usa o dia de hoje.
+    Levanta ValueError para datas inválidas ou fim antes do início.
+    """
+    hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    inicio = datetime.strptime(inicio_str, "%Y-%m-%d") if inicio_str else hoje
+    fim = datetime.strptime(fim_str, "%Y-%m-%d") if fim_str else inicio
+    if fim < inicio:
+        raise ValueError("A data final deve ser igual ou posterior à data inicial.")
+    return inicio, fim + timedelta(days=1)
+
+def janela_de_consulta(args):
+    """
+    Janela das consultas de sequência: ?horas=N (últimas N horas) ou ?inicio=&fim= (dias completos).
+    Sem parâmetros, usa o dia de hoje.
+    """
+    horas = args.get('horas', type=int)
+    if horas is not None:
+        if horas < 1: raise ValueError("O parâmetro 'horas' deve ser maior que zero.")
+        agora = datetime.now()
+        return agora - timedelta(hours=horas), agora + timedelta(hours=1)
+    return intervalo_de_datas(args.get('inicio'), args.get('fim'))
+
+def cores_por_hora(cursor, inicio, fim):
+    cursor.execute("""
+        SELECT EXTRACT(HOUR FROM hora)::int AS h, color, SUM(total)::int AS total
+        FROM rollup_cores_hora WHERE hora >= %s AND hora < %s
+        GROUP BY 1, 2;
+    """, (inicio, fim))
+    return contagens_por_hora(cursor.fetchall())
+
+def contagens_por_hora(linhas):
+    """Contagem de cada cor por hora do dia ('00'-'23') a partir de (h, color, total)."""
+    hourly_counts = {f"{h:02d}": {cor: 0 for cor in CORES} for h in range(24)}
+    for row in linhas:
+        if row['color'] in hourly_counts[f"{row['h']:02d}"]:
+            hourly_counts[f"{row['h']:02d}"][row['color']] += row['total']
+    return hourly_counts
+
+def brancos_por_minuto(cursor, inicio, fim):
+    cursor.execute("""
+        SELECT minuto, SUM(total)::int AS total FROM rollup_brancos_minuto
+        WHERE dia >= %s AND dia < %s GROUP BY minuto;
+    """, (inicio.date(), fim.date()))
+    return contagens_por_minuto(cursor.fetchall())
+
+def contagens_por_minuto(linhas):
+    """Série do gráfico de Brancos por minuto (00-59) a partir de (minuto, total)."""
+    minute_counts = {row['minuto']: row['total'] for row in linhas}
+    return {"labels": [f"{m:02d}" for m in range(60)], "data": [minute_counts.get(m, 0) for m in range(60)]}
+
+def medias_intervalo(cursor, desde):
+    """
+    Média curta (metade inferior) e longa (metade superior) dos intervalos entre Brancos com os dois
+    Brancos a partir de 'desde' (a janela exata, como em estrategia_medias_intervalo), calculadas direto
+    do histograma, sem ordenar os intervalos um a um. As horas cheias vêm do rollup; o começo da
+    janela, até a primeira hora cheia, vem de 'resultados'.
+    """
+    hora_cheia = desde.replace(minute=0, second=0, microsecond=0)
+    if hora_cheia < desde: hora_cheia += timedelta(hours=1)
+    cursor.execute("""
+        SELECT minutos, SUM(total)::int AS total FROM rollup_intervalos_brancos
+        WHERE hora >= %s GROUP BY minutos;
+    """, (hora_cheia,))
+    histograma = {row['minutos']: row['total'] for row in cursor.fetchall()}
+
+    def branco(condicao, parametro, ordem):
+        cursor.execute(f"SELECT timestamp_iso FROM resultados WHERE color = 'Branco' AND {condicao} ORDER BY timestamp_iso {ordem} LIMIT 1", (parametro,))
+        linha = cursor.fetchone()
+        return linha['timestamp_iso'] if linha else None
+
+    cursor.execute("SELECT timestamp_iso FROM resultados WHERE color = 'Branco' AND timestamp_iso >= %s AND timestamp_iso < %s ORDER BY timestamp_iso ASC",
+                   (desde, hora_cheia))
+    iniciais = [row['timestamp_iso'] for row in cursor.fetchall()]
+    if iniciais:
+        anterior, primeiro = None, None
+    else:
+        anterior, primeiro = branco("timestamp_iso < %s", desde, "DESC"), branco("timestamp_iso >= %s", hora_cheia, "ASC")
+    return medias_do_histograma(sorted(ajustar_histograma_ao_inicio(histograma, iniciais, anterior, primeiro).items()))
+
+def ajustar_histograma_ao_inicio(histograma, iniciais, anterior, primeiro):
+    """
+    Leva o histograma das horas cheias ({minutos: total}) para a janela exata: soma os intervalos
+    entre os Brancos 'iniciais' (antes da primeira hora cheia) e, se não houver nenhum, tira o
+    intervalo do 'primeiro' Branco das horas cheias, cujo Branco 'anterior' ficou fora da janela.
+    """
+    histograma = dict(histograma)
+    for branco_anterior, branco_atual in zip(iniciais, iniciais[1:]):
+        minutos = round((branco_atual - branco_anterior).total_seconds() / 60)
+        histograma[minutos] = histograma.get(minutos, 0) + 1
+    if not iniciais and anterior is not None and primeiro is not None:
+        minutos = round((primeiro - anterior).total_seconds() / 60)
+        if histograma.get(minutos, 0) > 1:
+            histograma[minutos] -= 1
+        else:
+            histograma.pop(minutos, None)
+    return histograma
+
+def medias_do_histograma(histograma):
+    """Médias curta/longa a partir de (minutos, total) em ordem crescente de minutos."""
+    total_intervalos = sum(total for _, total in histograma)
+    default_response = {"media_curta": 0, "media_longa": 0, "total_intervalos": total_intervalos}
+    if total_intervalos < 4:
+        return default_response
+
+    midpoint = total_intervalos // 2
+    soma_inferior = soma_superior = 0
+    vistos = 0
+    for minutos, total in histograma:
+        na_metade_inferior = max(0, min(total, midpoint - vistos))
+        soma_inferior += minutos * na_metade_inferior
+        soma_superior += minutos * (total - na_metade_inferior)
+        vistos += total
+    return {
+        "media_curta": round(soma_inferior / midpoint, 1),
+        "media_longa": round(soma_superior / (total_intervalos - midpoint), 1),
+        "total_intervalos": total_intervalos
+    }
+
+def sequencias_antes_do_branco(cursor, tamanho, inicio, fim, limite=10, transicoes=False):
+    """
+    Top-k das sequências de 'tamanho' cores que antecederam um Branco na janela.
+    Com transicoes=True, inclui a probabilidade de cada cor vir logo após a sequência.
+    """
+    cursor.execute("""
+        SELECT sequencia,
+               SUM(total) FILTER (WHERE proxima = 'Branco')::int AS brancos,
+               SUM(total) FILTER (WHERE proxima = 'Preto')::int AS pretos,
+               SUM(total) FILTER (WHERE proxima = 'Vermelho')::int AS vermelhos,
+               SUM(total)::int AS ocorrencias
+        FROM rollup_sequencias
+        WHERE tamanho = %s AND hora >= date_trunc('hour', %s::timestamp) AND hora < %s
+        GROUP BY sequencia
+        HAVING SUM(total) FILTER (WHERE proxima = 'Branco') > 0
+        ORDER BY brancos DESC, sequencia ASC
+        LIMIT %s;
+    """, (tamanho, inicio, fim, limite))
+    return sequencias_das_linhas(cursor.fetchall(), transicoes)
+
+def sequencias_das_linhas(linhas, transicoes=False):
+    """Resposta de sequencias_antes_do_branco a partir de (sequencia, brancos, pretos, vermelhos, ocorrencias)."""
+    sequencias = []
+    for row in linhas:
+        item = {'sequence': [CORES_POR_CODIGO[codigo] for codigo in row['sequencia']], 'count': row['brancos']}
+        if transicoes:
+            ocorrencias = row['ocorrencias']
+            item['ocorrencias'] = ocorrencias
+            item['transicoes'] = {
+                "Preto": round((row['pretos'] or 0) / ocorrencias, 4),
+                "Vermelho": round((row['vermelhos'] or 0) / ocorrencias, 4),
+                "Branco": round(row['brancos'] / ocorrencias, 4),
+            }
+        sequencias.append(item)
+    return sequencias
+
+def _taxa(hits, misses):
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "taxa": round(hits / total * 100, 1) if total else None}
+
+def acertos_por_janela(cursor, mapping, agora=None):
+    """
+    Acertos/erros e taxa (%) nas janelas de JANELAS_ACERTO, por estratégia e por painel
+    (painel pelo mapeamento atual). Uma única consulta sobre no máximo 24h de blocos.
+    """
+    limites = limites_das_janelas(agora)
+    colunas = ", ".join(
+        f"COALESCE(SUM(hits) FILTER (WHERE bloco >= %(j{i})s), 0)::int AS hits_{i}, "
+        f"COALESCE(SUM(misses) FILTER (WHERE bloco >= %(j{i})s), 0)::int AS misses_{i}"
+        for i in range(len(limites)))
+    parametros = {f"j{i}": limite for i, limite in enumerate(limites.values())}
+    parametros['desde'] = min(limites.values())
+    cursor.execute(f"SELECT strategy_id, {colunas} FROM rollup_desfechos WHERE bloco >= %(desde)s GROUP BY strategy_id", parametros)
+    return acertos_das_linhas(cursor.fetchall(), limites, mapping)
+
+def limites_das_janelas(agora=None):
+    """Primeiro bloco de cada janela de JANELAS_ACERTO, na mesma ordem."""
+    agora = agora or datetime.now()
+    return {nome: bloco_de_desfecho(agora - duracao) for nome, duracao in JANELAS_ACERTO.items()}
+
+def acertos_das_linhas(linhas, limites, mapping):
+    """Resposta de acertos_por_janela a partir de (strategy_id, hits_i, misses_i) para cada janela i."""
+    resposta = {}
+    for i, nome in enumerate(limites):
+        estrategias = {}
+        paineis = {panel_id: [0, 0] for panel_id in ("1", "2", "3")}
+        for row in linhas:
+            hits, misses = row[f'hits_{i}'], row[f'misses_{i}']
+            if not hits and not misses: continue
+            estrategias[row['strategy_id']] = _taxa(hits, misses)
+            panel_id = mapping.get(row['strategy_id'])
+            if panel_id in paineis:
+                paineis[panel_id][0] += hits
+                paineis[panel_id][1] += misses
+        resposta[nome] = {
+            "estrategias": estrategias,
+            "paineis": {panel_id: _taxa(hits, misses) for panel_id, (hits, misses) in paineis.items()},
+        }
+    return resposta
+
+def sequencias_de_acertos(cursor, mapping):
+    """Sequência atual (positiva = acertos seguidos, negativa = erros) e recordes de cada estratégia."""
+    cursor.execute("SELECT strategy_id, strategy_name, sequencia_atual, maior_sequencia_acertos, maior_sequencia_erros FROM estrategia_stats")
+    return {
+        row['strategy_id']: {
+            "nome": row['strategy_name'],
+            "painel": mapping.get(row['strategy_id']),
+            "sequencia_atual": row['sequencia_atual'],
+            "maior_sequencia_acertos": row['maior_sequencia_acertos'],
+            "maior_sequencia_erros": row['maior_sequencia_erros'],
+        }
+        for row in cursor.fetchall()
+    }
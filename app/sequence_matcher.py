@@ -0,0 +1,148 @@
+# sequence_matcher.py
+
+import json
+import os
+from collections import deque
+
+import storage
+
+# --- Configuração de Caminhos ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STRATEGIES_DIR = os.path.join(BASE_DIR, '..', 'strategies')
+ARMED_SEQUENCES_FILE = os.path.join(STRATEGIES_DIR, 'armed_sequences.json')
+# Alertas de sequência ativos, publicados pelo coletor e lidos pelo app web
+SEQUENCE_ALERTS_STATE_FILE = os.path.join(STRATEGIES_DIR, 'sequence_alerts_state.json')
+
+# --- Autômato (Aho-Corasick) ---
+# Cada sequência armada gera dois padrões: a sequência completa (alerta visual) e a
+# sequência sem a última cor (alerta sonoro, um giro antes). O autômato é compilado em
+# uma tabela de transições completa, então cada novo resultado custa uma consulta de
+# dicionário, não importa quantas sequências estejam armadas nem o tamanho delas.
+_transicoes = [{}] # estado -> {cor: próximo estado}
+_saidas = [[]] # estado -> alertas ativos quando o histórico termina neste estado
+_estado = 0
+_tamanho_maximo = 0
+_mtime = None
+_alertas = []
+
+CORES = ("Preto", "Vermelho", "Branco")
+
+def sequencia_valida(sequencia):
+    """Uma sequência armada é uma lista não vazia só com nomes de cores."""
+    return isinstance(sequencia, list) and bool(sequencia) and all(isinstance(cor, str) and cor in CORES for cor in sequencia)
+
+def _alerta_visual(sequencia):
+    return {"id": f"visual-{'-'.join(map(str, sequencia))}", "status": "visual", "sequence": sequencia, "prediction": "Branco"}
+
+def _alerta_sonoro(sequencia):
+    return {"id": f"sound-{'-'.join(map(str, sequencia))}", "status": "sound", "sequence": sequencia}
+
+def compilar(armed_sequences):
+    """Monta o autômato a partir da lista de sequências armadas e volta ao estado inicial."""
+    global _transicoes, _saidas, _estado, _tamanho_maximo
+    filhos = [{}]
+    saidas = [[]]
+
+    def inserir(padrao, saida):
+        estado = 0
+        for cor in padrao:
+            if cor not in filhos[estado]:
+                filhos.append({})
+                saidas.append([])
+                filhos[estado][cor] = len(filhos) - 1
+            estado = filhos[estado][cor]
+        saidas[estado].append(saida)
+
+    tamanho_maximo = 0
+    for ordem, sequencia in enumerate(armed_sequences):
+        if not sequencia_valida(sequencia):
+            print(f"[AVISO] Sequência armada inválida ignorada: {sequencia!r}")
+            continue
+        tamanho_maximo = max(tamanho_maximo, len(sequencia))
+        # (ordem, tipo) mantém a mesma ordem de antes: visual e sonoro de cada sequência, na ordem em que foram armadas
+        inserir(sequencia, (ordem, 0, _alerta_visual(sequencia)))
+        if len(sequencia) > 1:
+            inserir(sequencia[:-1], (ordem, 1, _alerta_sonoro(sequencia[:-1])))
+
+    alfabeto = {cor for arestas in filhos for cor in arestas}
+    transicoes = [dict() for _ in filhos]
+    falha = [0] * len(filhos)
+    fila = deque()
+    for cor in alfabeto:
+        proximo = filhos[0].get(cor, 0)
+        transicoes[0][cor] = proximo
+        if proximo: fila.append(proximo)
+    while fila: # BFS: o estado de falha sempre é processado antes do próprio estado
+        estado = fila.popleft()
+        saidas[estado] = saidas[estado] + saidas[falha[estado]]
+        for cor in alfabeto:
+            if cor in filhos[estado]:
+                proximo = filhos[estado][cor]
+                falha[proximo] = transicoes[falha[estado]][cor]
+                transicoes[estado][cor] = proximo
+                fila.append(proximo)
+            else:
+                transicoes[estado][cor] = transicoes[falha[estado]][cor]
+
+    _transicoes = transicoes
+    _saidas = [[alerta for _, _, alerta in sorted(lista, key=lambda s: (s[0], s[1]))] for lista in saidas]
+    _estado = 0
+    _tamanho_maximo = tamanho_maximo
+
+def avancar(cor):
+    """Avança o autômato com o resultado mais recente e publica se o conjunto de alertas mudou."""
+    global _estado, _alertas
+    _estado = _transicoes[_estado].get(cor, 0)
+    if _saidas[_estado] != _alertas:
+        _alertas = _saidas[_estado]
+        _publicar()
+
+def alertas_ativos():
+    return _alertas
+
+def _publicar():
+    # Escrita atômica: o app web nunca lê um arquivo pela metade
+    caminho_temporario = f"{SEQUENCE_ALERTS_STATE_FILE}.tmp"
+    try:
+        with open(caminho_temporario, 'w') as f: json.dump(_alertas, f)
+        os.replace(caminho_temporario, SEQUENCE_ALERTS_STATE_FILE)
+    except IOError as e:
+        print(f"[ERRO AO PUBLICAR ALERTAS DE SEQUÊNCIA]: {e}")
+
+# --- Sincronização (chamada a cada ciclo do coletor) ---
+def atualizar(cursor):
+    """
+    Recompila quando armed_sequences.json muda (checagem por mtime) e reposiciona o
+    autômato com os últimos resultados do banco, para que a nova sequência valha na hora.
+    """
+    global _mtime, _estado, _alertas
+    try:
+        mtime = os.path.getmtime(ARMED_SEQUENCES_FILE)
+    except OSError:
+        mtime = None
+    if mtime == _mtime: return
+
+    armed_sequences = []
+    if mtime is not None:
+        try:
+            with open(ARMED_SEQUENCES_FILE, 'r') as f: armed_sequences = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"[ERRO AO LER SEQUÊNCIAS ARMADAS]: {e}")
+            _mtime = mtime
+            return
+    # Uma falha na compilação mantém o autômato anterior; o arquivo só é relido quando mudar de novo
+    try:
+        compilar(armed_sequences if isinstance(armed_sequences, list) else [])
+    except Exception as e:
+        print(f"[ERRO AO COMPILAR SEQUÊNCIAS ARMADAS]: {e}")
+        _mtime = mtime
+        return
+    _mtime = mtime
+
+    if _tamanho_maximo:
+        for row in reversed(storage.ultimos_resultados(cursor, _tamanho_maximo)):
+            _estado = _transicoes[_estado].get(row['color'], 0)
+    _alertas = _saidas[_estado]
+    _publicar()
+    validas = sum(1 for sequencia in armed_sequences if sequencia_valida(sequencia)) if isinstance(armed_sequences, list) else 0
+    print(f"🔔 {validas} sequência(s) armada(s) compilada(s) ({len(_transicoes)} estados).")
@@ -4,8 +4,8 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 import json
 import os
-import psycopg2 # Importar para PostgreSQL
-from psycopg2 import extras # Para usar RealDictCursor
+
+import storage
 
 # Adicione os caminhos dos arquivos de configuração aqui para que a lógica seja autossuficiente
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -35,6 +35,24 @@ def _load_activator_state():
 def _save_activator_state(state):
     _save_generic_config(ACTIVATOR_STATE_FILE, state)
 
+def contar_estrategias_por_painel(strategy_statuses, mapping):
+    """Quantidade de estratégias ativas em cada painel (base para a regra de confluência)."""
+    strategy_count_by_panel = defaultdict(int)
+    for strategy_id, is_active in strategy_statuses.items():
+        if not is_active: continue
+        panel_id = mapping.get(strategy_id)
+        if panel_id in ['1', '2', '3']:
+            strategy_count_by_panel[panel_id] += 1
+    return strategy_count_by_panel
+
+def confluencia_atingida(required_count, unique_strategies_count):
+    """Regra de confluência: todas as estratégias do painel (3+) ou pelo menos 2 quando o painel tem 2."""
+    if required_count >= 3 and unique_strategies_count == required_count:
+        return True
+    if required_count == 2 and unique_strategies_count >= 2:
+        return True
+    return False
+
 def process_and_filter_signals(cursor, strategy_statuses, mapping, confluence_modes, activator_modes):
     """
     Lógica unificada para processar, filtrar e formatar sinais.
@@ -47,14 +65,13 @@ def process_and_filter_signals(cursor, strategy_statuses, mapping, confluence_mo
         activation_dt = datetime.fromisoformat(last_activation_str) if last_activation_str else None
 
         # Usar o cursor passado para buscar o último resultado
-        cursor.execute("SELECT roll, timestamp_iso FROM resultados ORDER BY timestamp_iso DESC LIMIT 1")
-        last_result = cursor.fetchone()
+        last_result = storage.ultimo_resultado(cursor)
 
         if last_result:
-            last_roll_time = last_result['timestamp_iso'] # Já é datetime object
+            last_roll_time = last_result.timestamp_iso # Giro: horário e minuto já calculados
             # A ativação só ocorre se não houver uma ativação recente ou se o último resultado for mais novo que a última ativação
             if not activation_dt or last_roll_time > activation_dt:
-                soma = last_roll_time.minute + last_result['roll']
+                soma = last_result.minuto + last_result.roll
                 if soma % 10 == 0 or soma % 10 == 5:
                     activation_dt = last_roll_time
                     _save_activator_state({"last_activation_timestamp": activation_dt.isoformat()})
@@ -71,21 +88,8 @@ def process_and_filter_signals(cursor, strategy_statuses, mapping, confluence_mo
         if not active_strategy_ids:
             return [], is_window_active, window_end
 
-        # Usar %s para placeholders em psycopg2
-        placeholders = ','.join(['%s'] * len(active_strategy_ids))
-        
         two_minutes_ago = datetime.now() - timedelta(minutes=2)
-        query = f"""
-            SELECT id, strategy_id, strategy_name, message, target_timestamp, status
-            FROM sinais 
-            WHERE strategy_id IN ({placeholders})
-              AND (status = 'pending' OR (status = 'hit' AND target_timestamp >= %s))
-            ORDER BY target_timestamp ASC
-        """
-        params = active_strategy_ids + [two_minutes_ago]
-        cursor.execute(query, params)
-
-        all_signals = [dict(row) for row in cursor.fetchall()]
+        all_signals = [dict(row) for row in storage.sinais_para_exibicao(cursor, active_strategy_ids, two_minutes_ago)]
 
         signals_by_panel = defaultdict(list)
         for signal in all_signals:
@@ -93,11 +97,7 @@ def process_and_filter_signals(cursor, strategy_statuses, mapping, confluence_mo
             if panel_id and panel_id != 'none':
                 signals_by_panel[panel_id].append(signal)
         
-        strategy_count_by_panel = defaultdict(int)
-        for strategy_id in active_strategy_ids:
-            panel_id = mapping.get(strategy_id)
-            if panel_id in ['1', '2', '3']:
-                strategy_count_by_panel[panel_id] += 1
+        strategy_count_by_panel = contar_estrategias_por_painel(strategy_statuses, mapping)
 
         final_output = []
         for panel_id, signals in signals_by_panel.items():
@@ -122,13 +122,7 @@ def process_and_filter_signals(cursor, strategy_statuses, mapping, confluence_mo
                     required_count = strategy_count_by_panel.get(panel_id, 0)
                     unique_strategies_in_group = set(s['strategy_id'] for s in group)
                     
-                    trigger_condition_met = False
-                    if required_count >= 3 and len(unique_strategies_in_group) == required_count:
-                        trigger_condition_met = True
-                    elif required_count == 2 and len(unique_strategies_in_group) >= 2:
-                        trigger_condition_met = True
-                    
-                    if trigger_condition_met:
+                    if confluencia_atingida(required_count, len(unique_strategies_in_group)):
                         is_hit = any(s['status'] == 'hit' for s in group)
                         confluence_status = 'hit' if is_hit else 'pending'
                         final_output.append({
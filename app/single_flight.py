@@ -0,0 +1,36 @@
+# single_flight.py
+
+import threading
+
+# Coalescência de requisições ("single-flight") dentro de um worker do gunicorn:
+# enquanto uma chamada para uma chave está em andamento, as requisições concorrentes
+# com a mesma chave esperam e recebem o mesmo resultado, em vez de repetir o trabalho.
+# Só há requisições concorrentes no mesmo processo com workers em threads: o render.yaml
+# usa --worker-class gthread (com o worker 'sync' padrão, cada processo atende uma por vez).
+
+_lock = threading.Lock()
+_em_andamento = {} # chave -> {'concluido': Event, 'resultado', 'erro'}
+
+def executar(chave, funcao):
+    with _lock:
+        voo = _em_andamento.get(chave)
+        lider = voo is None
+        if lider:
+            voo = {'concluido': threading.Event(), 'resultado': None, 'erro': None}
+            _em_andamento[chave] = voo
+
+    if not lider:
+        voo['concluido'].wait()
+    else:
+        try:
+            voo['resultado'] = funcao()
+        except Exception as e:
+            voo['erro'] = e
+        finally:
+            with _lock:
+                _em_andamento.pop(chave, None)
+            voo['concluido'].set()
+
+    if voo['erro'] is not None:
+        raise voo['erro']
+    return voo['resultado']
@@ -9,6 +9,9 @@ document.addEventListener('DOMContentLoaded', () => {
     const sequenceFilterBtns = document.querySelectorAll('.filter-btn[data-length]');
     const hourlyStatsGrid = document.getElementById('hourly-stats-grid');
     const viewToggleButtons = document.getElementById('view-toggle-buttons');
+    const latencyTableContainer = document.getElementById('latency-table-container');
+    const latencyFlowButtons = document.getElementById('latency-flow-buttons');
+    const latencyPanelButtons = document.getElementById('latency-panel-buttons');
     
     // --- MAPAS E VARIÁVEIS GLOBAIS ---
     const colorClassMap = { 'Vermelho': 'text-color-Vermelho', 'Preto': 'text-color-Preto', 'Branco': 'text-color-Branco' };
@@ -17,6 +20,13 @@ document.addEventListener('DOMContentLoaded', () => {
     let armedSequences = [];
     let hourlyColorData = null;
     let currentViewMode = 'count';
+    let latencyData = null;
+    let currentLatencyFlow = 'sinal';
+    let currentLatencyPanel = 'geral';
+    const latencyStageLabels = {
+        'ingestao': 'Recebido pelo coletor', 'avaliacao': 'Estratégia avaliada', 'commit': 'Gravado no banco',
+        'enfileiramento': 'Enviado ao Telegram', 'telegram': 'Confirmado pelo Telegram'
+    };
 
     // --- FUNÇÕES DE FETCH (BUSCAR DADOS) ---
     async function fetchHourlyColorStats() {
@@ -45,6 +55,19 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    async function fetchLatency() {
+        if (!latencyTableContainer) return;
+        try {
+            const response = await fetch('/api/latencia');
+            if (!response.ok) throw new Error('Falha ao buscar latências.');
+            latencyData = await response.json();
+            renderLatency();
+        } catch (error) {
+            console.error(error);
+            latencyTableContainer.innerHTML = '<p class="no-data-message">Erro ao carregar latências.</p>';
+        }
+    }
+
     async function fetchSequences() {
         if (!sequenceListContainer) return;
         try {
@@ -177,6 +200,35 @@ document.addEventListener('DOMContentLoaded', () => {
             <div class="stat-card"><div class="stat-value">${data.media_longa.toFixed(1)} min</div><div class="stat-label">Média Longa</div></div>`;
     }
 
+    function renderLatency() {
+        if (!latencyTableContainer) return;
+        const panels = (latencyData && latencyData.fluxos && latencyData.fluxos[currentLatencyFlow]) || {};
+        if (!panels[currentLatencyPanel]) currentLatencyPanel = 'geral';
+
+        if (latencyPanelButtons) {
+            const panelIds = Object.keys(panels).filter(p => p !== 'geral').sort();
+            latencyPanelButtons.innerHTML = ['geral', ...panelIds].map(p =>
+                `<button class="filter-btn${p === currentLatencyPanel ? ' active' : ''}" data-panel="${p}">${p === 'geral' ? 'Geral' : `Painel ${p}`}</button>`
+            ).join('');
+        }
+
+        const stages = panels[currentLatencyPanel];
+        if (!stages) {
+            latencyTableContainer.innerHTML = '<p class="no-data-message">Nenhuma medição ainda.</p>';
+            return;
+        }
+        const seconds = value => `${value.toFixed(2)} s`;
+        const rows = (latencyData.etapas || []).filter(stage => stages[stage]).map(stage => {
+            const s = stages[stage];
+            return `<tr><td>${latencyStageLabels[stage] || stage}</td><td>${seconds(s.p50)}</td><td>${seconds(s.p90)}</td><td>${seconds(s.p99)}</td><td>${seconds(s.max)}</td><td>${s.amostras}</td></tr>`;
+        }).join('');
+        latencyTableContainer.innerHTML = `
+            <table class="latency-table">
+                <thead><tr><th>Etapa</th><th>p50</th><th>p90</th><th>p99</th><th>Máx.</th><th>Amostras</th></tr></thead>
+                <tbody>${rows}</tbody>
+            </table>`;
+    }
+
     function renderSequences(sequences) {
         if (!sequenceListContainer || !sequenceItemTemplate) return;
         sequenceListContainer.innerHTML = '';
@@ -277,6 +329,26 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    if (latencyFlowButtons) {
+        latencyFlowButtons.addEventListener('click', (e) => {
+            const clickedButton = e.target.closest('.filter-btn');
+            if (!clickedButton) return;
+            latencyFlowButtons.querySelectorAll('.filter-btn').forEach(btn => btn.classList.remove('active'));
+            clickedButton.classList.add('active');
+            currentLatencyFlow = clickedButton.dataset.flow;
+            renderLatency();
+        });
+    }
+
+    if (latencyPanelButtons) {
+        latencyPanelButtons.addEventListener('click', (e) => {
+            const clickedButton = e.target.closest('.filter-btn');
+            if (!clickedButton) return;
+            currentLatencyPanel = clickedButton.dataset.panel;
+            renderLatency();
+        });
+    }
+
     if (sequenceListContainer) {
         sequenceListContainer.addEventListener('change', (e) => {
             if (e.target.matches('input[type="checkbox"]')) {
@@ -293,6 +365,8 @@ document.addEventListener('DOMContentLoaded', () => {
         fetchIntervalAverages();
         fetchSequences();
         fetchAndRenderWhiteMinutesChart(); // ### ADICIONADO: Chama a função do gráfico ###
+        fetchLatency();
+        setInterval(fetchLatency, 30000); // O coletor republica a cada giro
     }
 
     initialize();
@@ -43,7 +43,6 @@ document.addEventListener('DOMContentLoaded', () => {
     // --- VARIÁVEIS GLOBAIS ---
     let isSoundEnabled = false, isAudioUnlocked = false;
     let currentLimit = 120;
-    let visibleIds = new Set();
     let selectedNumbers = new Set(JSON.parse(localStorage.getItem('selectedNumbers')) || []);
     let playedSoundAlerts = new Set();
     let playedSignalAlerts = new Set();
@@ -52,6 +51,64 @@ document.addEventListener('DOMContentLoaded', () => {
     const emojiMap = { 'Vermelho': '🔴', 'Preto': '⚫', 'Branco': '⚪️' };
     let whiteMinutesChart = null;
     let activatorCountdownInterval = null;
+
+    // --- DECODIFICAÇÃO DO FORMATO COMPACTO (?formato=compacto, ver app/wire_format.py) ---
+    // Colunas em vez de objetos, códigos no lugar de strings e horários como segundos a partir de 'base'.
+    // Os horários são relógio local do servidor codificados como UTC, por isso as funções getUTC*().
+    const COMPACT_COLORS = ['Branco', 'Vermelho', 'Preto'];
+    const COMPACT_SLOT_TYPES = ['result', 'placeholder'];
+    const COMPACT_SIGNAL_TYPES = ['individual', 'confluence'];
+    const COMPACT_STATUSES = ['pending', 'hit'];
+    const pad2 = (n) => String(n).padStart(2, '0');
+    const compactDate = (base, offset) => new Date((base + offset) * 1000);
+    const formatCompactTime = (date, withSeconds) => {
+        const time = `${pad2(date.getUTCHours())}:${pad2(date.getUTCMinutes())}`;
+        return withSeconds ? `${time}:${pad2(date.getUTCSeconds())}` : time;
+    };
+    const formatCompactIso = (date) => date.toISOString().slice(0, 19);
+
+    const decodeCompactGrid = (compact) => {
+        const rows = [];
+        let index = 0;
+        for (const rowLength of compact.linhas) {
+            const row = [];
+            for (let j = 0; j < rowLength; j++, index++) {
+                const date = compactDate(compact.base, compact.t[index]);
+                if (COMPACT_SLOT_TYPES[compact.tipo[index]] === 'placeholder') {
+                    row.push({ type: 'placeholder', time_short: formatCompactTime(date, false) });
+                } else {
+                    row.push({
+                        type: 'result', id: compact.id[index], roll: compact.roll[index], color: COMPACT_COLORS[compact.cor[index]],
+                        time_short: formatCompactTime(date, false), time_full: formatCompactTime(date, true)
+                    });
+                }
+            }
+            rows.push(row);
+        }
+        return rows;
+    };
+
+    const decodeCompactSignals = (data) => {
+        const compact = data.signals;
+        const text = (index) => (index === null ? undefined : compact.textos[index]);
+        const signals = compact.tipo.map((typeCode, i) => {
+            const target = formatCompactIso(compactDate(compact.base, compact.alvo[i]));
+            const statusCode = compact.status[i];
+            const status = typeof statusCode === 'number' ? COMPACT_STATUSES[statusCode] : statusCode;
+            if (COMPACT_SIGNAL_TYPES[typeCode] === 'confluence') {
+                return {
+                    type: 'confluence', panel_id: compact.painel[i], key: target, db_ids: compact.db_ids[i],
+                    target_timestamp: target, strategy_names: compact.nomes[i].map(text), count: compact.quantidade[i], status
+                };
+            }
+            return {
+                type: 'individual', panel_id: compact.painel[i], key: String(compact.db_ids[i][0]), db_ids: compact.db_ids[i],
+                strategy_id: text(compact.estrategia[i]), strategy_name: text(compact.nome[i]), message: text(compact.mensagem[i]),
+                target_timestamp: target, status
+            };
+        });
+        return { ...data, signals };
+    };
     
     // --- LÓGICA DE VISIBILIDADE DAS SEÇÕES ---
     const SECTIONS_TO_MANAGE = {
@@ -176,68 +233,165 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // --- FUNÇÕES DE RENDERIZAÇÃO ---
+    // Renderização incremental da grade: cada slot tem uma chave estável (id do resultado, ou
+    // minuto + posição para os slots vazios). A cada atualização só os slots novos são criados;
+    // os existentes são reaproveitados, movidos se preciso, e só têm as classes trocadas quando mudam.
+    // Linhas fora da tela ficam vazias com a altura reservada e são preenchidas ao entrar na viewport.
+    const slotElements = new Map(); // chave -> elemento do slot
+    const rowVisibility = new Map(); // índice da linha -> visível? (sem entrada = ainda não observada)
+    let latestGridRows = [];
+    let latestTargetsByMinute = new Map();
+    let previousResultIds = new Set();
+    let currentResultIds = new Set();
+    let estimatedRowHeight = 0;
+
+    const rowObserver = 'IntersectionObserver' in window ? new IntersectionObserver((entries) => {
+        entries.forEach(entry => {
+            const index = Number(entry.target.dataset.rowIndex);
+            rowVisibility.set(index, entry.isIntersecting);
+            patchRow(entry.target, index);
+        });
+    }, { rootMargin: '300px 0px' }) : null;
+
+    const slotClassName = (resultData) => {
+        const classes = ['result-slot'];
+        const targetPanels = latestTargetsByMinute.get(resultData.time_short);
+        if (targetPanels) {
+            if (targetPanels.size > 1) {
+                // Mais de um painel, aplica a classe de piscar
+                classes.push('multi-panel-target');
+            } else if (targetPanels.size === 1) {
+                // Apenas um painel, aplica a classe de cor específica
+                classes.push(`panel-${targetPanels.values().next().value}-target`);
+            }
+        }
+        if (resultData.type === 'placeholder') {
+            classes.push('placeholder');
+        } else if (selectedNumbers.has(String(resultData.roll))) {
+            classes.push('manual-selection');
+        }
+        return classes.join(' ');
+    };
+
+    const createSlotElement = (resultData, className) => {
+        const slotEl = document.createElement('div');
+        slotEl.className = className;
+        slotEl.dataset.key = resultData.key;
+        slotEl.dataset.classSignature = className;
+        const rollContainerEl = document.createElement('div');
+        rollContainerEl.className = 'roll-container';
+        const timeEl = document.createElement('div');
+        timeEl.className = 'result-time';
+
+        if (resultData.type === 'placeholder') {
+            timeEl.innerHTML = `<span class="time-short">${resultData.time_short}</span>`;
+        } else {
+            if (!previousResultIds.has(resultData.id)) {
+                // Só a primeira aparição anima: sem a classe, mover a linha ou reanexá-la ao voltar para a tela não repete o fadeIn
+                slotEl.classList.add('new-item-animation');
+                const encerrarAnimacao = () => slotEl.classList.remove('new-item-animation');
+                slotEl.addEventListener('animationend', encerrarAnimacao, { once: true });
+                slotEl.addEventListener('animationcancel', encerrarAnimacao, { once: true }); // removido da tela antes do fim
+            }
+            slotEl.dataset.id = resultData.id;
+            slotEl.dataset.roll = resultData.roll;
+            rollContainerEl.classList.add(colorClassMap[resultData.color] || '');
+            rollContainerEl.textContent = resultData.roll;
+            timeEl.innerHTML = `<span class="time-short">${resultData.time_short}</span><span class="time-full">${resultData.time_full}</span>`;
+        }
+        slotEl.appendChild(rollContainerEl);
+        slotEl.appendChild(timeEl);
+        return slotEl;
+    };
+
+    const patchRow = (rowEl, index) => {
+        const resultsInRow = latestGridRows[index] || [];
+        if (rowVisibility.get(index) === false) {
+            // Fora da tela: devolve os slots (continuam no mapa) e mantém a altura da linha
+            if (rowEl.childElementCount) {
+                rowEl.style.minHeight = `${rowEl.offsetHeight || estimatedRowHeight}px`;
+                rowEl.replaceChildren();
+            } else if (!rowEl.style.minHeight && estimatedRowHeight) {
+                rowEl.style.minHeight = `${estimatedRowHeight}px`;
+            }
+            return;
+        }
+        rowEl.style.minHeight = '';
+        resultsInRow.forEach((resultData, position) => {
+            const className = slotClassName(resultData);
+            let slotEl = slotElements.get(resultData.key);
+            if (!slotEl) {
+                slotEl = createSlotElement(resultData, className);
+                slotElements.set(resultData.key, slotEl);
+            } else if (slotEl.dataset.classSignature !== className) {
+                slotEl.className = className;
+                slotEl.dataset.classSignature = className;
+            }
+            if (rowEl.children[position] !== slotEl) {
+                rowEl.insertBefore(slotEl, rowEl.children[position] || null);
+            }
+        });
+        // O que sobrou no fim da linha foi para outra linha ou saiu da grade
+        while (rowEl.childElementCount > resultsInRow.length) rowEl.lastElementChild.remove();
+        if (!estimatedRowHeight && rowEl.offsetHeight) estimatedRowHeight = rowEl.offsetHeight;
+    };
+
     const renderGrid = (rows, targetsByMinute) => { // A função agora recebe o Map
         if (!resultsGrid) return;
-        resultsGrid.innerHTML = '';
-        const fragment = document.createDocumentFragment();
+        latestGridRows = rows || [];
+        latestTargetsByMinute = targetsByMinute;
+        previousResultIds = currentResultIds;
+        currentResultIds = new Set();
 
-        if (!rows || rows.length === 0) {
+        if (latestGridRows.length === 0) {
+            rowObserver?.disconnect();
+            rowVisibility.clear();
+            slotElements.clear();
+            resultsGrid.innerHTML = '';
             const p = document.createElement('p');
             p.textContent = 'Aguardando resultados...';
-            fragment.appendChild(p);
-        } else {
-            rows.forEach(resultsInRow => {
-                const rowEl = document.createElement('div');
-                rowEl.className = 'results-row';
-
-                resultsInRow.forEach(resultData => {
-                    const slotEl = document.createElement('div');
-                    slotEl.className = 'result-slot';
-                    const rollContainerEl = document.createElement('div');
-                    rollContainerEl.className = 'roll-container';
-                    const timeEl = document.createElement('div');
-                    timeEl.className = 'result-time';
-                    
-                    // ### LÓGICA DE CORREÇÃO PRINCIPAL ###
-                    const targetPanels = targetsByMinute.get(resultData.time_short);
-                    if (targetPanels) {
-                        if (targetPanels.size > 1) {
-                            // Mais de um painel, aplica a classe de piscar
-                            slotEl.classList.add('multi-panel-target');
-                        } else if (targetPanels.size === 1) {
-                            // Apenas um painel, aplica a classe de cor específica
-                            const panelId = targetPanels.values().next().value;
-                            slotEl.classList.add(`panel-${panelId}-target`);
-                        }
-                    }
+            resultsGrid.appendChild(p);
+            return;
+        }
+        resultsGrid.querySelector(':scope > p')?.remove();
 
-                    if (resultData.type === 'placeholder') {
-                        slotEl.classList.add('placeholder');
-                        timeEl.innerHTML = `<span class="time-short">${resultData.time_short}</span>`;
-                    } else { 
-                        if (!visibleIds.has(resultData.id)) {
-                            slotEl.classList.add('new-item-animation');
-                        }
-                        slotEl.dataset.id = resultData.id;
-                        slotEl.dataset.roll = resultData.roll;
-                        rollContainerEl.classList.add(colorClassMap[resultData.color] || '');
-                        rollContainerEl.textContent = resultData.roll;
-                        timeEl.innerHTML = `<span class="time-short">${resultData.time_short}</span><span class="time-full">${resultData.time_full}</span>`;
-                        
-                        if (selectedNumbers.has(String(resultData.roll))) {
-                            slotEl.classList.add('manual-selection');
-                        }
-                    }
-                    
-                    slotEl.appendChild(rollContainerEl);
-                    slotEl.appendChild(timeEl);
-                    rowEl.appendChild(slotEl);
-                });
-                
-                fragment.appendChild(rowEl);
-            });
+        // Chaves estáveis: id do resultado ou minuto + ordem do slot vazio dentro do minuto
+        const placeholdersPerMinute = new Map();
+        const wantedKeys = new Set();
+        latestGridRows.forEach(resultsInRow => resultsInRow.forEach(resultData => {
+            if (resultData.type === 'placeholder') {
+                const count = placeholdersPerMinute.get(resultData.time_short) || 0;
+                placeholdersPerMinute.set(resultData.time_short, count + 1);
+                resultData.key = `ph-${resultData.time_short}-${count}`;
+            } else {
+                resultData.key = `r-${resultData.id}`;
+                currentResultIds.add(resultData.id);
+            }
+            wantedKeys.add(resultData.key);
+        }));
+
+        while (resultsGrid.childElementCount < latestGridRows.length) {
+            const rowEl = document.createElement('div');
+            rowEl.className = 'results-row';
+            rowEl.dataset.rowIndex = resultsGrid.childElementCount;
+            resultsGrid.appendChild(rowEl);
+            rowObserver?.observe(rowEl);
+        }
+        while (resultsGrid.childElementCount > latestGridRows.length) {
+            const rowEl = resultsGrid.lastElementChild;
+            rowObserver?.unobserve(rowEl);
+            rowVisibility.delete(Number(rowEl.dataset.rowIndex));
+            rowEl.remove();
+        }
+
+        Array.from(resultsGrid.children).forEach((rowEl, index) => patchRow(rowEl, index));
+
+        for (const [key, slotEl] of slotElements) {
+            if (!wantedKeys.has(key)) {
+                slotEl.remove();
+                slotElements.delete(key);
+            }
         }
-        resultsGrid.appendChild(fragment);
     };
     const renderSequenceAlerts = (alerts) => { if (!sequenceAlertContainer) return; const visualAlerts = alerts.filter(a => a.status === 'visual'); const alertKeys = new Set(visualAlerts.map(a => a.id)); const existingCardKeys = new Set(Array.from(sequenceAlertContainer.children).map(card => card.dataset.key)); for (const key of existingCardKeys) { if (!alertKeys.has(key)) { sequenceAlertContainer.querySelector(`[data-key="${key}"]`)?.remove(); } } visualAlerts.forEach(alert => { if (!existingCardKeys.has(alert.id)) { const card = document.createElement('div'); card.className = 'sequence-alert-card'; card.dataset.key = alert.id; const sequenceEmojis = alert.sequence.map(color => `<span class="${colorClassMap[color]}">${emojiMap[color]}</span>`).join(''); card.innerHTML = `<div class="alert-title">Sequência Armada Detectada!</div><div class="alert-body"><div class="alert-sequence-icons">${sequenceEmojis}</div><span>➡️</span><div class="alert-prediction">${emojiMap[alert.prediction]}</div></div>`; sequenceAlertContainer.appendChild(card); } }); sequenceAlertContainer.style.display = sequenceAlertContainer.children.length > 0 ? 'flex' : 'none'; };
     const renderIntervalAverages = (data) => {
@@ -264,6 +418,10 @@ document.addEventListener('DOMContentLoaded', () => {
         const statusBadge = `<span class="signal-status-badge">${statusText}</span>`;
         return `<div class="confluence-header"><span class="confluence-title">Alvo de Confluência</span>${statusBadge}<span class="confluence-badge">${signal.count} ESTRATÉGIAS</span></div><div class="confluence-body"><span class="signal-target-time-large">⚪️ ${targetTimeString}</span></div><small class="confluence-strategies">${strategyNames}</small>`;
     };
+    const signalCards = { '1': new Map(), '2': new Map(), '3': new Map() }; // coluna -> chave -> card
+    const signalSignature = (signal) => signal.type === 'confluence'
+        ? `${signal.status}|${signal.count}|${signal.strategy_names.join(',')}`
+        : `${signal.status}|${signal.strategy_name}|${signal.message || ''}`;
     const renderAllSignalsInColumns = (signalsFromApi) => {
         let signalsByColumn = { '1': [], '2': [], '3': [] };
         signalsFromApi.forEach(signal => {
@@ -273,50 +431,40 @@ document.addEventListener('DOMContentLoaded', () => {
         });
         for (const columnId in columnContainers) {
             const container = columnContainers[columnId];
+            if (!container) continue;
+            const cards = signalCards[columnId];
             const signals = signalsByColumn[columnId];
             const newKeys = new Set(signals.map(s => s.key));
             
-            container.querySelectorAll('[data-key]').forEach(el => {
-                if (!newKeys.has(el.dataset.key)) el.remove();
-            });
+            for (const [key, card] of cards) {
+                if (!newKeys.has(key)) {
+                    card.remove();
+                    cards.delete(key);
+                }
+            }
 
             signals.forEach(signal => {
-                const existingCard = container.querySelector(`[data-key="${signal.key}"]`);
                 const statusClass = signal.status === 'hit' ? 'status-hit' : 'status-pending';
-                
-                if (existingCard) {
-                    let newClassName;
-                    if (signal.type === 'confluence') {
-                        newClassName = `confluence-card blue-border ${statusClass}`;
-                    } else {
-                        newClassName = `signal-card ${statusClass}`;
-                    }
-                    if (existingCard.className !== newClassName) {
-                        existingCard.className = newClassName;
-                        if (signal.type === 'confluence') {
-                            existingCard.innerHTML = createConfluenceSignalCard(signal);
-                        } else {
-                            existingCard.innerHTML = createIndividualSignalCard(signal);
-                        }
-                    }
-                } else {
-                    const card = document.createElement('div');
+                const className = signal.type === 'confluence' ? `confluence-card blue-border ${statusClass}` : `signal-card ${statusClass}`;
+                const signature = signalSignature(signal);
+                let card = cards.get(signal.key);
+                if (!card) {
+                    card = document.createElement('div');
                     card.dataset.key = signal.key;
-                    if (signal.type === 'confluence') {
-                        card.className = `confluence-card blue-border ${statusClass}`;
-                        card.innerHTML = createConfluenceSignalCard(signal);
-                    } else {
-                        card.className = `signal-card ${statusClass}`;
-                        card.innerHTML = createIndividualSignalCard(signal);
-                    }
+                    cards.set(signal.key, card);
                     container.appendChild(card);
+                } else if (card.dataset.signature === signature) {
+                    return; // Nada mudou neste card
                 }
+                card.className = className;
+                card.dataset.signature = signature;
+                card.innerHTML = signal.type === 'confluence' ? createConfluenceSignalCard(signal) : createIndividualSignalCard(signal);
             });
 
-            const placeholderEl = container.querySelector('.placeholder');
-            if (container.children.length > (placeholderEl ? 1 : 0)) {
+            const placeholderEl = container.querySelector(':scope > .placeholder');
+            if (cards.size > 0) {
                 placeholderEl?.remove();
-            } else if (container.children.length === 0 && !placeholderEl) {
+            } else if (!placeholderEl) {
                 const p = document.createElement('p');
                 p.className = 'placeholder';
                 p.textContent = 'Aguardando sinais...';
@@ -334,14 +482,6 @@ document.addEventListener('DOMContentLoaded', () => {
             }
         }
     };
-    async function fetchAndRenderPanelStats() {
-        try {
-            const response = await fetch('/api/stats/panel_accuracy');
-            if (!response.ok) return;
-            const stats = await response.json();
-            renderPanelStats(stats);
-        } catch (error) { console.error("Falha ao buscar estatísticas dos painéis:", error); }
-    }
     const updatePanelStatusIndicators = (data) => {
         const { activator_window_active, activator_window_end, activator_modes_enabled } = data;
 
@@ -468,23 +608,16 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // --- FUNÇÃO DE ATUALIZAÇÃO PRINCIPAL ---
     const fetchAndUpdate = async () => {
-        visibleIds = new Set(Array.from(document.querySelectorAll('.result-slot[data-id]')).map(el => el.dataset.id));
         try {
-            const [
-                resultsResponse, sequenceAlertsResponse, allSignalsResponse, intervalAveragesResponse
-            ] = await Promise.all([
-                fetch(`/api/resultados?limite=${currentLimit}`),
-                fetch('/api/sequence_alerts'),
-                fetch('/api/sinais'),
-                fetch('/api/stats/interval_averages'),
-            ]);
-            const responses = [resultsResponse, sequenceAlertsResponse, allSignalsResponse, intervalAveragesResponse];
-            for (const response of responses) { if (!response.ok) throw new Error(`Falha na API: ${response.url}`); }
-            
-            const rows = await resultsResponse.json();
-            const sequenceAlerts = await sequenceAlertsResponse.json();
-            const signalsData = await allSignalsResponse.json();
-            const intervalAverages = await intervalAveragesResponse.json();
+            // Um único snapshot (/api/dashboard) com tudo que a página precisa
+            const response = await fetch(`/api/dashboard?limite=${currentLimit}&formato=compacto`);
+            if (!response.ok) throw new Error(`Falha na API: ${response.url}`);
+            const snapshot = await response.json();
+
+            const rows = decodeCompactGrid(snapshot.resultados);
+            const sequenceAlerts = snapshot.sequence_alerts;
+            const signalsData = decodeCompactSignals(snapshot.sinais);
+            const intervalAverages = snapshot.interval_averages;
             
             const { signals: allSignals, activator_modes_enabled } = signalsData;
             
@@ -515,7 +648,7 @@ document.addEventListener('DOMContentLoaded', () => {
             renderIntervalAverages(intervalAverages);
             renderActiveManagementWidget();
             handleSoundAlerts(sequenceAlerts, allSignals);
-            fetchAndRenderPanelStats();
+            renderPanelStats(snapshot.panel_accuracy);
             statusIndicator.classList.remove('error');
             statusText.textContent = 'Conectado';
         } catch (error) {
@@ -530,7 +663,6 @@ document.addEventListener('DOMContentLoaded', () => {
         if (isNaN(newLimit) || newLimit < 20 || newLimit > 1000) { roundsInput.value = currentLimit; return; }
         currentLimit = newLimit;
         localStorage.setItem('roundLimit', currentLimit);
-        visibleIds.clear();
         fetchAndUpdate();
     };
 
@@ -0,0 +1,45 @@
+# storage.py
+
+import os
+
+# Repositório de dados: todo acesso a resultados, sinais, estatísticas e notificações passa por
+# estas funções, e o backend é escolhido por STORAGE_BACKEND:
+#   postgres (padrão): storage_postgres.py, o banco do Render (DATABASE_URL)
+#   sqlite:            storage_sqlite.py, arquivo local em WAL (SQLITE_PATH) ou ':memory:'
+# Os dois módulos expõem as mesmas funções (OPERACOES); as funções recebem um cursor da conexão
+# aberta por conectar(), que devolve linhas acessíveis por nome, e quem chama faz commit/rollback.
+# Horários entram e saem como datetime local sem fuso nos dois backends.
+
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'postgres').lower()
+
+if STORAGE_BACKEND == 'sqlite':
+    import storage_sqlite as backend
+elif STORAGE_BACKEND == 'postgres':
+    import storage_postgres as backend
+else:
+    raise ValueError(f"STORAGE_BACKEND inválido: '{STORAGE_BACKEND}'. Use 'postgres' ou 'sqlite'.")
+
+OPERACOES = (
+    # Conexão e esquema
+    'conectar', 'iniciar_snapshot', 'inicializar_esquema', 'versoes_dos_dados',
+    # Resultados
+    'inserir_resultado', 'ultimos_resultados', 'ultimo_resultado', 'resultados_no_intervalo',
+    'brancos_desde', 'medias_intervalo',
+    # Sinais
+    'alvo_pendente_existe', 'registrar_sinal', 'alvos_pendentes', 'alvos_expirados', 'maior_alvo_pendente',
+    'sinais_para_exibicao', 'sinais_ativos', 'marcar_acerto', 'marcar_expirados',
+    'definir_mensagem_telegram', 'estrategias_da_mensagem',
+    # Estatísticas (rollups) e notificações
+    'estatisticas_das_estrategias', 'cores_por_hora', 'brancos_por_minuto', 'sequencias_antes_do_branco',
+    'acertos_por_janela', 'notificacoes_enviadas', 'registrar_notificacao',
+    # Exportação
+    'linhas_para_exportacao',
+    # Retenção
+    'aplicar_retencao',
+)
+
+for _nome in OPERACOES:
+    globals()[_nome] = getattr(backend, _nome)
+
+ERROS_DE_BANCO = backend.ERROS_DE_BANCO # para os 'except' de quem chama
+EM_PROCESSO = backend.EM_PROCESSO # banco visível apenas neste processo (SQLite ':memory:')
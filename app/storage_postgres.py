@@ -0,0 +1,329 @@
+# storage_postgres.py
+
+import os
+
+import psycopg2
+from psycopg2 import extensions, extras
+
+import bulk_io
+import compact_schema
+from giro import Giro
+import partition_manager
+import rollups
+
+# Backend PostgreSQL do repositório (ver storage.py): esquema compacto particionado por dia,
+# rollups mantidos na mesma transação das escritas e retenção por partição com arquivo.
+# Todas as funções recebem um cursor que devolve linhas como dicionários (RealDictCursor);
+# os giros de 'resultados' saem como Giro (ver giro.py).
+
+DATABASE_URL = os.environ.get('DATABASE_URL') # Render fornece isso automaticamente para o DB gerenciado
+ERROS_DE_BANCO = (psycopg2.Error,)
+EM_PROCESSO = False
+
+# --- Conexão ---
+def conectar(dicionario=False):
+    if not DATABASE_URL:
+        raise Exception("DATABASE_URL não configurada. Conexão com o banco de dados falhou.")
+    conn = compact_schema.conectar(DATABASE_URL, sslmode='require') # 'sslmode=require' é importante para o Render
+    if dicionario:
+        conn.cursor_factory = extras.RealDictCursor
+    return conn
+
+def _cursor_simples(cursor):
+    # Cursor de tuplas na mesma conexão (mesma transação): rollups lê as linhas por posição,
+    # e os giros são montados direto das tuplas, sem o dicionário intermediário
+    return cursor.connection.cursor(cursor_factory=extensions.cursor)
+
+def iniciar_snapshot(cursor):
+    """Todas as consultas seguintes da transação enxergam o mesmo instante do banco."""
+    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+
+# --- Esquema ---
+def inicializar_esquema(conn):
+    cursor = conn.cursor(cursor_factory=extensions.cursor)
+    # 'resultados' e 'sinais' usam o esquema compacto, particionado por dia (ver compact_schema.py
+    # e partition_manager.py); bancos no formato antigo são convertidos aqui preservando os dados
+    compact_schema.migrar(cursor)
+    partition_manager.garantir_particoes(cursor)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estrategia_stats (
+            strategy_id VARCHAR(255) PRIMARY KEY,
+            strategy_name VARCHAR(255) NOT NULL,
+            hits INTEGER DEFAULT 0,
+            misses INTEGER DEFAULT 0,
+            total_signals INTEGER DEFAULT 0
+        );
+    """)
+    # Sequências de acertos/erros (mantidas por rollups.registrar_desfecho)
+    cursor.execute("ALTER TABLE estrategia_stats ADD COLUMN IF NOT EXISTS sequencia_atual INTEGER DEFAULT 0")
+    cursor.execute("ALTER TABLE estrategia_stats ADD COLUMN IF NOT EXISTS maior_sequencia_acertos INTEGER DEFAULT 0")
+    cursor.execute("ALTER TABLE estrategia_stats ADD COLUMN IF NOT EXISTS maior_sequencia_erros INTEGER DEFAULT 0")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notificacoes_enviadas (
+            notification_key VARCHAR(255) PRIMARY KEY
+        );
+    """)
+    # Rollups da página de estatísticas (mantidos pelo coletor, ver rollups.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_cores_hora (
+            hora TIMESTAMP NOT NULL,
+            color VARCHAR(50) NOT NULL,
+            total INTEGER DEFAULT 0,
+            PRIMARY KEY (hora, color)
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_brancos_minuto (
+            dia DATE NOT NULL,
+            minuto SMALLINT NOT NULL,
+            total INTEGER DEFAULT 0,
+            PRIMARY KEY (dia, minuto)
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_intervalos_brancos (
+            hora TIMESTAMP NOT NULL,
+            minutos INTEGER NOT NULL,
+            total INTEGER DEFAULT 0,
+            PRIMARY KEY (hora, minutos)
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_sequencias (
+            hora TIMESTAMP NOT NULL,
+            tamanho SMALLINT NOT NULL,
+            sequencia VARCHAR(8) NOT NULL,
+            proxima VARCHAR(50) NOT NULL,
+            total INTEGER DEFAULT 0,
+            PRIMARY KEY (hora, tamanho, sequencia, proxima)
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_desfechos (
+            bloco TIMESTAMP NOT NULL,
+            strategy_id VARCHAR(255) NOT NULL,
+            hits INTEGER DEFAULT 0,
+            misses INTEGER DEFAULT 0,
+            PRIMARY KEY (bloco, strategy_id)
+        );
+    """)
+    # Versões de 'resultados' e 'sinais' para o cache de respostas: qualquer escrita incrementa o contador
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS versoes_dados (
+            tabela VARCHAR(50) PRIMARY KEY,
+            versao BIGINT NOT NULL DEFAULT 0
+        );
+    """)
+    cursor.execute("INSERT INTO versoes_dados (tabela) VALUES ('resultados'), ('sinais') ON CONFLICT (tabela) DO NOTHING")
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION incrementar_versao_dados() RETURNS trigger AS $$
+        BEGIN
+            UPDATE versoes_dados SET versao = versao + 1 WHERE tabela = TG_ARGV[0];
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    # Os alvos de 'sinais' são gravados em 'sinais_alvos' (a view não recebe escritas)
+    for tabela, gravada_em in (('resultados', 'resultados'), ('sinais', 'sinais_alvos')):
+        cursor.execute(f"DROP TRIGGER IF EXISTS versao_{tabela} ON {gravada_em}")
+        cursor.execute(f"CREATE TRIGGER versao_{tabela} AFTER INSERT OR UPDATE OR DELETE ON {gravada_em} FOR EACH STATEMENT EXECUTE FUNCTION incrementar_versao_dados('{tabela}')")
+    # Rollup recém-criado (primeiro deploy ou tabela nova numa atualização): preenche só as tabelas
+    # vazias a partir do histórico que ainda está em 'resultados', sem apagar as que já têm dados
+    vazias = []
+    for tabela in rollups.ROLLUPS_DE_GIROS:
+        cursor.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {tabela})")
+        if cursor.fetchone()[0]: vazias.append(tabela)
+    if vazias:
+        rollups.acumular_rollups(cursor, tabelas=vazias)
+
+def versoes_dos_dados(cursor):
+    cursor.execute("SELECT tabela, versao FROM versoes_dados ORDER BY tabela")
+    return tuple((row['tabela'], row['versao']) for row in cursor.fetchall())
+
+# --- Resultados ---
+def inserir_resultado(cursor, giro):
+    """Grava o giro (ignora repetidos) e retorna True se a linha for nova."""
+    cursor.execute("""
+        INSERT INTO resultados (id, roll, color, timestamp_iso)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (id, timestamp_iso) DO NOTHING;
+    """, (giro.id, giro.roll, giro.color, giro.timestamp_iso))
+    novo = cursor.rowcount == 1
+    # Só resultados novos entram nos rollups (mesma transação, para nunca contar em dobro)
+    if novo:
+        rollups.registrar_resultado(_cursor_simples(cursor), giro.id)
+    return novo
+
+def _giros(cursor, consulta, parametros):
+    cursor = _cursor_simples(cursor)
+    cursor.execute(consulta, parametros)
+    return [Giro(*linha) for linha in cursor.fetchall()]
+
+def ultimos_resultados(cursor, limite):
+    """Os 'limite' giros mais recentes, do mais novo para o mais antigo."""
+    return _giros(cursor, "SELECT id, roll, color, timestamp_iso FROM resultados ORDER BY timestamp_iso DESC LIMIT %s", (limite,))
+
+def ultimo_resultado(cursor):
+    linhas = ultimos_resultados(cursor, 1)
+    return linhas[0] if linhas else None
+
+def resultados_no_intervalo(cursor, inicio, fim):
+    """Giros com horário em [inicio, fim], em ordem cronológica."""
+    return _giros(cursor,
+        "SELECT id, roll, color, timestamp_iso FROM resultados WHERE timestamp_iso BETWEEN %s AND %s ORDER BY timestamp_iso ASC",
+        (inicio, fim))
+
+def brancos_desde(cursor, desde):
+    """Horários dos Brancos a partir de 'desde', em ordem cronológica."""
+    cursor.execute("SELECT timestamp_iso FROM resultados WHERE color = 'Branco' AND timestamp_iso >= %s ORDER BY timestamp_iso ASC", (desde,))
+    return [row['timestamp_iso'] for row in cursor.fetchall()]
+
+def medias_intervalo(cursor, desde):
+    return rollups.medias_intervalo(cursor, desde)
+
+# --- Sinais ---
+def alvo_pendente_existe(cursor, strategy_id, target_timestamp):
+    cursor.execute(
+        "SELECT 1 FROM sinais WHERE strategy_id = %s AND target_timestamp = %s AND status = 'pending' LIMIT 1",
+        (strategy_id, target_timestamp))
+    return cursor.fetchone() is not None
+
+def registrar_sinal(cursor, strategy_id, strategy_name, trigger_id, message, alvos):
+    """
+    Grava os alvos ainda inexistentes do gatilho e soma em 'total_signals'.
+    Retorna os alvos criados (id, trigger_id, strategy_id, target_timestamp, telegram_message_id).
+    """
+    criados = []
+    gatilho_id = None # o gatilho é gravado uma vez; cada alvo só referencia o id
+    for alvo in alvos:
+        cursor.execute("""
+            SELECT EXISTS (
+                SELECT 1 FROM sinais
+                WHERE trigger_id = %s AND strategy_id = %s AND target_timestamp = %s
+            ) AS existe;
+        """, (trigger_id, strategy_id, alvo))
+        if cursor.fetchone()['existe']: # Se já existe, pula
+            continue
+        if gatilho_id is None:
+            gatilho_id = compact_schema.registrar_gatilho(cursor, strategy_id, trigger_id, strategy_name, message)
+        cursor.execute("INSERT INTO sinais_alvos (gatilho_id, target_timestamp) VALUES (%s, %s) RETURNING id", (gatilho_id, alvo))
+        criados.append({
+            'id': cursor.fetchone()['id'], 'trigger_id': trigger_id, 'strategy_id': strategy_id,
+            'target_timestamp': alvo, 'telegram_message_id': None
+        })
+    if criados:
+        cursor.execute("""
+            INSERT INTO estrategia_stats (strategy_id, strategy_name, total_signals)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (strategy_id) DO UPDATE SET
+            total_signals = estrategia_stats.total_signals + EXCLUDED.total_signals,
+            strategy_name = EXCLUDED.strategy_name;
+        """, (strategy_id, strategy_name, len(criados)))
+    return criados
+
+def alvos_pendentes(cursor, ids=None, vencidos_antes_de=None):
+    """Alvos pendentes: todos, só os de 'ids' ou só os com horário anterior a 'vencidos_antes_de'."""
+    consulta = "SELECT id, trigger_id, strategy_id, telegram_message_id, target_timestamp FROM sinais WHERE status = 'pending'"
+    parametros = []
+    if ids is not None:
+        consulta += " AND id IN (SELECT unnest(%s::int[]))"
+        parametros.append(list(ids))
+    if vencidos_antes_de is not None:
+        consulta += " AND target_timestamp < %s"
+        parametros.append(vencidos_antes_de)
+    cursor.execute(consulta, parametros)
+    return cursor.fetchall()
+
+def alvos_expirados(cursor, strategy_id, desde):
+    """Alvos da estratégia marcados como 'expired' com horário a partir de 'desde'."""
+    cursor.execute("""
+        SELECT id, trigger_id, strategy_id, telegram_message_id, target_timestamp FROM sinais
+        WHERE status = 'expired' AND strategy_id = %s AND target_timestamp >= %s
+    """, (strategy_id, desde))
+    return cursor.fetchall()
+
+def maior_alvo_pendente(cursor):
+    cursor.execute("SELECT MAX(target_timestamp) AS max_target FROM sinais WHERE status = 'pending'")
+    linha = cursor.fetchone()
+    return linha['max_target'] if linha else None
+
+def sinais_para_exibicao(cursor, strategy_ids, acertos_desde):
+    """Sinais pendentes e acertos com alvo a partir de 'acertos_desde' das estratégias, por horário alvo."""
+    placeholders = ','.join(['%s'] * len(strategy_ids))
+    cursor.execute(f"""
+        SELECT id, strategy_id, strategy_name, message, target_timestamp, status
+        FROM sinais
+        WHERE strategy_id IN ({placeholders})
+          AND (status = 'pending' OR (status = 'hit' AND target_timestamp >= %s))
+        ORDER BY target_timestamp ASC
+    """, list(strategy_ids) + [acertos_desde])
+    return cursor.fetchall()
+
+def sinais_ativos(cursor, acertos_desde):
+    """id, strategy_id, target_timestamp e status de todos os pendentes e dos acertos recentes."""
+    cursor.execute(
+        "SELECT id, strategy_id, target_timestamp, status FROM sinais WHERE status = 'pending' OR (status = 'hit' AND target_timestamp >= %s)",
+        (acertos_desde,))
+    return cursor.fetchall()
+
+def marcar_acerto(cursor, alvo):
+    cursor.execute("UPDATE sinais_alvos SET status = 'hit' WHERE id = %s", (alvo['id'],))
+    rollups.registrar_desfecho(cursor, alvo['strategy_id'], alvo['target_timestamp'], acerto=True)
+
+def marcar_expirados(cursor, alvos):
+    # Contadores de erros na ordem dos alvos, para as sequências de erros
+    for alvo in sorted(alvos, key=lambda a: a['target_timestamp']):
+        rollups.registrar_desfecho(cursor, alvo['strategy_id'], alvo['target_timestamp'], acerto=False)
+    cursor.execute("UPDATE sinais_alvos SET status = 'expired' WHERE id IN (SELECT unnest(%s::int[]))", ([alvo['id'] for alvo in alvos],))
+
+def definir_mensagem_telegram(cursor, ids, message_id):
+    cursor.execute("UPDATE sinais_alvos SET telegram_message_id = %s WHERE id IN (SELECT unnest(%s::int[]))", (message_id, list(ids)))
+
+def estrategias_da_mensagem(cursor, message_id):
+    cursor.execute("SELECT DISTINCT strategy_id FROM sinais WHERE telegram_message_id = %s", (message_id,))
+    return [row['strategy_id'] for row in cursor.fetchall()]
+
+# --- Estatísticas ---
+def estatisticas_das_estrategias(cursor):
+    cursor.execute("SELECT strategy_id, strategy_name, hits, misses, total_signals FROM estrategia_stats")
+    return cursor.fetchall()
+
+def cores_por_hora(cursor, inicio, fim):
+    return rollups.cores_por_hora(cursor, inicio, fim)
+
+def brancos_por_minuto(cursor, inicio, fim):
+    return rollups.brancos_por_minuto(cursor, inicio, fim)
+
+def sequencias_antes_do_branco(cursor, tamanho, inicio, fim, limite=10, transicoes=False):
+    return rollups.sequencias_antes_do_branco(cursor, tamanho, inicio, fim, limite, transicoes)
+
+def acertos_por_janela(cursor, mapping, agora=None):
+    return rollups.acertos_por_janela(cursor, mapping, agora)
+
+# --- Notificações ---
+def notificacoes_enviadas(cursor):
+    cursor.execute("SELECT notification_key FROM notificacoes_enviadas")
+    return {row['notification_key'] for row in cursor.fetchall()}
+
+def registrar_notificacao(cursor, chave):
+    cursor.execute("INSERT INTO notificacoes_enviadas (notification_key) VALUES (%s) ON CONFLICT (notification_key) DO NOTHING", (chave,))
+
+# --- Exportação ---
+def linhas_para_exportacao(conn, tabela, inicio, fim, timeout_ms):
+    """Conexão somente-leitura com statement_timeout; linhas dos dias arquivados e do cursor nomeado (bulk_io.ler_intervalo)."""
+    conn.set_session(readonly=True)
+    conn.cursor().execute("SET statement_timeout = %s", (timeout_ms,))
+    return bulk_io.ler_intervalo(conn, tabela, inicio, fim)
+
+# --- Retenção ---
+def aplicar_retencao(cursor, agora, retencao_notificacoes):
+    """Remove (arquivando) os dias fora da retenção e as chaves de notificação antigas; retorna o que saiu."""
+    # 'resultados' e 'sinais' são particionadas por dia: a retenção remove dias inteiros
+    partition_manager.garantir_particoes(cursor)
+    removidas = [f"partição {particao}" for particao in partition_manager.aplicar_retencao(cursor, agora)]
+    # As chaves de notificação terminam no horário alvo (ex.: 'individual-painel_1-2024-05-01T14:05:00')
+    cursor.execute(r"""
+        DELETE FROM notificacoes_enviadas
+        WHERE substring(notification_key FROM '(\d{4}-\d{2}-\d{2}T[\d:.]+)$')::timestamp < %s;
+    """, (agora - retencao_notificacoes,))
+    return removidas
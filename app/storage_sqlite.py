@@ -0,0 +1,503 @@
+# storage_sqlite.py
+
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from giro import Giro
+import partition_manager
+import rollups
+
+# Backend embutido do repositório (ver storage.py): um arquivo SQLite em modo WAL, sem servidor,
+# para instalações pequenas (coletor e app web na mesma máquina), benchmarks e testes locais.
+# Com SQLITE_PATH=':memory:' o banco vive só no processo (cache compartilhado entre as conexões):
+# serve para benchmarks e testes em um único processo; o app web e o coletor não o enxergam.
+# Mesmas tabelas lógicas do Postgres, sem partições nem arquivo: a retenção é por DELETE. Os rollups
+# da página de estatísticas têm as mesmas tabelas e são somados na mesma transação de cada escrita.
+# Horários são gravados como texto ISO no horário local, sem fuso e com largura fixa, então
+# comparar e ordenar o texto equivale a comparar os horários; na leitura voltam como datetime.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join(BASE_DIR, '..', 'database', 'monitor_blaze.db'))
+EM_PROCESSO = SQLITE_PATH == ':memory:'
+URI_MEMORIA = 'file:monitor_blaze?mode=memory&cache=shared'
+TEMPO_ESPERA_BLOQUEIO_MS = 5000 # busy_timeout: espera o outro processo terminar de escrever
+
+ERROS_DE_BANCO = (sqlite3.Error,)
+
+_esquema_criado = False
+_conexao_memoria = None # mantém o banco em memória vivo enquanto o processo existir
+
+# --- Conversão de Horários ---
+def _adaptar_datetime(valor):
+    if valor.tzinfo is not None:
+        valor = valor.astimezone().replace(tzinfo=None) # horário local, como no Postgres
+    return valor.isoformat(' ', timespec='microseconds')
+
+sqlite3.register_adapter(datetime, _adaptar_datetime)
+sqlite3.register_converter('TIMESTAMP', lambda valor: datetime.fromisoformat(valor.decode()))
+
+def _dicionarios(cursor):
+    # Linhas como dicionários, iguais às do RealDictCursor (e serializáveis para o sandbox)
+    return [dict(linha) for linha in cursor.fetchall()]
+
+# --- Conexão ---
+def _abrir(destino, uri=False):
+    conn = sqlite3.connect(destino, uri=uri, timeout=TEMPO_ESPERA_BLOQUEIO_MS / 1000,
+                           detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def conectar(dicionario=False):
+    """Conexão SQLite; as linhas sempre aceitam acesso por nome ('dicionario' existe pela compatibilidade)."""
+    global _esquema_criado, _conexao_memoria
+    if EM_PROCESSO:
+        if _conexao_memoria is None:
+            _conexao_memoria = _abrir(URI_MEMORIA, uri=True)
+        conn = _abrir(URI_MEMORIA, uri=True)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(SQLITE_PATH)), exist_ok=True)
+        conn = _abrir(SQLITE_PATH)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    if not _esquema_criado:
+        inicializar_esquema(conn)
+        conn.commit()
+        _esquema_criado = True
+    return conn
+
+def iniciar_snapshot(cursor):
+    """Abre a transação de leitura: em WAL, todas as consultas seguintes enxergam o mesmo instante."""
+    if not cursor.connection.in_transaction:
+        cursor.execute("BEGIN")
+
+# --- Esquema ---
+def inicializar_esquema(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS resultados (
+            id TEXT NOT NULL,
+            roll INTEGER,
+            color TEXT CHECK (color IN ('Branco', 'Vermelho', 'Preto')),
+            timestamp_iso TIMESTAMP NOT NULL,
+            PRIMARY KEY (id, timestamp_iso)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_resultados_timestamp ON resultados (timestamp_iso);
+
+        CREATE TABLE IF NOT EXISTS sinais_gatilhos (
+            id INTEGER PRIMARY KEY,
+            strategy_id TEXT NOT NULL,
+            trigger_id TEXT NOT NULL,
+            strategy_name TEXT NOT NULL,
+            message TEXT NOT NULL,
+            UNIQUE (strategy_id, trigger_id, message)
+        );
+        CREATE TABLE IF NOT EXISTS sinais_alvos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            gatilho_id INTEGER NOT NULL,
+            target_timestamp TIMESTAMP NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'hit', 'expired')),
+            telegram_message_id INTEGER DEFAULT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sinais_alvos_gatilho ON sinais_alvos (gatilho_id);
+        CREATE INDEX IF NOT EXISTS idx_sinais_alvos_pendentes ON sinais_alvos (target_timestamp) WHERE status = 'pending';
+        CREATE INDEX IF NOT EXISTS idx_sinais_alvos_mensagem ON sinais_alvos (telegram_message_id) WHERE telegram_message_id IS NOT NULL;
+        CREATE VIEW IF NOT EXISTS sinais AS
+            SELECT a.id, g.trigger_id, g.strategy_id, g.strategy_name, g.message,
+                   a.target_timestamp, a.status, a.telegram_message_id, a.gatilho_id
+            FROM sinais_alvos a JOIN sinais_gatilhos g ON g.id = a.gatilho_id;
+
+        CREATE TABLE IF NOT EXISTS estrategia_stats (
+            strategy_id TEXT PRIMARY KEY,
+            strategy_name TEXT NOT NULL,
+            hits INTEGER DEFAULT 0,
+            misses INTEGER DEFAULT 0,
+            total_signals INTEGER DEFAULT 0,
+            sequencia_atual INTEGER DEFAULT 0,
+            maior_sequencia_acertos INTEGER DEFAULT 0,
+            maior_sequencia_erros INTEGER DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS notificacoes_enviadas (
+            notification_key TEXT PRIMARY KEY
+        );
+
+        -- Rollups (ver rollups.py); 'dia' é o texto 'YYYY-MM-DD'
+        CREATE TABLE IF NOT EXISTS rollup_cores_hora (
+            hora TIMESTAMP NOT NULL,
+            color TEXT NOT NULL,
+            total INTEGER DEFAULT 0,
+            PRIMARY KEY (hora, color)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS rollup_brancos_minuto (
+            dia TEXT NOT NULL,
+            minuto INTEGER NOT NULL,
+            total INTEGER DEFAULT 0,
+            PRIMARY KEY (dia, minuto)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS rollup_intervalos_brancos (
+            hora TIMESTAMP NOT NULL,
+            minutos INTEGER NOT NULL,
+            total INTEGER DEFAULT 0,
+            PRIMARY KEY (hora, minutos)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS rollup_sequencias (
+            hora TIMESTAMP NOT NULL,
+            tamanho INTEGER NOT NULL,
+            sequencia TEXT NOT NULL,
+            proxima TEXT NOT NULL,
+            total INTEGER DEFAULT 0,
+            PRIMARY KEY (hora, tamanho, sequencia, proxima)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS rollup_desfechos (
+            bloco TIMESTAMP NOT NULL,
+            strategy_id TEXT NOT NULL,
+            hits INTEGER DEFAULT 0,
+            misses INTEGER DEFAULT 0,
+            PRIMARY KEY (bloco, strategy_id)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS versoes_dados (
+            tabela TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO versoes_dados (tabela) VALUES ('resultados'), ('sinais');
+    """)
+    # Versões para o cache de respostas (no SQLite os gatilhos são por linha)
+    for tabela, gravada_em in (('resultados', 'resultados'), ('sinais', 'sinais_alvos')):
+        for operacao in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS versao_{tabela}_{operacao.lower()} AFTER {operacao} ON {gravada_em}
+                BEGIN UPDATE versoes_dados SET versao = versao + 1 WHERE tabela = '{tabela}'; END;
+            """)
+    # Rollup recém-criado (banco anterior aos rollups): preenche só as tabelas vazias com o que está em 'resultados'
+    vazias = [tabela for tabela in rollups.ROLLUPS_DE_GIROS
+              if conn.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {tabela})").fetchone()[0]]
+    if vazias:
+        _preencher_rollups(conn, vazias)
+
+def versoes_dos_dados(cursor):
+    cursor.execute("SELECT tabela, versao FROM versoes_dados ORDER BY tabela")
+    return tuple((row['tabela'], row['versao']) for row in cursor.fetchall())
+
+# --- Resultados ---
+def inserir_resultado(cursor, giro):
+    """Grava o giro (ignora repetidos) e retorna True se a linha for nova."""
+    cursor.execute("INSERT OR IGNORE INTO resultados (id, roll, color, timestamp_iso) VALUES (?, ?, ?, ?)",
+                   (giro.id, giro.roll, giro.color, giro.timestamp_iso))
+    novo = cursor.rowcount == 1
+    # Só resultados novos entram nos rollups (mesma transação, para nunca contar em dobro)
+    if novo:
+        _registrar_rollups(cursor, giro)
+    return novo
+
+def ultimos_resultados(cursor, limite):
+    """Os 'limite' giros mais recentes, do mais novo para o mais antigo."""
+    cursor.execute("SELECT id, roll, color, timestamp_iso FROM resultados ORDER BY timestamp_iso DESC LIMIT ?", (limite,))
+    return [Giro(*linha) for linha in cursor.fetchall()]
+
+def ultimo_resultado(cursor):
+    linhas = ultimos_resultados(cursor, 1)
+    return linhas[0] if linhas else None
+
+def resultados_no_intervalo(cursor, inicio, fim):
+    """Giros com horário em [inicio, fim], em ordem cronológica."""
+    cursor.execute(
+        "SELECT id, roll, color, timestamp_iso FROM resultados WHERE timestamp_iso BETWEEN ? AND ? ORDER BY timestamp_iso ASC",
+        (inicio, fim))
+    return [Giro(*linha) for linha in cursor.fetchall()]
+
+def brancos_desde(cursor, desde):
+    """Horários dos Brancos a partir de 'desde', em ordem cronológica."""
+    cursor.execute("SELECT timestamp_iso FROM resultados WHERE color = 'Branco' AND timestamp_iso >= ? ORDER BY timestamp_iso ASC", (desde,))
+    return [row['timestamp_iso'] for row in cursor.fetchall()]
+
+def medias_intervalo(cursor, desde):
+    """Mesmo resultado de rollups.medias_intervalo (janela exata), com o histograma montado a partir dos Brancos."""
+    brancos = brancos_desde(cursor, desde)
+    histograma = {}
+    for anterior, atual in zip(brancos, brancos[1:]):
+        minutos = round((atual - anterior).total_seconds() / 60)
+        histograma[minutos] = histograma.get(minutos, 0) + 1
+    return rollups.medias_do_histograma(sorted(histograma.items()))
+
+# --- Sinais ---
+def alvo_pendente_existe(cursor, strategy_id, target_timestamp):
+    cursor.execute(
+        "SELECT 1 FROM sinais WHERE strategy_id = ? AND target_timestamp = ? AND status = 'pending' LIMIT 1",
+        (strategy_id, target_timestamp))
+    return cursor.fetchone() is not None
+
+def registrar_sinal(cursor, strategy_id, strategy_name, trigger_id, message, alvos):
+    """
+    Grava os alvos ainda inexistentes do gatilho e soma em 'total_signals'.
+    Retorna os alvos criados (id, trigger_id, strategy_id, target_timestamp, telegram_message_id).
+    """
+    criados = []
+    gatilho_id = None
+    for alvo in alvos:
+        cursor.execute("SELECT 1 FROM sinais WHERE trigger_id = ? AND strategy_id = ? AND target_timestamp = ? LIMIT 1",
+                       (trigger_id, strategy_id, alvo))
+        if cursor.fetchone(): continue
+        if gatilho_id is None:
+            cursor.execute("""
+                INSERT INTO sinais_gatilhos (strategy_id, trigger_id, strategy_name, message) VALUES (?, ?, ?, ?)
+                ON CONFLICT (strategy_id, trigger_id, message) DO UPDATE SET strategy_name = excluded.strategy_name;
+            """, (strategy_id, trigger_id, strategy_name, message))
+            cursor.execute("SELECT id FROM sinais_gatilhos WHERE strategy_id = ? AND trigger_id = ? AND message = ?",
+                           (strategy_id, trigger_id, message))
+            gatilho_id = cursor.fetchone()['id']
+        cursor.execute("INSERT INTO sinais_alvos (gatilho_id, target_timestamp) VALUES (?, ?)", (gatilho_id, alvo))
+        criados.append({
+            'id': cursor.lastrowid, 'trigger_id': trigger_id, 'strategy_id': strategy_id,
+            'target_timestamp': alvo, 'telegram_message_id': None
+        })
+    if criados:
+        cursor.execute("""
+            INSERT INTO estrategia_stats (strategy_id, strategy_name, total_signals) VALUES (?, ?, ?)
+            ON CONFLICT (strategy_id) DO UPDATE SET
+            total_signals = total_signals + excluded.total_signals,
+            strategy_name = excluded.strategy_name;
+        """, (strategy_id, strategy_name, len(criados)))
+    return criados
+
+def alvos_pendentes(cursor, ids=None, vencidos_antes_de=None):
+    """Alvos pendentes: todos, só os de 'ids' ou só os com horário anterior a 'vencidos_antes_de'."""
+    consulta = "SELECT id, trigger_id, strategy_id, telegram_message_id, target_timestamp FROM sinais WHERE status = 'pending'"
+    parametros = []
+    if ids is not None:
+        consulta += " AND id IN (SELECT value FROM json_each(?))"
+        parametros.append(json.dumps(list(ids)))
+    if vencidos_antes_de is not None:
+        consulta += " AND target_timestamp < ?"
+        parametros.append(vencidos_antes_de)
+    cursor.execute(consulta, parametros)
+    return _dicionarios(cursor)
+
+def alvos_expirados(cursor, strategy_id, desde):
+    """Alvos da estratégia marcados como 'expired' com horário a partir de 'desde'."""
+    cursor.execute("""
+        SELECT id, trigger_id, strategy_id, telegram_message_id, target_timestamp FROM sinais
+        WHERE status = 'expired' AND strategy_id = ? AND target_timestamp >= ?
+    """, (strategy_id, desde))
+    return _dicionarios(cursor)
+
+def maior_alvo_pendente(cursor):
+    cursor.execute("SELECT target_timestamp FROM sinais_alvos WHERE status = 'pending' ORDER BY target_timestamp DESC LIMIT 1")
+    linha = cursor.fetchone()
+    return linha['target_timestamp'] if linha else None
+
+def sinais_para_exibicao(cursor, strategy_ids, acertos_desde):
+    """Sinais pendentes e acertos com alvo a partir de 'acertos_desde' das estratégias, por horário alvo."""
+    placeholders = ','.join(['?'] * len(strategy_ids))
+    cursor.execute(f"""
+        SELECT id, strategy_id, strategy_name, message, target_timestamp, status
+        FROM sinais
+        WHERE strategy_id IN ({placeholders})
+          AND (status = 'pending' OR (status = 'hit' AND target_timestamp >= ?))
+        ORDER BY target_timestamp ASC
+    """, list(strategy_ids) + [acertos_desde])
+    return _dicionarios(cursor)
+
+def sinais_ativos(cursor, acertos_desde):
+    """id, strategy_id, target_timestamp e status de todos os pendentes e dos acertos recentes."""
+    cursor.execute(
+        "SELECT id, strategy_id, target_timestamp, status FROM sinais WHERE status = 'pending' OR (status = 'hit' AND target_timestamp >= ?)",
+        (acertos_desde,))
+    return _dicionarios(cursor)
+
+def _registrar_desfecho(cursor, strategy_id, target_timestamp, acerto):
+    # Mesmos contadores, sequências e blocos de 5 min de rollups.registrar_desfecho
+    if acerto:
+        cursor.execute("""
+            UPDATE estrategia_stats SET
+                hits = hits + 1,
+                sequencia_atual = CASE WHEN sequencia_atual > 0 THEN sequencia_atual + 1 ELSE 1 END,
+                maior_sequencia_acertos = max(maior_sequencia_acertos, CASE WHEN sequencia_atual > 0 THEN sequencia_atual + 1 ELSE 1 END)
+            WHERE strategy_id = ?;
+        """, (strategy_id,))
+    else:
+        cursor.execute("""
+            UPDATE estrategia_stats SET
+                misses = misses + 1,
+                sequencia_atual = CASE WHEN sequencia_atual < 0 THEN sequencia_atual - 1 ELSE -1 END,
+                maior_sequencia_erros = max(maior_sequencia_erros, CASE WHEN sequencia_atual < 0 THEN 1 - sequencia_atual ELSE 1 END)
+            WHERE strategy_id = ?;
+        """, (strategy_id,))
+    cursor.execute("""
+        INSERT INTO rollup_desfechos (bloco, strategy_id, hits, misses) VALUES (?, ?, ?, ?)
+        ON CONFLICT (bloco, strategy_id) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses;
+    """, (rollups.bloco_de_desfecho(target_timestamp), strategy_id, int(acerto), int(not acerto)))
+
+def marcar_acerto(cursor, alvo):
+    cursor.execute("UPDATE sinais_alvos SET status = 'hit' WHERE id = ?", (alvo['id'],))
+    _registrar_desfecho(cursor, alvo['strategy_id'], alvo['target_timestamp'], acerto=True)
+
+def marcar_expirados(cursor, alvos):
+    for alvo in sorted(alvos, key=lambda a: a['target_timestamp']):
+        _registrar_desfecho(cursor, alvo['strategy_id'], alvo['target_timestamp'], acerto=False)
+    cursor.execute("UPDATE sinais_alvos SET status = 'expired' WHERE id IN (SELECT value FROM json_each(?))",
+                   (json.dumps([alvo['id'] for alvo in alvos]),))
+
+def definir_mensagem_telegram(cursor, ids, message_id):
+    cursor.execute("UPDATE sinais_alvos SET telegram_message_id = ? WHERE id IN (SELECT value FROM json_each(?))",
+                   (message_id, json.dumps(list(ids))))
+
+def estrategias_da_mensagem(cursor, message_id):
+    cursor.execute("SELECT DISTINCT strategy_id FROM sinais WHERE telegram_message_id = ?", (message_id,))
+    return [row['strategy_id'] for row in cursor.fetchall()]
+
+# --- Estatísticas ---
+def estatisticas_das_estrategias(cursor):
+    cursor.execute("SELECT strategy_id, strategy_name, hits, misses, total_signals FROM estrategia_stats")
+    return _dicionarios(cursor)
+
+def cores_por_hora(cursor, inicio, fim):
+    cursor.execute("""
+        SELECT CAST(strftime('%H', hora) AS INTEGER) AS h, color, SUM(total) AS total
+        FROM rollup_cores_hora WHERE hora >= ? AND hora < ?
+        GROUP BY 1, 2;
+    """, (inicio, fim))
+    return rollups.contagens_por_hora(cursor.fetchall())
+
+def brancos_por_minuto(cursor, inicio, fim):
+    cursor.execute("""
+        SELECT minuto, SUM(total) AS total FROM rollup_brancos_minuto
+        WHERE dia >= ? AND dia < ? GROUP BY minuto;
+    """, (inicio.date().isoformat(), fim.date().isoformat()))
+    return rollups.contagens_por_minuto(cursor.fetchall())
+
+def sequencias_antes_do_branco(cursor, tamanho, inicio, fim, limite=10, transicoes=False):
+    cursor.execute("""
+        SELECT sequencia,
+               SUM(total) FILTER (WHERE proxima = 'Branco') AS brancos,
+               SUM(total) FILTER (WHERE proxima = 'Preto') AS pretos,
+               SUM(total) FILTER (WHERE proxima = 'Vermelho') AS vermelhos,
+               SUM(total) AS ocorrencias
+        FROM rollup_sequencias
+        WHERE tamanho = ? AND hora >= ? AND hora < ?
+        GROUP BY sequencia
+        HAVING SUM(total) FILTER (WHERE proxima = 'Branco') > 0
+        ORDER BY brancos DESC, sequencia ASC
+        LIMIT ?;
+    """, (tamanho, inicio.replace(minute=0, second=0, microsecond=0), fim, limite))
+    return rollups.sequencias_das_linhas(cursor.fetchall(), transicoes)
+
+def acertos_por_janela(cursor, mapping, agora=None):
+    limites = rollups.limites_das_janelas(agora)
+    colunas = ", ".join(
+        f"COALESCE(SUM(hits) FILTER (WHERE bloco >= :j{i}), 0) AS hits_{i}, "
+        f"COALESCE(SUM(misses) FILTER (WHERE bloco >= :j{i}), 0) AS misses_{i}"
+        for i in range(len(limites)))
+    parametros = {f"j{i}": limite for i, limite in enumerate(limites.values())}
+    parametros['desde'] = min(limites.values())
+    cursor.execute(f"SELECT strategy_id, {colunas} FROM rollup_desfechos WHERE bloco >= :desde GROUP BY strategy_id", parametros)
+    return rollups.acertos_das_linhas(cursor.fetchall(), limites, mapping)
+
+# --- Rollups ---
+_CHAVES_DOS_ROLLUPS = {
+    'rollup_cores_hora': ('hora', 'color'),
+    'rollup_brancos_minuto': ('dia', 'minuto'),
+    'rollup_intervalos_brancos': ('hora', 'minutos'),
+    'rollup_sequencias': ('hora', 'tamanho', 'sequencia', 'proxima'),
+}
+
+def _chaves_de_rollup(color, momento, anteriores, branco_anterior):
+    """(tabela, chave) que um giro soma nos rollups, dadas as cores anteriores (em ordem) e o Branco anterior."""
+    hora = momento.replace(minute=0, second=0, microsecond=0)
+    yield 'rollup_cores_hora', (hora, color)
+    if color == 'Branco':
+        yield 'rollup_brancos_minuto', (momento.date().isoformat(), momento.minute)
+        if branco_anterior is not None:
+            yield 'rollup_intervalos_brancos', (hora, round((momento - branco_anterior).total_seconds() / 60))
+    if color in rollups.CODIGOS_CORES:
+        for ngrama in rollups.ngramas_da_sequencia(anteriores, color):
+            yield 'rollup_sequencias', (hora,) + ngrama
+
+def _somar_nos_rollups(cursor, tabela, linhas):
+    # (chave..., total) somados com ON CONFLICT, como em rollups.acumular_rollups
+    chave = ', '.join(_CHAVES_DOS_ROLLUPS[tabela])
+    cursor.executemany(f"""
+        INSERT INTO {tabela} ({chave}, total) VALUES ({', '.join('?' * (len(_CHAVES_DOS_ROLLUPS[tabela]) + 1))})
+        ON CONFLICT ({chave}) DO UPDATE SET total = total + excluded.total;
+    """, linhas)
+
+def _registrar_rollups(cursor, giro):
+    """Soma o giro recém-inserido nos rollups (mesmas contagens de rollups.registrar_resultado)."""
+    branco_anterior = None
+    if giro.color == 'Branco':
+        cursor.execute("SELECT timestamp_iso FROM resultados WHERE color = 'Branco' AND timestamp_iso < ? ORDER BY timestamp_iso DESC LIMIT 1",
+                       (giro.timestamp_iso,))
+        linha = cursor.fetchone()
+        branco_anterior = linha['timestamp_iso'] if linha else None
+    cursor.execute("SELECT color FROM resultados WHERE timestamp_iso < ? ORDER BY timestamp_iso DESC LIMIT ?",
+                   (giro.timestamp_iso, rollups.TAMANHO_MAXIMO_SEQUENCIA))
+    anteriores = [linha['color'] for linha in reversed(cursor.fetchall())]
+    por_tabela = {}
+    for tabela, chave in _chaves_de_rollup(giro.color, giro.timestamp_iso, anteriores, branco_anterior):
+        por_tabela.setdefault(tabela, []).append(chave + (1,))
+    for tabela, linhas in por_tabela.items():
+        _somar_nos_rollups(cursor, tabela, linhas)
+
+def _preencher_rollups(conn, tabelas):
+    """Soma nas tabelas indicadas todo o histórico de 'resultados', numa passada em ordem cronológica."""
+    contagens = {tabela: {} for tabela in tabelas}
+    anteriores, branco_anterior = [], None
+    for linha in conn.execute("SELECT color, timestamp_iso FROM resultados ORDER BY timestamp_iso ASC"):
+        color, momento = linha['color'], linha['timestamp_iso']
+        for tabela, chave in _chaves_de_rollup(color, momento, anteriores, branco_anterior):
+            if tabela in contagens:
+                contagens[tabela][chave] = contagens[tabela].get(chave, 0) + 1
+        if color == 'Branco': branco_anterior = momento
+        anteriores = (anteriores + [color])[-rollups.TAMANHO_MAXIMO_SEQUENCIA:]
+    cursor = conn.cursor()
+    for tabela, por_chave in contagens.items():
+        _somar_nos_rollups(cursor, tabela, [chave + (total,) for chave, total in por_chave.items()])
+
+# --- Notificações ---
+def notificacoes_enviadas(cursor):
+    cursor.execute("SELECT notification_key FROM notificacoes_enviadas")
+    return {row['notification_key'] for row in cursor.fetchall()}
+
+def registrar_notificacao(cursor, chave):
+    cursor.execute("INSERT OR IGNORE INTO notificacoes_enviadas (notification_key) VALUES (?)", (chave,))
+
+# --- Exportação ---
+def linhas_para_exportacao(conn, tabela, inicio, fim, timeout_ms):
+    """
+    Linhas de 'resultados' ou 'sinais' com horário em [inicio, fim), em ordem, lidas uma a uma do cursor.
+    Sem arquivo de partições, é só o que está no banco; 'timeout_ms' não tem equivalente no SQLite.
+    """
+    conn.execute("PRAGMA query_only = ON")
+    config = partition_manager.TABELAS[tabela]
+    coluna_tempo = config['coluna_tempo']
+    cursor = conn.execute(
+        f"SELECT {', '.join(config['colunas'])} FROM {tabela} WHERE {coluna_tempo} >= ? AND {coluna_tempo} < ? ORDER BY {coluna_tempo}",
+        (inicio, fim))
+    try:
+        for linha in cursor:
+            yield dict(linha)
+    finally:
+        cursor.close()
+
+# --- Retenção ---
+_HORARIO_DA_CHAVE = re.compile(r'(\d{4}-\d{2}-\d{2}T[\d:.]+)$')
+
+def aplicar_retencao(cursor, agora, retencao_notificacoes):
+    """Apaga o que saiu da retenção (mesmos prazos das partições no Postgres); retorna o que saiu."""
+    removidas = []
+    for tabela, config in partition_manager.TABELAS.items():
+        cursor.execute(f"DELETE FROM {config['particionada']} WHERE {config['coluna_tempo']} < ?", (agora - config['retencao'],))
+        if cursor.rowcount > 0:
+            removidas.append(f"{cursor.rowcount} linha(s) de '{tabela}'")
+    cursor.execute("DELETE FROM sinais_gatilhos WHERE NOT EXISTS (SELECT 1 FROM sinais_alvos a WHERE a.gatilho_id = sinais_gatilhos.id)")
+
+    limite = agora - retencao_notificacoes
+    cursor.execute("SELECT notification_key FROM notificacoes_enviadas")
+    antigas = []
+    for row in cursor.fetchall():
+        horario = _HORARIO_DA_CHAVE.search(row['notification_key'])
+        if horario and datetime.fromisoformat(horario.group(1)) < limite:
+            antigas.append((row['notification_key'],))
+    cursor.executemany("DELETE FROM notificacoes_enviadas WHERE notification_key = ?", antigas)
+    return removidas
@@ -0,0 +1,140 @@
+# strategy_registry.py
+
+import importlib.util
+import os
+import threading
+import time
+
+import event_bus
+
+# --- Configuração de Caminhos ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STRATEGIES_DIR = os.path.join(BASE_DIR, '..', 'strategies')
+
+# Intervalo mínimo (segundos) entre duas varreduras da pasta de estratégias.
+# Entre uma varredura e outra, as consultas são atendidas direto do cache.
+INTERVALO_VERIFICACAO = 2
+
+# --- Estado do Registro (um por processo) ---
+_lock = threading.RLock()
+_arquivos = {} # filename -> {'module', 'mtime', 'tempo_carga_ms', 'erro', 'carregado_em'}
+_estrategias = {} # ID -> módulo
+_metadados = [] # Lista ordenada de {'id', 'nome', 'descricao', 'emoji'}
+_ultima_verificacao = 0.0
+
+def _carregar_modulo(filename):
+    module_name = filename[:-3]
+    module_path = os.path.join(STRATEGIES_DIR, filename)
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _descarregar_modulo(filename):
+    # Remove os handlers de eventos da versão antiga antes de trocar/remover o módulo
+    event_bus.cancelar_inscricoes_do_modulo(filename[:-3])
+
+def _reconstruir_indices():
+    global _estrategias, _metadados
+    estrategias = {}
+    for filename in sorted(_arquivos):
+        module = _arquivos[filename]['module']
+        if module is not None and hasattr(module, 'ID') and hasattr(module, 'verificar'):
+            if module.ID in estrategias:
+                print(f"!!! AVISO: ID de estratégia duplicado '{module.ID}' em '{filename}'.")
+            estrategias[module.ID] = module
+    metadados = [
+        {'id': m.ID, 'nome': m.NOME, 'descricao': m.DESCRICAO, 'emoji': getattr(m, 'EMOJI', None)}
+        for m in estrategias.values() if all(hasattr(m, attr) for attr in ['NOME', 'DESCRICAO'])
+    ]
+    _estrategias = estrategias
+    _metadados = sorted(metadados, key=lambda s: s['nome'])
+
+def atualizar(forcar=False):
+    """
+    Varre a pasta de estratégias e (re)carrega apenas os arquivos novos ou cujo mtime mudou.
+    Se a nova versão de um arquivo falhar, a versão anterior continua em uso e o erro é registrado.
+    """
+    global _ultima_verificacao
+    with _lock:
+        agora = time.monotonic()
+        if not forcar and agora - _ultima_verificacao < INTERVALO_VERIFICACAO:
+            return False
+        _ultima_verificacao = agora
+
+        arquivos_atuais = {}
+        if os.path.exists(STRATEGIES_DIR):
+            for filename in os.listdir(STRATEGIES_DIR):
+                if filename.endswith('.py') and filename != '__init__.py':
+                    try:
+                        arquivos_atuais[filename] = os.path.getmtime(os.path.join(STRATEGIES_DIR, filename))
+                    except OSError:
+                        continue
+
+        houve_mudanca = False
+        for filename in list(_arquivos):
+            if filename not in arquivos_atuais:
+                _descarregar_modulo(filename)
+                del _arquivos[filename]
+                print(f"Estratégia removida: '{filename}'")
+                houve_mudanca = True
+
+        for filename, mtime in arquivos_atuais.items():
+            registro = _arquivos.get(filename)
+            if registro and registro['mtime'] == mtime:
+                continue
+            inicio = time.perf_counter()
+            inscricoes = event_bus.copiar_inscricoes()
+            try:
+                module = _carregar_modulo(filename)
+                if registro:
+                    _descarregar_modulo(filename)
+                # Meta-estratégias podem reagir a eventos de sinais em vez de consultar o banco
+                if hasattr(module, 'registrar_eventos'):
+                    module.registrar_eventos(event_bus)
+            except Exception as e:
+                # A versão anterior continua valendo, com as mesmas inscrições de eventos
+                event_bus.restaurar_inscricoes(inscricoes)
+                print(f"!!! ERRO ao carregar a estratégia '{filename}': {e}")
+                anterior = registro['module'] if registro else None
+                _arquivos[filename] = {'module': anterior, 'mtime': mtime, 'tempo_carga_ms': None,
+                                       'erro': str(e), 'carregado_em': registro['carregado_em'] if registro else None}
+                continue
+            tempo_carga_ms = round((time.perf_counter() - inicio) * 1000, 2)
+            if registro:
+                print(f"Estratégia recarregada: '{filename}' ({tempo_carga_ms} ms)")
+            _arquivos[filename] = {'module': module, 'mtime': mtime, 'tempo_carga_ms': tempo_carga_ms,
+                                   'erro': None, 'carregado_em': time.time()}
+            houve_mudanca = True
+
+        if houve_mudanca:
+            _reconstruir_indices()
+        return houve_mudanca
+
+def obter_estrategias():
+    """Retorna {ID: módulo} das estratégias válidas (com ID e verificar)."""
+    atualizar()
+    return _estrategias
+
+def listar_metadados():
+    """Retorna os metadados das estratégias, ordenados pelo nome, para o painel."""
+    atualizar()
+    return _metadados
+
+def relatorio_carga():
+    """Situação de cada arquivo de estratégia: tempo da última carga, erro e horário de carga."""
+    atualizar()
+    with _lock:
+        relatorio = []
+        for filename in sorted(_arquivos):
+            registro = _arquivos[filename]
+            module = registro['module']
+            relatorio.append({
+                'arquivo': filename,
+                'id': getattr(module, 'ID', None),
+                'carregada': module is not None,
+                'tempo_carga_ms': registro['tempo_carga_ms'],
+                'erro': registro['erro'],
+                'carregado_em': registro['carregado_em'],
+            })
+        return relatorio
@@ -0,0 +1,186 @@
+# strategy_sandbox.py
+
+import atexit
+import multiprocessing
+import os
+import time
+
+import metricas
+
+# --- Configuração do Modo Isolado ---
+# Uma estratégia roda isolada se declarar EXECUCAO_ISOLADA = True no próprio arquivo
+# ou se o seu ID estiver na variável de ambiente ESTRATEGIAS_ISOLADAS (separados por vírgula).
+# Estratégias com registrar_eventos() nunca são isoladas: os eventos são entregues apenas no
+# processo do coletor, e no worker a estratégia não receberia nada.
+ESTRATEGIAS_ISOLADAS = {sid.strip() for sid in os.environ.get('ESTRATEGIAS_ISOLADAS', '').split(',') if sid.strip()}
+TEMPO_LIMITE_PADRAO = float(os.environ.get('SANDBOX_TEMPO_LIMITE', 5)) # segundos por chamada de verificar()
+MEMORIA_MAXIMA_MB = int(os.environ.get('SANDBOX_MEMORIA_MB', 512)) # limite de memória de cada worker
+MAX_CHAMADAS_POR_WORKER = int(os.environ.get('SANDBOX_MAX_CHAMADAS', 500)) # recicla o worker após N chamadas
+
+# Mesma métrica do coletor; a duração é medida no worker e volta junto com o resultado
+DURACAO_VERIFICAR = metricas.histograma('estrategia_verificar_segundos', 'Duração de verificar() por estratégia, no coletor (local) ou no worker (isolada).', ('estrategia', 'modo'))
+TIMEOUTS = metricas.contador('estrategia_tempo_limite_total', 'Chamadas isoladas que excederam o tempo limite.', ('estrategia',))
+
+# 'spawn' evita herdar conexões abertas e estado do coletor no processo filho
+_ctx = multiprocessing.get_context('spawn')
+
+# strategy_id -> {'processo', 'conexao', 'chamadas', 'modulo_id'}
+_workers = {}
+
+# --- Lado do Worker (processo filho) ---
+def _limitar_memoria(memoria_mb):
+    try:
+        import resource
+        limite = memoria_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+    except (ImportError, ValueError, OSError) as e:
+        print(f"[SANDBOX] Não foi possível limitar a memória do worker: {e}")
+
+def _abrir_cursor():
+    try:
+        import storage
+        if storage.EM_PROCESSO: # o banco em memória do coletor não existe neste processo
+            return None, None
+        conn = storage.conectar(dicionario=True)
+        return conn, conn.cursor()
+    except Exception as e:
+        print(f"[SANDBOX] Worker sem acesso ao banco: {e}")
+        return None, None
+
+def _worker_main(conexao, module_name, module_path, memoria_mb):
+    import importlib.util
+    _limitar_memoria(memoria_mb)
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    conn, cursor = _abrir_cursor()
+
+    while True:
+        try:
+            historico = conexao.recv()
+        except EOFError:
+            break
+        if historico is None: # pedido de encerramento
+            break
+        # Respostas: (status, valor, duração de verificar() em segundos)
+        inicio = time.perf_counter()
+        try:
+            resultado = module.verificar(historico, cursor)
+            conexao.send(('ok', resultado, time.perf_counter() - inicio))
+        except MemoryError:
+            conexao.send(('fatal', f"limite de memória de {memoria_mb} MB excedido", None))
+            break
+        except Exception as e:
+            conexao.send(('erro', str(e), time.perf_counter() - inicio))
+        finally:
+            if conn:
+                try: conn.rollback() # Libera qualquer transação aberta pela estratégia
+                except Exception: pass
+
+    if conn: conn.close()
+
+# --- Lado do Coletor (processo principal) ---
+_avisos_eventos = set() # IDs já avisados de que não podem ser isolados
+
+def deve_isolar(strategy_module):
+    pedido = getattr(strategy_module, 'EXECUCAO_ISOLADA', False) or strategy_module.ID in ESTRATEGIAS_ISOLADAS
+    if pedido and hasattr(strategy_module, 'registrar_eventos'):
+        if strategy_module.ID not in _avisos_eventos:
+            _avisos_eventos.add(strategy_module.ID)
+            print(f"[SANDBOX] '{strategy_module.ID}' usa registrar_eventos() e continua no processo do coletor.")
+        return False
+    return pedido
+
+def _iniciar_worker(strategy_module):
+    conexao_pai, conexao_filho = _ctx.Pipe()
+    processo = _ctx.Process(
+        target=_worker_main,
+        args=(conexao_filho, strategy_module.__name__, strategy_module.__file__, MEMORIA_MAXIMA_MB),
+        name=f"sandbox-{strategy_module.ID}",
+        daemon=True,
+    )
+    processo.start()
+    conexao_filho.close()
+    worker = {'processo': processo, 'conexao': conexao_pai, 'chamadas': 0, 'modulo_id': id(strategy_module)}
+    _workers[strategy_module.ID] = worker
+    return worker
+
+def _encerrar_worker(strategy_id, forcar=False):
+    worker = _workers.pop(strategy_id, None)
+    if not worker: return
+    processo, conexao = worker['processo'], worker['conexao']
+    if not forcar:
+        try: conexao.send(None)
+        except (OSError, ValueError): pass
+        processo.join(timeout=1)
+    if processo.is_alive():
+        processo.kill()
+        processo.join(timeout=1)
+    conexao.close()
+
+def _obter_worker(strategy_module):
+    worker = _workers.get(strategy_module.ID)
+    if worker:
+        # Recicla se o módulo foi recarregado, se o processo morreu ou se atingiu o limite de chamadas
+        if (worker['modulo_id'] != id(strategy_module) or not worker['processo'].is_alive()
+                or worker['chamadas'] >= MAX_CHAMADAS_POR_WORKER):
+            _encerrar_worker(strategy_module.ID)
+            worker = None
+    return worker or _iniciar_worker(strategy_module)
+
+def enviar_lote(estrategias, historico):
+    """
+    Envia o snapshot do histórico para o worker de cada estratégia isolada, sem esperar a resposta.
+    Assim as estratégias isoladas rodam em paralelo (outros núcleos) enquanto o coletor segue.
+    Retorna {strategy_id: (módulo, prazo)} para ser passado a coletar_lote().
+    """
+    snapshot = list(historico) # Giro tem __slots__: serializa compacto para o processo filho
+    pendentes = {}
+    for strategy_id, strategy_module in estrategias.items():
+        try:
+            worker = _obter_worker(strategy_module)
+            worker['conexao'].send(snapshot)
+            worker['chamadas'] += 1
+            tempo_limite = getattr(strategy_module, 'TEMPO_LIMITE', TEMPO_LIMITE_PADRAO)
+            pendentes[strategy_id] = (strategy_module, time.monotonic() + tempo_limite)
+        except Exception as e:
+            print(f"[SANDBOX] Falha ao enviar histórico para a estratégia {strategy_module.NOME}: {e}")
+            _encerrar_worker(strategy_id, forcar=True)
+    return pendentes
+
+def coletar_lote(pendentes):
+    """
+    Aguarda as respostas dos workers até o prazo de cada chamada.
+    Workers que estouram o prazo ou morrem são finalizados e recriados na próxima rodada.
+    Retorna {strategy_id: resultado de verificar()} apenas para as chamadas bem-sucedidas.
+    """
+    resultados = {}
+    for strategy_id, (strategy_module, prazo) in pendentes.items():
+        worker = _workers.get(strategy_id)
+        if not worker: continue
+        conexao = worker['conexao']
+        try:
+            if not conexao.poll(max(0, prazo - time.monotonic())):
+                print(f"[SANDBOX] Estratégia {strategy_module.NOME} excedeu o tempo limite. Worker reiniciado.")
+                TIMEOUTS.incrementar(strategy_id)
+                _encerrar_worker(strategy_id, forcar=True)
+                continue
+            status, valor, duracao = conexao.recv()
+        except (EOFError, OSError):
+            print(f"[SANDBOX] Worker da estratégia {strategy_module.NOME} encerrou inesperadamente.")
+            _encerrar_worker(strategy_id, forcar=True)
+            continue
+        if duracao is not None:
+            DURACAO_VERIFICAR.observar(duracao, strategy_id, 'isolada')
+        if status == 'ok':
+            resultados[strategy_id] = valor
+        else:
+            print(f"[ERRO na execução da ESTRATÉGIA {strategy_module.NOME} (isolada)]: {valor}")
+            if status == 'fatal': # O worker está encerrando; recria na próxima rodada
+                _encerrar_worker(strategy_id, forcar=True)
+    return resultados
+
+@atexit.register
+def encerrar_todos():
+    for strategy_id in list(_workers):
+        _encerrar_worker(strategy_id)
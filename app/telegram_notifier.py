@@ -5,10 +5,14 @@ import json
 import os
 from datetime import datetime
 
+import metricas
+
 # --- Configurações e Caminhos ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STRATEGIES_DIR = os.path.join(BASE_DIR, '..', 'strategies')
 TELEGRAM_CONFIG_FILE = os.path.join(STRATEGIES_DIR, 'telegram_config.json')
+# TELEGRAM_API_URL troca a API real por outra base (ex.: o servidor falso de fake_apis.py)
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
 
 MESSAGE_TEMPLATES = {
     '1': "🔥🔥🔥ESTRATÉGIA 1🔥🔥🔥\n⚪️ {}",
@@ -17,6 +21,10 @@ MESSAGE_TEMPLATES = {
     'default': "Sinal: {}"
 }
 
+# --- Métricas (ver metricas.py) ---
+TEMPO_API = metricas.histograma('telegram_requisicao_segundos', 'Latência das chamadas à API do Telegram.', ('operacao',))
+FALHAS_API = metricas.contador('telegram_falhas_total', 'Chamadas à API do Telegram sem sucesso (status HTTP ou conexão).', ('operacao', 'motivo'))
+
 # --- Funções Internas ---
 def _load_telegram_config():
     try:
@@ -57,16 +65,27 @@ def _format_confluence_message(panel_id, target_time, emojis):
     
     return f"{header}\n{emojis_str}\n⚪️ {horario_formatado}"
 
+def _chamar_api(operacao, token, metodo, payload):
+    # operacao: 'envio' ou 'edicao'; levanta requests.RequestException como o requests.post
+    try:
+        with metricas.cronometrar(TEMPO_API, operacao):
+            response = requests.post(f"{TELEGRAM_API_URL}/bot{token}/{metodo}", data=payload, timeout=10)
+    except requests.RequestException:
+        FALHAS_API.incrementar(operacao, 'conexao')
+        raise
+    if response.status_code != 200:
+        FALHAS_API.incrementar(operacao, response.status_code)
+    return response
+
 # --- Funções de Envio e Edição ---
 def send_telegram_message(message, channel_key):
     token, chat_id = _get_channel_credentials(channel_key)
     if not token or not chat_id:
         print(f"⚠️ [TELEGRAM] Credenciais não configuradas para '{channel_key}'.")
         return None
-    api_url = f"https://api.telegram.org/bot{token}/sendMessage"
     payload = {'chat_id': chat_id, 'text': message, 'parse_mode': 'HTML'}
     try:
-        response = requests.post(api_url, data=payload, timeout=10)
+        response = _chamar_api('envio', token, 'sendMessage', payload)
         if response.status_code == 200:
             print(f"🚀 [TELEGRAM] Notificação enviada com sucesso para '{channel_key}'!")
             return response.json()['result']['message_id']
@@ -80,46 +99,53 @@ def send_telegram_message(message, channel_key):
 def _edit_telegram_message(new_text, message_id, channel_key):
     token, chat_id = _get_channel_credentials(channel_key)
     if not token or not chat_id or not message_id: return False
-    api_url = f"https://api.telegram.org/bot{token}/editMessageText"
     payload = {'chat_id': chat_id, 'message_id': message_id, 'text': new_text, 'parse_mode': 'HTML'}
     try:
-        response = requests.post(api_url, data=payload, timeout=10)
+        response = _chamar_api('edicao', token, 'editMessageText', payload)
         return response.status_code == 200
     except requests.RequestException: return False
 
 def edit_message_to_hit(panel_id, target_time, message_id, channel_key):
     original_message = _format_signal_message(panel_id, target_time)
     new_text = f"✅✅✅ <b>ACERTO</b> ✅✅✅\n\n{original_message}"
-    if _edit_telegram_message(new_text, message_id, channel_key):
+    editada = _edit_telegram_message(new_text, message_id, channel_key)
+    if editada:
         print(f"✅ [TELEGRAM] Mensagem {message_id} editada para ACERTO.")
     else:
         print(f"⚠️ [TELEGRAM] Falha ao editar mensagem {message_id} para ACERTO.")
+    return editada
 
 def edit_message_to_miss(panel_id, target_time, message_id, channel_key):
     original_message = _format_signal_message(panel_id, target_time)
     lines = original_message.split('\n'); lines[-1] = f"<s>{lines[-1]}</s>"; striked_message = "\n".join(lines)
     new_text = f"❌❌❌ <b>ERRO</b> ❌❌❌\n\n{striked_message}"
-    if _edit_telegram_message(new_text, message_id, channel_key):
+    editada = _edit_telegram_message(new_text, message_id, channel_key)
+    if editada:
         print(f"❌ [TELEGRAM] Mensagem {message_id} editada para ERRO.")
     else:
         print(f"⚠️ [TELEGRAM] Falha ao editar mensagem {message_id} para ERRO.")
+    return editada
 
 def edit_confluence_to_hit(panel_id, target_time, message_id, channel_key, emojis):
     original_message = _format_confluence_message(panel_id, target_time, emojis)
     new_text = f"✅✅✅ <b>ACERTO</b> ✅✅✅\n\n{original_message}"
-    if _edit_telegram_message(new_text, message_id, channel_key):
+    editada = _edit_telegram_message(new_text, message_id, channel_key)
+    if editada:
         print(f"✅ [TELEGRAM] Mensagem de confluência {message_id} editada para ACERTO.")
     else:
         print(f"⚠️ [TELEGRAM] Falha ao editar mensagem de confluência {message_id} para ACERTO.")
+    return editada
 
 def edit_confluence_to_miss(panel_id, target_time, message_id, channel_key, emojis):
     original_message = _format_confluence_message(panel_id, target_time, emojis)
     lines = original_message.split('\n'); lines[-1] = f"<s>{lines[-1]}</s>"; striked_message = "\n".join(lines)
     new_text = f"❌❌❌ <b>ERRO</b> ❌❌❌\n\n{striked_message}"
-    if _edit_telegram_message(new_text, message_id, channel_key):
+    editada = _edit_telegram_message(new_text, message_id, channel_key)
+    if editada:
         print(f"❌ [TELEGRAM] Mensagem de confluência {message_id} editada para ERRO.")
     else:
         print(f"⚠️ [TELEGRAM] Falha ao editar mensagem de confluência {message_id} para ERRO.")
+    return editada
 
 # --- Funções de Notificação ---
 def send_signal_notification(panel_id, target_time):
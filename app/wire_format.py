@@ -0,0 +1,112 @@
+# wire_format.py
+
+import gzip
+import json
+from datetime import datetime
+
+from flask import Response, request
+
+from giro import segundos_do_relogio
+
+# orjson e brotli são opcionais: sem eles, cai para o json da stdlib e para gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- Formato Compacto (opt-in com ?formato=compacto) ---
+# Em vez de listas de dicionários, as respostas vão em colunas (um array por campo),
+# com códigos no lugar das strings repetidas e horários como deslocamento em segundos
+# a partir de uma base. A decodificação correspondente está em static/script.js.
+# Os horários do banco não têm fuso; a base e os deslocamentos tratam esses horários
+# como UTC apenas para a conta, e o cliente formata com getUTC*() para reproduzir o mesmo relógio.
+VERSAO_FORMATO = 1
+CODIGOS_COR = {"Branco": 0, "Vermelho": 1, "Preto": 2}
+CODIGOS_TIPO_SLOT = {"result": 0, "placeholder": 1}
+CODIGOS_TIPO_SINAL = {"individual": 0, "confluence": 1}
+CODIGOS_STATUS = {"pending": 0, "hit": 1}
+
+TAMANHO_MINIMO_COMPRESSAO = 1024 # bytes
+
+def formato_compacto_pedido():
+    return request.args.get('formato') == 'compacto'
+
+def _epoch_iso(texto):
+    return segundos_do_relogio(datetime.fromisoformat(texto))
+
+def compactar_grade(linhas, segundos_por_linha):
+    """Grade de /api/resultados (linhas de slots) em colunas; segundos_por_linha tem o horário de cada slot (Giro.segundos_relogio)."""
+    slots = [slot for linha in linhas for slot in linha]
+    segundos = [valor for linha in segundos_por_linha for valor in linha]
+    base = min(segundos) if segundos else 0
+    return {
+        "f": VERSAO_FORMATO, "base": base, "linhas": [len(linha) for linha in linhas],
+        "tipo": [CODIGOS_TIPO_SLOT[slot['type']] for slot in slots],
+        "id": [slot.get('id') for slot in slots],
+        "roll": [slot.get('roll') for slot in slots],
+        "cor": [CODIGOS_COR.get(slot.get('color')) for slot in slots],
+        "t": [valor - base for valor in segundos],
+    }
+
+def compactar_sinais(dados):
+    """Resposta de /api/sinais com os sinais em colunas e nomes/mensagens em dicionário."""
+    sinais = dados['signals']
+    dicionario, indices = [], {}
+    def codificar(texto):
+        if texto is None: return None
+        if texto not in indices:
+            indices[texto] = len(dicionario)
+            dicionario.append(texto)
+        return indices[texto]
+
+    alvos = [_epoch_iso(sinal['target_timestamp']) for sinal in sinais]
+    base = min(alvos) if alvos else 0
+    compacto = dict(dados)
+    compacto['signals'] = {
+        "f": VERSAO_FORMATO, "base": base, "textos": dicionario,
+        "tipo": [CODIGOS_TIPO_SINAL[s['type']] for s in sinais],
+        "painel": [s['panel_id'] for s in sinais],
+        "db_ids": [s['db_ids'] for s in sinais],
+        "estrategia": [codificar(s.get('strategy_id')) for s in sinais],
+        "nome": [codificar(s.get('strategy_name')) for s in sinais],
+        "nomes": [[codificar(n) for n in s['strategy_names']] if 'strategy_names' in s else None for s in sinais],
+        "mensagem": [codificar(s.get('message')) for s in sinais],
+        "quantidade": [s.get('count') for s in sinais],
+        "alvo": [alvo - base for alvo in alvos],
+        "status": [CODIGOS_STATUS.get(s['status'], s['status']) for s in sinais],
+    }
+    return compacto
+
+def jsonify_rapido(dados):
+    """Serializa com orjson quando disponível (bem mais rápido que o jsonify do Flask)."""
+    corpo = orjson.dumps(dados) if orjson else json.dumps(dados, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return Response(corpo, mimetype='application/json')
+
+# --- Compressão (after_request) ---
+def _codificacao_aceita():
+    aceitas = request.accept_encodings
+    if brotli and aceitas['br']: return 'br'
+    if aceitas['gzip']: return 'gzip'
+    return None
+
+def comprimir_resposta(resposta):
+    """Comprime respostas JSON com brotli ou gzip, conforme o Accept-Encoding do cliente."""
+    if (resposta.status_code != 200 or resposta.mimetype != 'application/json' or resposta.is_streamed
+            or resposta.direct_passthrough or 'Content-Encoding' in resposta.headers):
+        return resposta
+    resposta.vary.add('Accept-Encoding')
+    codificacao = _codificacao_aceita()
+    corpo = resposta.get_data()
+    if not codificacao or len(corpo) < TAMANHO_MINIMO_COMPRESSAO:
+        return resposta
+    resposta.set_data(brotli.compress(corpo, quality=4) if codificacao == 'br' else gzip.compress(corpo, compresslevel=5))
+    resposta.headers['Content-Encoding'] = codificacao
+    # ETag forte por representação: o mesmo conteúdo comprimido de outro jeito tem outra ETag
+    etag, fraca = resposta.get_etag()
+    if etag:
+        resposta.set_etag(f"{etag}-{codificacao}", weak=fraca)
+    return resposta
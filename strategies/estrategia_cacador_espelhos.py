@@ -1,6 +1,6 @@
 # strategies/estrategia_cacador_espelhos.py
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 # --- Metadados Obrigatórios ---
 ID = "cacador_de_espelhos"
@@ -40,7 +40,7 @@ def verificar(historico, cursor):
     resultado_branco = historico[1]
     resultado_anterior = historico[2]
 
-    horario_base = datetime.strptime(resultado_posterior['timestamp_iso'], "%Y-%m-%d %H:%M:%S")
+    horario_base = resultado_posterior['timestamp_iso']
 
     # 3. LÓGICA DE CÁLCULO
     # Mapeia os números para seus dígitos correspondentes
@@ -1,6 +1,6 @@
 # strategies/estrategia_combinacao_digitos.py
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 # --- Metadados Obrigatórios ---
 ID = "combinacao_digitos_vizinhos"
@@ -39,7 +39,7 @@ def verificar(historico, cursor):
     resultado_branco = historico[1]
     resultado_anterior = historico[2]
 
-    horario_base = datetime.strptime(resultado_posterior['timestamp_iso'], "%Y-%m-%d %H:%M:%S")
+    horario_base = resultado_posterior['timestamp_iso']
 
     # 3. APLICAÇÃO DA LÓGICA
     # Pega o último dígito do número anterior
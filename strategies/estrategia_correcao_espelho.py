@@ -1,7 +1,12 @@
 # strategies/estrategia_correcao_espelho.py
 
+import json
+import os
+from collections import deque
 from datetime import datetime, timedelta
 
+import storage
+
 # --- Metadados Obrigatórios ---
 ID = "correcao_espelho_miss"
 NOME = "Correção de Espelho (+1h)"
@@ -12,55 +17,76 @@ EMOJI = "➡️" # Emoji para usar em notificações de confluência
 # ID da estratégia que queremos observar. Deve ser exatamente igual ao ID do outro arquivo.
 SOURCE_STRATEGY_ID = 'cacador_de_espelhos' 
 
+# Só erros recentes viram correção: alvo perdido há no máximo 3 minutos (como na versão que
+# consultava a tabela 'sinais') e com o novo alvo (+1h) ainda no futuro.
+JANELA_ERROS = timedelta(minutes=3)
+STATUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'strategy_status.json')
+
+# Erros recebidos pelo barramento de eventos e ainda não transformados em sinais.
+_erros_recebidos = deque(maxlen=200)
+
+# A fila acima vive só neste módulo: ao ser (re)carregado pelo registro, erros entregues à versão
+# anterior se perderiam. Na primeira execução (e ao ser reativada) os erros recentes são relidos
+# do banco; os que já viraram correção são descartados pelo coletor (mesmo trigger_id e alvo).
+_recuperado = False
+
+def _esta_ativa():
+    try:
+        with open(STATUS_FILE, 'r') as f: return bool(json.load(f).get(ID, False))
+    except (IOError, json.JSONDecodeError): return False
+
+def _ao_expirar_sinal(sinal):
+    """Chamado pelo coletor sempre que um alvo é marcado como 'expired'."""
+    global _recuperado
+    if sinal['strategy_id'] != SOURCE_STRATEGY_ID: return
+    if not _esta_ativa():
+        # Desativada: não acumula erros; ao ser reativada, relê do banco só os recentes
+        _erros_recebidos.clear()
+        _recuperado = False
+        return
+    _erros_recebidos.append(sinal)
+
+def registrar_eventos(bus):
+    """Inscreve a meta-estratégia no evento de expiração de sinais do coletor."""
+    bus.inscrever(bus.SINAL_EXPIRADO, _ao_expirar_sinal)
+
+def _recuperar_erros(cursor):
+    global _recuperado
+    _recuperado = True
+    if cursor is None: return
+    ids_na_fila = {sinal['id'] for sinal in _erros_recebidos}
+    for sinal in storage.alvos_expirados(cursor, SOURCE_STRATEGY_ID, datetime.now() - JANELA_ERROS):
+        if sinal['id'] not in ids_na_fila:
+            _erros_recebidos.append(dict(sinal))
+
 def verificar(historico, cursor):
     """
-    Esta meta-estratégia não olha para o histórico de rolagens (historico).
-    Em vez disso, ela usa o cursor do banco de dados para analisar a tabela 'sinais'.
-    """
-    
-    # 1. DEFINIR JANELA DE TEMPO
-    # Vamos procurar por erros que aconteceram nos últimos 3 minutos para não sobrecarregar
-    # e para agir rapidamente.
-    agora = datetime.now()
-    tres_minutos_atras = agora - timedelta(minutes=3)
-    tres_minutos_atras_str = tres_minutos_atras.strftime("%Y-%m-%d %H:%M:%S")
-
-    # 2. BUSCAR ERROS RECENTES DA ESTRATÉGIA ALVO
-    # Um "erro" é um sinal que o coletor marcou como 'expired'.
-    query = """
-        SELECT id, target_timestamp 
-        FROM sinais
-        WHERE strategy_id = ? 
-          AND status = 'expired'
-          AND target_timestamp >= ?
+    Esta meta-estratégia não olha para o histórico de rolagens (historico): ela consome os
+    erros entregues pelo evento de expiração (e, na primeira execução, os recentes do banco).
     """
-    try:
-        cursor.execute(query, (SOURCE_STRATEGY_ID, tres_minutos_atras_str))
-        sinais_errados = cursor.fetchall()
-    except Exception as e:
-        print(f"[{NOME}] Erro ao consultar o banco de dados: {e}")
-        return None
+    if not _recuperado:
+        _recuperar_erros(cursor)
 
-    if not sinais_errados:
+    # 1. VERIFICAR SE HOUVE ERROS DESDE A ÚLTIMA RODADA
+    if not _erros_recebidos:
         return None # Nenhum erro encontrado, não faz nada.
 
-    # 3. PROCESSAR CADA ERRO E GERAR UM NOVO SINAL (SE AINDA NÃO EXISTIR)
+    # 2. PROCESSAR CADA ERRO E GERAR UM NOVO SINAL
+    # Duplicatas são descartadas pelo coletor, que verifica trigger_id + alvo antes de salvar.
+    agora = datetime.now()
     sinais_de_correcao = []
-    for sinal_errado in sinais_errados:
+    while _erros_recebidos:
+        sinal_errado = _erros_recebidos.popleft()
         original_signal_id = sinal_errado['id']
-        horario_do_erro_str = sinal_errado['target_timestamp']
         
         # Cria um ID único para o nosso novo sinal de correção para evitar duplicatas.
         novo_trigger_id = f"correcao-{original_signal_id}"
 
-        # VERIFICA SE JÁ CRIAMOS UM SINAL DE CORREÇÃO PARA ESTE ERRO
-        cursor.execute("SELECT 1 FROM sinais WHERE trigger_id = ? LIMIT 1", (novo_trigger_id,))
-        if cursor.fetchone():
-            continue # Já existe, pula para o próximo erro.
-
         # CALCULA O NOVO ALVO
-        horario_do_erro_dt = datetime.strptime(horario_do_erro_str, "%Y-%m-%d %H:%M:%S")
+        horario_do_erro_dt = sinal_errado['target_timestamp'] # Já é datetime
         novo_horario_alvo = horario_do_erro_dt + timedelta(hours=1)
+        if horario_do_erro_dt < agora - JANELA_ERROS or novo_horario_alvo <= agora:
+            continue # Erro antigo: a correção chegaria tarde
 
         # MONTA O NOVO SINAL
         mensagem_contexto = f"Correção do alvo perdido das {horario_do_erro_dt.strftime('%H:%M')}"
@@ -72,9 +98,8 @@ def verificar(historico, cursor):
         }
         sinais_de_correcao.append(sinal_gerado)
 
-    # 4. RETORNA A LISTA DE NOVOS SINAIS GERADOS
-    if sinais_de_correcao:
-        print(f"[{NOME}] SUCESSO: {len(sinais_de_correcao)} novo(s) sinal(is) de correção gerado(s).")
-        return sinais_de_correcao
-    
-    return None
\ No newline at end of file
+    # 3. RETORNA A LISTA DE NOVOS SINAIS GERADOS
+    if not sinais_de_correcao:
+        return None
+    print(f"[{NOME}] SUCESSO: {len(sinais_de_correcao)} novo(s) sinal(is) de correção gerado(s).")
+    return sinais_de_correcao
@@ -1,6 +1,6 @@
 # strategies/estrategia_dez_minutos.py
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 # --- Metadados Obrigatórios ---
 ID = "soma_dez_min_antes" # ID único para esta nova estratégia
@@ -20,7 +20,7 @@ def verificar(historico, cursor):
 
     # 2. Define os horários de referência
     resultado_branco = historico[0]
-    horario_branco = datetime.strptime(resultado_branco['timestamp_iso'], "%Y-%m-%d %H:%M:%S")
+    horario_branco = resultado_branco['timestamp_iso']
     horario_alvo_busca = horario_branco - timedelta(minutes=10)
 
     # 3. Busca pelo resultado mais próximo do nosso alvo de 10 minutos atrás
@@ -29,7 +29,7 @@ def verificar(historico, cursor):
 
     # Itera sobre o histórico (pulando o próprio branco)
     for resultado_passado in historico[1:]:
-        horario_passado = datetime.strptime(resultado_passado['timestamp_iso'], "%Y-%m-%d %H:%M:%S")
+        horario_passado = resultado_passado['timestamp_iso']
         diferenca_atual = abs(horario_passado - horario_alvo_busca)
 
         # Se a diferença atual for menor que a menor já encontrada, este é nosso novo candidato
@@ -47,7 +47,7 @@ def verificar(historico, cursor):
     horario_final_alvo = horario_branco + timedelta(minutes=numero_a_somar)
 
     # 6. Formata a mensagem e retorna os dados de forma estruturada
-    horario_encontrado_str = datetime.strptime(resultado_encontrado['timestamp_iso'], "%Y-%m-%d %H:%M:%S").strftime('%H:%M')
+    horario_encontrado_str = resultado_encontrado['timestamp_iso'].strftime('%H:%M')
     
     mensagem_contexto = f"Usado número {numero_a_somar} (da jogada das ~{horario_encontrado_str})."
     
@@ -1,30 +1,21 @@
 # strategies/estrategia_medias_intervalo.py
 
-import sqlite3
-import os
 from datetime import datetime, timedelta
 
+import storage
+
 # --- METADADOS DA ESTRATÉGIA ---
 ID = 'medias_intervalo_brancos'
 NOME = 'Sinal por Média de Intervalo'
 DESCRICAO = 'Gera um sinal de alvo com base no tempo médio de ocorrência entre os resultados brancos.'
 
-# --- CAMINHO DO BANCO DE DADOS ---
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, '..', '..', 'database', 'blaze_data.db')
-
 def _get_all_intervals(cursor):
     """
     Função auxiliar que busca todos os intervalos entre brancos nas últimas 6 horas.
     """
     try:
         six_hours_ago = datetime.now() - timedelta(hours=6)
-        six_hours_ago_str = six_hours_ago.strftime("%Y-%m-%d %H:%M:%S")
-        
-        query = "SELECT timestamp_iso FROM resultados WHERE color = 'Branco' AND timestamp_iso >= ? ORDER BY timestamp_iso ASC"
-        cursor.execute(query, (six_hours_ago_str,))
-        
-        white_timestamps = [datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S") for row in cursor.fetchall()]
+        white_timestamps = storage.brancos_desde(cursor, six_hours_ago)
         
         if len(white_timestamps) < 2:
             return []
@@ -70,7 +61,7 @@ def verificar(historico, cursor):
             media_longa += 1
         
         trigger_id = ultimo_resultado['id']
-        horario_gatilho = datetime.strptime(ultimo_resultado['timestamp_iso'], "%Y-%m-%d %H:%M:%S")
+        horario_gatilho = ultimo_resultado['timestamp_iso']
         
         alvo_curto_dt = horario_gatilho + timedelta(minutes=media_curta)
         alvo_longo_dt = horario_gatilho + timedelta(minutes=media_longa)
@@ -1,6 +1,6 @@
 # strategies/estrategia_numeros_magicos.py
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 # --- Metadados Obrigatórios (Atualizados) ---
 ID = "numeros_magicos"
@@ -21,7 +21,7 @@ def verificar(historico, cursor):
     if resultado_gatilho['roll'] not in MAGIC_NUMBERS:
         return None
 
-    horario_base = datetime.strptime(resultado_gatilho['timestamp_iso'], "%Y-%m-%d %H:%M:%S")
+    horario_base = resultado_gatilho['timestamp_iso']
     
     alvos = []
     for minutos in MINUTES_TO_ADD:
@@ -2,8 +2,8 @@
 
 from datetime import datetime, timedelta
 from collections import defaultdict
-import sqlite3
-import os
+
+import storage
 
 # --- Metadados Obrigatórios ---
 ID = "rastreio_brancos"
@@ -12,12 +12,7 @@ DESCRICAO = "Analisa as últimas 6h. Se um mesmo minuto (ex: :14) teve 'Branco'
 
 def _sinal_ja_pendente(cursor, target_dt):
     """Verifica se já existe um sinal pendente para este alvo."""
-    target_str = target_dt.strftime("%Y-%m-%d %H:%M:%S")
-    cursor.execute(
-        "SELECT 1 FROM sinais WHERE strategy_id = ? AND target_timestamp = ? AND status = 'pending' LIMIT 1",
-        (ID, target_str)
-    )
-    return cursor.fetchone() is not None
+    return storage.alvo_pendente_existe(cursor, ID, target_dt)
 
 # --- Função Principal de Verificação (CORRIGIDA) ---
 # Agora usa o 'cursor' passado pelo coletor, sem criar uma nova conexão.
@@ -31,11 +26,7 @@ def verificar(historico, cursor):
 
     try:
         # 1. PEGAR TODOS OS BRANCOS DAS ÚLTIMAS 6 HORAS
-        cursor.execute(
-            "SELECT timestamp_iso FROM resultados WHERE color = 'Branco' AND timestamp_iso >= ?",
-            (seis_horas_atras.strftime("%Y-%m-%d %H:%M:%S"),)
-        )
-        timestamps_brancos = [datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S") for row in cursor.fetchall()]
+        timestamps_brancos = storage.brancos_desde(cursor, seis_horas_atras)
 
         if not timestamps_brancos:
             return None
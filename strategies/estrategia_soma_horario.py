@@ -1,6 +1,6 @@
 # strategies/estrategia_soma_horario.py
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 # --- Metadados Obrigatórios ---
 ID = "soma_digitos_horario" # ID único para esta nova estratégia
@@ -20,7 +20,7 @@ def verificar(historico, cursor):
         return None
 
     # 2. Extrai o horário base do gatilho
-    horario_base = datetime.strptime(resultado_branco['timestamp_iso'], "%Y-%m-%d %H:%M:%S")
+    horario_base = resultado_branco['timestamp_iso']
 
     # 3. Executa a lógica principal da estratégia
     horario_formatado = horario_base.strftime("%H:%M:%S")
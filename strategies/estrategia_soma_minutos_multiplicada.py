@@ -1,6 +1,6 @@
 # strategies/estrategia_soma_minutos_multiplicada.py
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 # --- Metadados Obrigatórios ---
 ID = "soma_minutos_multiplicada"
@@ -21,7 +21,7 @@ def verificar(historico, cursor):
 
     # 2. EXTRAÇÃO DOS DADOS DO GATILHO
     # Pega o horário exato em que o Branco ocorreu
-    horario_base = datetime.strptime(resultado_branco['timestamp_iso'], "%Y-%m-%d %H:%M:%S")
+    horario_base = resultado_branco['timestamp_iso']
     # Pega apenas o número do minuto (ex: 13 para o horário 17:13)
     minuto_original = horario_base.minute
 
@@ -1,6 +1,6 @@
 # strategies/estrategia_soma_vermelhos.py
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 # --- Metadados Obrigatórios (Atualizados) ---
 ID = "soma_tres_vermelhos_antes_branco" 
@@ -35,7 +35,7 @@ def verificar(historico, cursor):
         return None
 
     # 4. Cálculo sequencial dos 3 alvos
-    horario_base = datetime.strptime(resultado_branco['timestamp_iso'], "%Y-%m-%d %H:%M:%S")
+    horario_base = resultado_branco['timestamp_iso']
 
     # Pega os números na ordem em que foram encontrados (do mais recente para o mais antigo)
     primeiro_numero = numeros_vermelhos_encontrados[0]
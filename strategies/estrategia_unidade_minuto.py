@@ -1,6 +1,6 @@
 # strategies/estrategia_unidade_minuto.py
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 # --- Metadados Obrigatórios (Atualizados) ---
 ID = "unidade_minuto_pos_branco"
@@ -26,7 +26,7 @@ def verificar(historico, cursor):
         return None
 
     # 2. Extração de dados
-    horario_base = datetime.strptime(resultado_branco['timestamp_iso'], "%Y-%m-%d %H:%M:%S")
+    horario_base = resultado_branco['timestamp_iso']
     minuto_gatilho = horario_base.minute
     digito_gatilho = minuto_gatilho % 10
 
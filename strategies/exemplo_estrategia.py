@@ -1,6 +1,6 @@
 # strategies/exemplo_estrategia.py
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 # --- Metadados (sem alteração) ---
 ID = "soma_minutos_pos_branco"
@@ -14,7 +14,7 @@ def verificar(historico, cursor):
         return None
 
     # Horário base
-    horario_base = datetime.strptime(historico[0]['timestamp_iso'], "%Y-%m-%d %H:%M:%S")
+    horario_base = historico[0]['timestamp_iso']
 
     # Números para a soma
     primeiro_a_somar = historico[1]['roll']